@@ -0,0 +1,208 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from bulk_load import _connect, dump_units, load
+from schema_catalog import SCHEMA_DIR, load_catalog
+from synth_data import build_plans, generate
+
+SCALES = (0.001, 0.01)
+WARMUP = 3
+TRIALS = 20
+THRESHOLD = 0.20
+# Differences below this many milliseconds are noise, whatever the ratio.
+NOISE_FLOOR_MS = 1.0
+NETWORK_DEPTH = 3
+
+# criminal_network.js walks a `relationships` table that the schema does not have; this is the same
+# recursive CTE over criminal_relations, with each relation usable in both directions.
+CRIMINAL_NETWORK_SQL = """
+WITH RECURSIVE edges AS (
+    SELECT criminal_id_1 AS source_id, criminal_id_2 AS target_id, relation_type FROM criminal_relations
+    UNION ALL
+    SELECT criminal_id_2, criminal_id_1, relation_type FROM criminal_relations
+),
+graph AS (
+    SELECT e.source_id AS root, e.target_id, 1 AS depth, ARRAY[e.source_id, e.target_id] AS path, e.relation_type
+    FROM edges e
+    WHERE e.source_id = %(criminal_id)s
+    UNION ALL
+    SELECT g.root, e.target_id, g.depth + 1, g.path || e.target_id, e.relation_type
+    FROM graph g
+    JOIN edges e ON e.source_id = g.target_id
+    WHERE g.depth < %(depth)s AND NOT e.target_id = ANY(g.path)
+)
+SELECT DISTINCT ON (target_id) target_id, depth, path, relation_type
+FROM graph
+ORDER BY target_id, depth ASC
+"""
+
+QUERIES = {
+    "v_jail_occupancy": "SELECT * FROM v_jail_occupancy",
+    # The usage example from views.sql.
+    "v_criminal_last_location": "SELECT * FROM v_criminal_last_location WHERE risk_level >= 7",
+    "criminal_network": CRIMINAL_NETWORK_SQL,
+}
+# The most connected criminal, so the network query has something to walk at every scale.
+NETWORK_ROOT_SQL = """
+SELECT criminal_id_1 FROM criminal_relations GROUP BY criminal_id_1 ORDER BY count(*) DESC, criminal_id_1 LIMIT 1
+"""
+
+
+def create_database(dsn, name):
+    admin = _connect(dsn, dbname="postgres")
+    admin.cursor().execute(f'DROP DATABASE IF EXISTS "{name}"')
+    admin.cursor().execute(f'CREATE DATABASE "{name}"')
+    admin.close()
+
+
+def prepare(dsn, scale, workers=None, schema_dir=SCHEMA_DIR, overrides=None, name=None):
+    """Create erd_bench_<scale> and bulk-load synthetic data at that scale with the full schema."""
+    from psycopg2.extensions import make_dsn
+
+    name = name or f"erd_bench_{str(scale).replace('.', '_')}"
+    create_database(dsn, name)
+    plans = build_plans(load_catalog(schema_dir), scale, overrides)
+    with tempfile.TemporaryDirectory() as output_dir:
+        generate(plans, output_dir, workers)
+        load(make_dsn(dsn, dbname=name), dump_units(output_dir), workers, schema_dir)
+    connection = _connect(dsn, dbname=name)
+    connection.cursor().execute("VACUUM ANALYZE")
+    return connection
+
+
+def run_query(cursor, sql, params, warmup=WARMUP, trials=TRIALS, probes=None, label=None):
+    """Execution-time percentiles and shared-buffer counts over repeated EXPLAIN ANALYZE runs."""
+    timings = []
+    hits = []
+    reads = []
+    rows = 0
+    for trial in range(warmup + trials):
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, TIMING OFF, FORMAT JSON) {sql}", params)
+        document = cursor.fetchone()[0][0]
+        if trial < warmup:
+            continue
+        plan = document["Plan"]
+        timings.append(document["Execution Time"])
+        hits.append(plan.get("Shared Hit Blocks", 0))
+        reads.append(plan.get("Shared Read Blocks", 0))
+        rows = plan.get("Actual Rows", 0)
+        if probes is not None:
+            probes.write(json.dumps({"label": label, "duration_ms": document["Execution Time"], "plan": document}) + "\n")
+    values = np.asarray(timings)
+    p50, p95, p99 = np.percentile(values, (50, 95, 99))
+    return {
+        "trials": trials,
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(values.mean()), 3),
+        "shared_hit_blocks": int(np.median(hits)),
+        "shared_read_blocks": int(np.median(reads)),
+        "rows": rows,
+    }
+
+
+def benchmark(dsn, scales=SCALES, warmup=WARMUP, trials=TRIALS, depth=NETWORK_DEPTH, workers=None, probes=None):
+    results = {}
+    server = None
+    for scale in scales:
+        started = time.perf_counter()
+        connection = prepare(dsn, scale, workers)
+        cursor = connection.cursor()
+        cursor.execute("SHOW server_version")
+        server = cursor.fetchone()[0]
+        cursor.execute(NETWORK_ROOT_SQL)
+        root = cursor.fetchone()
+        params = {"criminal_id": root[0] if root else None, "depth": depth}
+        print(f"scale {scale}: loaded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        results[str(scale)] = {
+            name: run_query(cursor, sql, params, warmup, trials, probes, f"{name}@{scale}") for name, sql in QUERIES.items()
+        }
+        connection.close()
+    return {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "server_version": server,
+            "warmup": warmup,
+            "trials": trials,
+            "network_depth": depth,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=THRESHOLD, metric="p95_ms", noise_floor=NOISE_FLOOR_MS):
+    """Rows of (scale, query, before, after, ratio, regressed) for every measurement in both runs."""
+    rows = []
+    for scale, queries in current["results"].items():
+        for name, result in queries.items():
+            before = baseline["results"].get(scale, {}).get(name)
+            if before is None:
+                continue
+            old, new = before[metric], result[metric]
+            ratio = new / old if old else float("inf")
+            regressed = ratio > 1 + threshold and new - old > noise_floor
+            rows.append((scale, name, old, new, ratio, regressed))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the views and the criminal network CTE at several data scales.")
+    parser.add_argument("--dsn", default="", help="local PostgreSQL superuser connection ('' uses PG* variables); erd_bench_* databases are recreated")
+    parser.add_argument("--scales", type=float, nargs="+", default=list(SCALES), help="synth_data.py scales to load")
+    parser.add_argument("--warmup", type=int, default=WARMUP)
+    parser.add_argument("--trials", type=int, default=TRIALS)
+    parser.add_argument("--depth", type=int, default=NETWORK_DEPTH, help="max depth of the network CTE")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--out", help="write this run as a JSON baseline")
+    parser.add_argument("--baseline", help="compare this run against a baseline and fail on regressions")
+    parser.add_argument("--current", help="compare an existing result file instead of running")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD, help="allowed slowdown, 0.2 = 20%%")
+    parser.add_argument("--metric", default="p95_ms", choices=("p50_ms", "p95_ms", "p99_ms", "mean_ms"))
+    parser.add_argument("--probes", help="also write every trial's plan as JSONL for erd_report.py --probes")
+    args = parser.parse_args(argv)
+
+    if args.current:
+        with open(args.current, encoding="utf-8") as handle:
+            current = json.load(handle)
+    else:
+        probes = open(args.probes, "w", encoding="utf-8") if args.probes else None
+        try:
+            current = benchmark(args.dsn, args.scales, args.warmup, args.trials, args.depth, args.workers, probes)
+        finally:
+            if probes:
+                probes.close()
+        print(f"{'scale':>8} {'query':<26} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'hit':>9} {'read':>8} {'rows':>8}")
+        for scale, queries in current["results"].items():
+            for name, result in queries.items():
+                print(
+                    f"{scale:>8} {name:<26} {result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+                    f"{result['shared_hit_blocks']:>9} {result['shared_read_blocks']:>8} {result['rows']:>8}"
+                )
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump(current, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as handle:
+            baseline = json.load(handle)
+        rows = compare(baseline, current, args.threshold, args.metric)
+        print(f"\n{'scale':>8} {'query':<26} {'before':>9} {'after':>9} {'change':>8}  ({args.metric}, threshold {args.threshold:.0%})")
+        for scale, name, old, new, ratio, regressed in rows:
+            print(f"{scale:>8} {name:<26} {old:>9.2f} {new:>9.2f} {ratio - 1:>+8.0%}{'  REGRESSION' if regressed else ''}")
+        failed = sum(row[-1] for row in rows)
+        if failed:
+            print(f"{failed} regression(s) beyond {args.threshold:.0%}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from schema_catalog import Catalog, Column, ForeignKey, Table
+
+TABLE_COUNTS = (20, 2000, 20000)
+COLUMNS_PER_TABLE = 8
+
+
+def synthetic_catalog(table_count, columns=COLUMNS_PER_TABLE):
+    # A chain of tables, each referencing the previous one, shaped like our real DDL.
+    catalog = Catalog()
+    for i in range(table_count):
+        name = f"audit_table_{i:05d}"
+        table = Table(name, f"Synthetic audit table {i}")
+        table.columns.append(Column(f"{name}_id", "BIGSERIAL", nullable=False, primary_key=True))
+        table.primary_key = (f"{name}_id",)
+        for j in range(columns - 2):
+            table.columns.append(Column(f"attribute_{j}", "TEXT", nullable=bool(j % 2)))
+        if i:
+            parent = f"audit_table_{i - 1:05d}"
+            table.columns.append(Column(f"{parent}_id", "BIGINT", nullable=False))
+            table.foreign_keys.append(ForeignKey(name, (f"{parent}_id",), parent, (f"{parent}_id",)))
+        catalog.tables[name] = table
+    return catalog
+
+
+def run_one(table_count, output_path):
+    import erd_report
+    from report_cache import SectionCache
+
+    catalog = synthetic_catalog(table_count)
+    catalog_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    erd_report.build(("pdf",), output_path, SectionCache(enabled=False), catalog)
+    return {
+        "tables": table_count,
+        "seconds": round(time.perf_counter() - started, 2),
+        "catalog_rss_mb": round(catalog_rss / 1024, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "pdf_mb": round(os.path.getsize(output_path) / (1024 * 1024), 2),
+    }
+
+
+def measure(table_count):
+    # One process per size, so each peak RSS is measured from a clean interpreter.
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", str(table_count)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Peak RSS of a streaming PDF build for synthetic schemas.")
+    parser.add_argument("--tables", type=int, nargs="*", default=list(TABLE_COUNTS))
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        with tempfile.TemporaryDirectory() as tmp:
+            print(json.dumps(run_one(args.child, os.path.join(tmp, "report.pdf"))))
+        return
+
+    print(f"{'tables':>8} {'seconds':>9} {'catalog RSS MB':>15} {'peak RSS MB':>12} {'PDF MB':>8}")
+    for count in args.tables:
+        result = measure(count)
+        print(
+            f"{result['tables']:>8} {result['seconds']:>9} {result['catalog_rss_mb']:>15} "
+            f"{result['peak_rss_mb']:>12} {result['pdf_mb']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
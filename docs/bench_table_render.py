@@ -0,0 +1,65 @@
+import argparse
+import io
+import time
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Table, TableStyle
+
+from report_pdf import add_table, styles
+
+ROW_COUNT = 10_000
+
+
+def attribute_rows(count):
+    rows = [["Attribute", "Type", "Purpose"]]
+    for i in range(count):
+        purpose = f"Audit column {i}" if i % 10 else f"Audit column {i}, kept for the partition history of every thana and jail transfer"
+        rows.append([f"audit_attribute_{i:05d}", "TEXT, NOT NULL" if i % 2 else "BIGINT, FK → audit_parent", purpose])
+    return rows
+
+
+def paragraph_table(story, rows):
+    # The previous add_table(): a Paragraph per cell and a new TableStyle per table.
+    wrapped_rows = [[Paragraph(str(cell), styles["TableCell"]) for cell in row] for row in rows]
+    table = Table(wrapped_rows, colWidths=[4.5 * cm, 6.0 * cm, 7.0 * cm], repeatRows=1)
+    table.setStyle(
+        TableStyle(
+            [
+                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#0b3d91")),
+                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#d0d7de")),
+                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+                ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ]
+        )
+    )
+    story.append(table)
+
+
+def measure(add, rows):
+    started = time.perf_counter()
+    story = []
+    add(story, rows)
+    built = time.perf_counter()
+    doc = SimpleDocTemplate(io.BytesIO(), pagesize=A4, leftMargin=2 * cm, rightMargin=2 * cm, topMargin=2 * cm, bottomMargin=2 * cm)
+    doc.build(story)
+    finished = time.perf_counter()
+    return built - started, finished - built
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Per-row cost of rendering a long attribute table.")
+    parser.add_argument("--rows", type=int, default=ROW_COUNT)
+    args = parser.parse_args(argv)
+
+    rows = attribute_rows(args.rows)
+    print(f"{'engine':<12} {'construct s':>12} {'layout s':>10} {'us/row':>8}")
+    for name, add in (("paragraphs", paragraph_table), ("add_table", add_table)):
+        construct, layout = measure(add, rows)
+        print(f"{name:<12} {construct:>12.2f} {layout:>10.2f} {(construct + layout) / args.rows * 1e6:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
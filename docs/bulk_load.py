@@ -0,0 +1,446 @@
+"""Set up a database with parallel COPY FROM STDIN instead of replaying seed_data.sql row by row.
+
+Tables are loaded in foreign-key order, several at a time, with primary keys, unique constraints, indexes and
+foreign keys dropped first and built once the data is in. The data comes from a synth_data.py dump
+(manifest.json plus COPY text files) or from seed_data.sql, which load_seed replays into one COPY per table.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+from schema_catalog import DDL_FILES, SCHEMA_DIR, SERIAL_TYPES, iter_statements, load_catalog, load_seed
+
+WORKERS = 4
+# psycopg2 reads the source in blocks of this size, one CopyData message each.
+COPY_BLOCK_BYTES = 8 << 20
+# Session settings for the loading connections: no WAL flush per COPY, and room for the index sorts.
+SESSION_OPTIONS = "-c synchronous_commit=off -c maintenance_work_mem=256MB -c statement_timeout=0"
+
+POSTPONED_CONSTRAINTS_SQL = """
+SELECT c.conrelid::regclass::text, c.conname, c.contype, pg_get_constraintdef(c.oid),
+       ARRAY(SELECT a.attname::text FROM unnest(c.conkey) WITH ORDINALITY k(attnum, n)
+             JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum ORDER BY k.n)
+FROM pg_constraint c
+WHERE c.connamespace = 'public'::regnamespace AND c.contype IN ('p', 'u', 'x', 'f')
+ORDER BY c.contype = 'f' DESC, c.conname
+"""
+# Indexes that no constraint owns; the ones indexes.sql creates come later anyway.
+POSTPONED_INDEXES_SQL = """
+SELECT c.relname, pg_get_indexdef(i.indexrelid)
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indexrelid
+WHERE c.relnamespace = 'public'::regnamespace
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = i.indexrelid)
+"""
+# triggers.sql is applied after the COPY, so its row triggers never see the loaded rows. These set the columns they
+# maintain as if each arrest had been inserted in arrest_id order (fn_update_criminal_status) and each incarceration
+# admitted and then, if released_at is set, released (fn_update_cell_status).
+STATUS_BACKFILL_SQL = (
+    """
+UPDATE criminals c SET status = a.custody_status
+FROM (
+    SELECT DISTINCT ON (criminal_id) criminal_id, custody_status FROM arrest_records
+    WHERE custody_status IN ('in_custody', 'on_bail', 'released')
+    ORDER BY criminal_id, arrest_id DESC
+) a
+WHERE c.criminal_id = a.criminal_id AND c.status <> a.custody_status
+""",
+    """
+UPDATE cells c SET status = i.status
+FROM (
+    SELECT cell_id, CASE WHEN bool_or(released_at IS NULL) THEN 'occupied' ELSE 'available' END AS status
+    FROM incarcerations WHERE cell_id IS NOT NULL GROUP BY cell_id
+) i
+WHERE c.cell_id = i.cell_id AND c.status <> i.status
+""",
+)
+
+
+@dataclass
+class CopyUnit:
+    table: str
+    columns: list
+    # A COPY text file, or the rows already encoded.
+    path: str | None = None
+    data: bytes = b""
+
+    def size(self):
+        return os.path.getsize(self.path) if self.path else len(self.data)
+
+
+@dataclass
+class TableLoad:
+    name: str
+    rows: int = 0
+    bytes: int = 0
+    files: int = 0
+    started: float | None = None
+    finished: float | None = None
+
+    @property
+    def seconds(self):
+        return (self.finished - self.started) if self.started is not None else 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class LoadResult:
+    tables: list = field(default_factory=list)
+    order: list = field(default_factory=list)
+    deferred: list = field(default_factory=list)
+    phases: dict = field(default_factory=dict)
+
+    @property
+    def rows(self):
+        return sum(table.rows for table in self.tables)
+
+
+def _connect(dsn, **overrides):
+    import psycopg2
+    from psycopg2.extensions import make_dsn
+
+    connection = psycopg2.connect(make_dsn(dsn, **overrides))
+    connection.autocommit = True
+    return connection
+
+
+def run_statements(connection, lines):
+    import psycopg2
+
+    cursor = connection.cursor()
+    for statement, _ in iter_statements(lines):
+        try:
+            cursor.execute(statement)
+        except psycopg2.Error as exc:
+            # gen_random_uuid() is built in from PostgreSQL 13, so a missing pgcrypto is not fatal.
+            if not statement.upper().startswith("CREATE EXTENSION"):
+                raise
+            print(f"warning: {str(exc).splitlines()[0]}", file=sys.stderr)
+
+
+def copy_text(value):
+    if value is None:
+        return "\\N"
+    return value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def seed_units(catalog, schema_dir=SCHEMA_DIR):
+    """One CopyUnit per seeded table, with SERIAL values filled in as load_seed assigns them."""
+    units = []
+    for table in load_seed(catalog, schema_dir).values():
+        lines = ("\t".join(copy_text(value) for value in row) + "\n" for row in table.rows)
+        units.append(CopyUnit(table.name, list(table.columns), data="".join(lines).encode("utf-8")))
+    return units
+
+
+def dump_units(directory):
+    """One CopyUnit per file of a synth_data.py dump."""
+    with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as handle:
+        manifest = json.load(handle)
+    return [
+        CopyUnit(table["name"], table["columns"], path=os.path.join(directory, name))
+        for table in manifest["tables"]
+        for name in table["files"]
+    ]
+
+
+def _blocked(deps):
+    # Kahn's algorithm; whatever cannot be ordered sits on (or behind) a cycle.
+    remaining = {name: set(parents) for name, parents in deps.items()}
+    ready = [name for name, parents in remaining.items() if not parents]
+    while ready:
+        done = ready.pop()
+        del remaining[done]
+        for name, parents in remaining.items():
+            if done in parents:
+                parents.discard(done)
+                if not parents:
+                    ready.append(name)
+    return set(remaining)
+
+
+def _reaches(deps, start, goal):
+    seen = set()
+    stack = [start]
+    while stack:
+        name = stack.pop()
+        if name == goal:
+            return True
+        if name not in seen:
+            seen.add(name)
+            stack.extend(deps[name])
+    return False
+
+
+def load_order(catalog, names):
+    """(parents per table, foreign keys left out to break cycles) for the tables in names.
+
+    Self-references and, per cycle, one foreign key over nullable columns (thanas.head_officer_id
+    against officers.thana_id) are left out; those constraints are only added after the load.
+    """
+    names = set(names)
+    edges = [fk for fk in catalog.foreign_keys() if fk.table in names and fk.ref_table in names]
+    deferred = [fk for fk in edges if fk.table == fk.ref_table]
+    edges = [fk for fk in edges if fk.table != fk.ref_table]
+    while True:
+        deps = {name: {fk.ref_table for fk in edges if fk.table == name} for name in names}
+        cycle = _blocked(deps)
+        if not cycle:
+            return deps, deferred
+        breakable = [
+            fk
+            for fk in edges
+            if fk.table in cycle and fk.ref_table in cycle
+            and all(catalog.tables[fk.table].column(column).nullable for column in fk.columns)
+            and _reaches(deps, fk.ref_table, fk.table)
+        ]
+        if not breakable:
+            raise ValueError(f"foreign key cycle through {', '.join(sorted(cycle))} has no nullable column to break it")
+        fk = min(breakable, key=lambda fk: (fk.table, fk.columns))
+        edges.remove(fk)
+        deferred.append(fk)
+
+
+def levels(deps):
+    """Tables grouped by how many parent levels precede them; each group can load side by side."""
+    placed = {}
+    while len(placed) < len(deps):
+        for name in sorted(deps):
+            if name not in placed and all(parent in placed for parent in deps[name]):
+                placed[name] = 1 + max((placed[parent] for parent in deps[name]), default=-1)
+    grouped = {}
+    for name, level in placed.items():
+        grouped.setdefault(level, []).append(name)
+    return [sorted(grouped[level]) for level in sorted(grouped)]
+
+
+def postpone(cursor, only=None):
+    """Drop keys, foreign keys and standalone indexes, returning the statements that restore them.
+
+    With only=[ForeignKey, ...] just those foreign keys are dropped.
+    """
+    cursor.execute(POSTPONED_CONSTRAINTS_SQL)
+    constraints = cursor.fetchall()
+    if only is not None:
+        wanted = {(fk.table, tuple(fk.columns)) for fk in only}
+        constraints = [row for row in constraints if row[2] == "f" and (row[0], tuple(row[4])) in wanted]
+        indexes = []
+    else:
+        cursor.execute(POSTPONED_INDEXES_SQL)
+        indexes = cursor.fetchall()
+    restore = {"keys": [], "foreign_keys": [], "indexes": []}
+    for table, name, kind, definition, _ in constraints:
+        cursor.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+        if kind == "f":
+            restore["foreign_keys"].append((table, name, definition))
+        else:
+            restore["keys"].append(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+    for name, definition in indexes:
+        cursor.execute(f'DROP INDEX "{name}"')
+        restore["indexes"].append(definition)
+    return restore
+
+
+def _execute(pool, sql):
+    connection = pool.getconn()
+    try:
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+    finally:
+        pool.putconn(connection)
+
+
+def copy_sql(unit):
+    return f"COPY {unit.table} ({', '.join(unit.columns)}) FROM STDIN"
+
+
+def copy_unit(pool, unit):
+    """COPY one unit through a pooled connection; returns (rows, started, finished)."""
+    connection = pool.getconn()
+    try:
+        connection.autocommit = True
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            sql = copy_sql(unit)
+            if unit.path:
+                with open(unit.path, "rb") as handle:
+                    cursor.copy_expert(sql, handle, size=COPY_BLOCK_BYTES)
+            else:
+                cursor.copy_expert(sql, io.BytesIO(unit.data), size=COPY_BLOCK_BYTES)
+            rows = cursor.rowcount
+        return rows, started, time.perf_counter()
+    finally:
+        pool.putconn(connection)
+
+
+def copy_all(pool, units, deps, workers):
+    """Run every unit, starting a table's files only once all of its parents have finished."""
+    pending = {}
+    for unit in units:
+        pending.setdefault(unit.table, []).append(unit)
+    loads = {name: TableLoad(name) for name in pending}
+    remaining = {name: len(table_units) for name, table_units in pending.items()}
+    done = {name for name in deps if name not in pending}
+    running = {}
+    with ThreadPoolExecutor(workers) as executor:
+
+        def submit_ready():
+            for name in sorted(pending):
+                if deps.get(name, set()) <= done:
+                    for unit in pending.pop(name):
+                        running[executor.submit(copy_unit, pool, unit)] = unit
+
+        submit_ready()
+        while running:
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                unit = running.pop(future)
+                rows, started, ended = future.result()
+                load = loads[unit.table]
+                load.rows += rows
+                load.bytes += unit.size()
+                load.files += 1
+                load.started = started if load.started is None else min(load.started, started)
+                load.finished = ended if load.finished is None else max(load.finished, ended)
+                remaining[unit.table] -= 1
+                if not remaining[unit.table]:
+                    done.add(unit.table)
+            submit_ready()
+    return list(loads.values())
+
+
+def _index_statements(schema_dir):
+    with open(os.path.join(schema_dir, "indexes.sql"), encoding="utf-8") as handle:
+        return [statement for statement, _ in iter_statements(handle)]
+
+
+def sequence_sql(catalog):
+    # The loaded rows carry their SERIAL values, so each sequence has to move past them.
+    return [
+        f"SELECT setval(pg_get_serial_sequence('{table.name}', '{column.name}'), coalesce(max({column.name}), 0) + 1, false) "
+        f"FROM {table.name}"
+        for table in catalog.tables.values()
+        for column in table.columns
+        if column.data_type in SERIAL_TYPES
+    ]
+
+
+def reset_sequences(cursor, catalog):
+    for statement in sequence_sql(catalog):
+        cursor.execute(statement)
+
+
+def load(dsn, units, workers=None, schema_dir=SCHEMA_DIR, keep_constraints=False):
+    """Create the schema in the (empty) database at dsn and load units into it; returns a LoadResult."""
+    import psycopg2.pool
+
+    workers = workers or WORKERS
+    catalog = load_catalog(schema_dir)
+    deps, deferred = load_order(catalog, catalog.tables)
+    result = LoadResult(order=levels(deps), deferred=deferred)
+    connection = _connect(dsn)
+    cursor = connection.cursor()
+    pool = psycopg2.pool.ThreadedConnectionPool(1, workers, dsn, options=SESSION_OPTIONS, application_name="bulk-load")
+    try:
+        started = time.perf_counter()
+        with open(os.path.join(schema_dir, DDL_FILES[0]), encoding="utf-8") as handle:
+            run_statements(connection, handle)
+        restore = postpone(cursor, deferred if keep_constraints else None)
+        result.phases["schema"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result.tables = copy_all(pool, units, deps, workers)
+        result.phases["copy"] = time.perf_counter() - started
+
+        # Keys first, since foreign keys need the referenced unique index. Adding a foreign key NOT VALID
+        # only touches the catalog; the validating scans then run side by side with the index builds.
+        started = time.perf_counter()
+        with ThreadPoolExecutor(workers) as executor:
+            list(executor.map(lambda sql: _execute(pool, sql), restore["keys"]))
+            for table, name, definition in restore["foreign_keys"]:
+                cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition} NOT VALID')
+            statements = _index_statements(schema_dir)
+            parallel = [s for s in statements if s.upper().startswith(("CREATE INDEX", "CREATE UNIQUE INDEX"))]
+            for statement in statements:
+                if statement not in parallel:
+                    cursor.execute(statement)
+            parallel += restore["indexes"]
+            parallel += [f'ALTER TABLE {table} VALIDATE CONSTRAINT "{name}"' for table, name, _ in restore["foreign_keys"]]
+            list(executor.map(lambda sql: _execute(pool, sql), parallel))
+        result.phases["keys and indexes"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for file_name in DDL_FILES[2:]:
+            with open(os.path.join(schema_dir, file_name), encoding="utf-8") as handle:
+                run_statements(connection, handle)
+        reset_sequences(cursor, catalog)
+        for statement in STATUS_BACKFILL_SQL:
+            cursor.execute(statement)
+        cursor.execute("ANALYZE")
+        result.phases["views, triggers, backfill"] = time.perf_counter() - started
+    finally:
+        pool.closeall()
+        connection.close()
+    return result
+
+
+def recreate_database(dsn):
+    from psycopg2.extensions import parse_dsn
+
+    name = parse_dsn(dsn).get("dbname") or os.environ.get("PGDATABASE")
+    if not name:
+        raise SystemExit("--create needs a database name in --dsn or PGDATABASE")
+    admin = _connect(dsn, dbname="postgres")
+    admin.cursor().execute(f'DROP DATABASE IF EXISTS "{name}"')
+    admin.cursor().execute(f'CREATE DATABASE "{name}"')
+    admin.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Create the schema and load data with parallel COPY, building keys and indexes afterwards.")
+    parser.add_argument("--dsn", default="", help="target database, empty unless --create ('' uses PG* variables)")
+    parser.add_argument("--create", action="store_true", help="drop and recreate the --dsn database first")
+    parser.add_argument("--dump", help="synth_data.py output directory (default: the rows of seed_data.sql)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="parallel connections")
+    parser.add_argument("--keep-constraints", action="store_true", help="check keys and foreign keys during the load (only cycle-breaking ones wait)")
+    args = parser.parse_args(argv)
+
+    try:
+        import psycopg2  # noqa: F401
+    except ImportError:
+        raise SystemExit("bulk_load.py needs psycopg2 (pip install psycopg2-binary)")
+    units = dump_units(args.dump) if args.dump else seed_units(load_catalog())
+    if args.create:
+        recreate_database(args.dsn)
+    started = time.perf_counter()
+    result = load(args.dsn, units, args.workers, keep_constraints=args.keep_constraints)
+    elapsed = time.perf_counter() - started
+
+    for number, names in enumerate(result.order):
+        print(f"level {number}: {', '.join(names)}")
+    for fk in result.deferred:
+        print(f"after load: {fk.table}({', '.join(fk.columns)}) -> {fk.ref_table}")
+    print(f"\n{'table':<26}{'rows':>13}{'MB':>9}{'files':>7}{'seconds':>9}{'rows/s':>12}")
+    for table in sorted(result.tables, key=lambda table: -table.rows):
+        print(
+            f"{table.name:<26}{table.rows:>13,}{table.bytes / 1e6:>9.1f}{table.files:>7}"
+            f"{table.seconds:>9.2f}{table.rows_per_second:>12,.0f}"
+        )
+    print()
+    for phase, seconds in result.phases.items():
+        print(f"{phase:<26}{seconds:>8.2f}s")
+    print(f"{result.rows:,} rows in {elapsed:.1f}s ({result.rows / elapsed:,.0f} rows/s) with {args.workers} connections")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,183 @@
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from schema_catalog import load_catalog
+
+
+@dataclass
+class Side:
+    table: str
+    min: int
+    max: int | None  # None is "many"
+
+    def __str__(self):
+        return f"{self.table} ({self.min},{'*' if self.max is None else self.max})"
+
+    @property
+    def total(self):
+        return self.min > 0
+
+
+@dataclass
+class Relation:
+    """One relationship: an FK (left is the referenced table) or a relation table joining two others."""
+
+    via: str
+    columns: tuple
+    left: Side
+    right: Side
+    evidence: list = field(default_factory=list)
+    many_to_many: bool = False
+
+    @property
+    def ratio(self):
+        if self.many_to_many:
+            return "M:N"
+        return f"1:{'N' if self.left.max is None else 1}"
+
+
+@dataclass
+class Observation:
+    relation: Relation
+    rows: int
+    left: Side
+    right: Side
+
+    @property
+    def notes(self):
+        # Where the data is stricter than the schema, or (for NOT VALID constraints) looser.
+        notes = []
+        for schema, data in ((self.relation.left, self.left), (self.relation.right, self.right)):
+            if data.min > schema.min:
+                notes.append(f"every {schema.table} row takes part; the schema does not require it")
+            elif data.min < schema.min:
+                notes.append(f"some {schema.table} rows do not take part although the schema requires it")
+            if schema.max is None and data.max is not None and data.max <= 1:
+                notes.append(f"no {schema.table} row takes part more than once")
+        return notes
+
+
+def _unique_keys(catalog, table):
+    keys = [set(table.primary_key)] if table.primary_key else []
+    keys += [set(unique) for unique in table.uniques]
+    keys += [{column.name} for column in table.columns if column.unique]
+    keys += [set(index.columns) for index in catalog.indexes if index.table == table.name and index.unique and not index.where]
+    return keys
+
+
+def _key_name(table, key):
+    return f"PRIMARY KEY ({', '.join(table.primary_key)})" if key == set(table.primary_key) else f"UNIQUE ({', '.join(sorted(key))})"
+
+
+def infer(catalog):
+    """Chen (min,max) pairs for every relationship, derived from NOT NULL, UNIQUE, PK and FK constraints.
+
+    A referencing row takes part exactly once when its FK columns are NOT NULL, at most once otherwise.
+    A referenced row takes part at most once when the FK columns are unique, and never has to:
+    no constraint can require a child row to exist.
+    Callers that need the relations more than once compute them once and pass them along.
+    """
+    relations = []
+    for table in catalog.tables.values():
+        unique_keys = _unique_keys(catalog, table)
+        pair = table.relationship_keys()
+        if pair:
+            left, right = pair[0], pair[1]
+            sides = []
+            evidence = [f"{table.name} is keyed by {', '.join(left.columns)} and {', '.join(right.columns)}"]
+            for fk in (left, right):
+                one = next((k for k in unique_keys if k <= set(fk.columns)), None)
+                sides.append(Side(fk.ref_table, 0, 1 if one else None))
+                if one:
+                    evidence.append(f"{_key_name(table, one)} allows one row per {fk.ref_table}")
+            relations.append(Relation(table.name, (*left.columns, *right.columns), *sides, evidence, many_to_many=True))
+        for fk in table.foreign_keys:
+            if fk in pair:
+                continue
+            columns = [table.column(name) for name in fk.columns]
+            required = all(column is not None and not column.nullable for column in columns)
+            one = next((k for k in unique_keys if k <= set(fk.columns)), None)
+            target = f"{table.name}.{', '.join(fk.columns)}"
+            evidence = [f"{target} {'NOT NULL' if required else 'nullable'}"]
+            evidence.append(f"{_key_name(table, one)} makes it 1:1" if one else "not unique")
+            relations.append(Relation(table.name, fk.columns, Side(fk.ref_table, 0, 1 if one else None), Side(table.name, 1 if required else 0, 1), evidence))
+    return relations
+
+
+def _legs(catalog, relation):
+    # (referenced table, referencing columns) per side; one leg for an FK, two for a relation table.
+    if relation.many_to_many:
+        return [(fk.ref_table, fk.columns) for fk in catalog.tables[relation.via].relationship_keys()[:2]]
+    return [(relation.left.table, relation.columns)]
+
+
+def verification_query(catalog, relation):
+    """One statement per relation: row count, then nulls, referenced rows, rows referenced and max uses per leg."""
+    from psycopg2 import sql
+
+    via = sql.Identifier(relation.via)
+    ctes = []
+    selects = [sql.SQL("(SELECT count(*) FROM {})").format(via)]
+    for i, (parent, columns) in enumerate(_legs(catalog, relation)):
+        names = sql.SQL(", ").join(sql.Identifier(column) for column in columns)
+        present = sql.SQL(" AND ").join(sql.SQL("{} IS NOT NULL").format(sql.Identifier(column)) for column in columns)
+        leg = sql.Identifier(f"leg_{i}")
+        ctes.append(sql.SQL("{} AS (SELECT count(*) AS uses FROM {} WHERE {} GROUP BY {})").format(leg, via, present, names))
+        selects += [
+            sql.SQL("(SELECT count(*) FROM {} WHERE NOT ({}))").format(via, present),
+            sql.SQL("(SELECT count(*) FROM {})").format(sql.Identifier(parent)),
+            sql.SQL("(SELECT count(*) FROM {})").format(leg),
+            sql.SQL("(SELECT coalesce(max(uses), 0) FROM {})").format(leg),
+        ]
+    return sql.SQL("WITH {} SELECT {}").format(sql.SQL(", ").join(ctes), sql.SQL(", ").join(selects))
+
+
+def _observed_side(table, parents, referenced, uses):
+    return Side(table, 1 if parents and referenced == parents else 0, None if uses > 1 else uses)
+
+
+def observe(catalog, relation, row):
+    rows, *legs = row
+    sides = []
+    nulls = 0
+    for i, (parent, _) in enumerate(_legs(catalog, relation)):
+        leg_nulls, parents, referenced, uses = legs[4 * i:4 * i + 4]
+        nulls += leg_nulls
+        sides.append(_observed_side(parent, parents, referenced, uses))
+    if relation.many_to_many:
+        return Observation(relation, rows, sides[0], sides[1])
+    return Observation(relation, rows, sides[0], Side(relation.via, 0 if nulls or not rows else 1, 1 if rows else 0))
+
+
+def verify(pool, catalog, relations=None):
+    """Check the inferred cardinalities against the data, one aggregate query per relation over the pool."""
+    relations = infer(catalog) if relations is None else relations
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        rows = list(executor.map(lambda relation: pool.fetch(verification_query(catalog, relation))[0], relations))
+    return [observe(catalog, relation, row) for relation, row in zip(relations, rows)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Infer Chen cardinalities from the schema and optionally check them against data.")
+    parser.add_argument("--dsn", help="verify against a running database ('' uses PG* variables)")
+    args = parser.parse_args()
+
+    catalog = load_catalog()
+    started = time.perf_counter()
+    relations = infer(catalog)
+    print(f"{len(relations)} relations inferred in {(time.perf_counter() - started) * 1000:.1f} ms")
+    for relation in relations:
+        print(f"  {relation.ratio:<4} {relation.left} — {relation.via} — {relation.right}   [{'; '.join(relation.evidence)}]")
+    if args.dsn is not None:
+        from catalog_introspect import ConnectionPool
+
+        pool = ConnectionPool(args.dsn)
+        started = time.perf_counter()
+        observations = verify(pool, catalog, relations)
+        pool.close()
+        print(f"verified against data in {(time.perf_counter() - started) * 1000:.0f} ms")
+        for observation in observations:
+            for note in observation.notes:
+                print(f"  {observation.relation.via}.{', '.join(observation.relation.columns)}: {note}")
@@ -0,0 +1,373 @@
+import argparse
+import math
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from schema_catalog import Catalog, Check, Column, ForeignKey, Function, Index, Table, parse_statement
+
+POOL_SIZE = 4
+STATEMENT_TIMEOUT_MS = 15000
+COPY_CHUNK_BYTES = 2 << 20
+# Heap tuple header (23 bytes, aligned) plus its 4-byte line pointer, and the page header.
+TUPLE_OVERHEAD = 24 + 4
+PAGE_HEADER = 24
+
+# format_type() spellings mapped back to the ones schema.sql uses.
+TYPE_NAMES = {
+    "integer": "INT",
+    "bigint": "BIGINT",
+    "smallint": "SMALLINT",
+    "text": "TEXT",
+    "uuid": "UUID",
+    "date": "DATE",
+    "boolean": "BOOLEAN",
+    "timestamp with time zone": "TIMESTAMPTZ",
+    "timestamp without time zone": "TIMESTAMP",
+    "character varying": "VARCHAR",
+    "numeric": "NUMERIC",
+    "jsonb": "JSONB",
+}
+SERIAL_TYPES = {"INT": "SERIAL", "BIGINT": "BIGSERIAL", "SMALLINT": "SMALLSERIAL"}
+ON_DELETE = {"r": "RESTRICT", "c": "CASCADE", "n": "SET NULL", "d": "SET DEFAULT"}
+
+TABLES_SQL = """
+SELECT c.relname, coalesce(obj_description(c.oid, 'pg_class'), '')
+FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = %(schema)s AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+ORDER BY c.oid
+"""
+
+COLUMNS_SQL = """
+SELECT c.relname, a.attname, format_type(a.atttypid, a.atttypmod), a.attnotnull,
+       pg_get_expr(d.adbin, d.adrelid)
+FROM pg_attribute a
+JOIN pg_class c ON c.oid = a.attrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+WHERE n.nspname = %(schema)s AND c.relkind IN ('r', 'p') AND a.attnum > 0 AND NOT a.attisdropped
+ORDER BY c.oid, a.attnum
+"""
+
+CONSTRAINTS_SQL = """
+SELECT c.relname, k.conname, k.contype,
+       ARRAY(SELECT a.attname FROM unnest(k.conkey) WITH ORDINALITY u(attnum, pos)
+             JOIN pg_attribute a ON a.attrelid = k.conrelid AND a.attnum = u.attnum ORDER BY u.pos),
+       r.relname,
+       ARRAY(SELECT a.attname FROM unnest(k.confkey) WITH ORDINALITY u(attnum, pos)
+             JOIN pg_attribute a ON a.attrelid = k.confrelid AND a.attnum = u.attnum ORDER BY u.pos),
+       k.confdeltype, pg_get_constraintdef(k.oid, true)
+FROM pg_constraint k
+JOIN pg_class c ON c.oid = k.conrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_class r ON r.oid = k.confrelid
+WHERE n.nspname = %(schema)s AND k.contype IN ('p', 'u', 'f', 'c')
+ORDER BY c.oid, k.contype, k.oid
+"""
+
+# Indexes created by PRIMARY KEY / UNIQUE constraints are reported with the constraint instead.
+INDEXES_SQL = """
+SELECT x.relname, c.relname, i.indisunique,
+       ARRAY(SELECT pg_get_indexdef(i.indexrelid, k, true)
+                    || CASE WHEN i.indoption[k - 1] & 1 = 1 THEN ' DESC' ELSE '' END
+             FROM generate_series(1, i.indnkeyatts) k ORDER BY k),
+       pg_get_expr(i.indpred, i.indrelid, true)
+FROM pg_index i
+JOIN pg_class x ON x.oid = i.indexrelid
+JOIN pg_class c ON c.oid = i.indrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = %(schema)s AND c.relkind IN ('r', 'p')
+  AND NOT EXISTS (SELECT 1 FROM pg_constraint k WHERE k.conindid = i.indexrelid AND k.contype IN ('p', 'u', 'x'))
+ORDER BY x.oid
+"""
+
+VIEWS_SQL = """
+SELECT c.relname, c.relkind, pg_get_viewdef(c.oid, true)
+FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = %(schema)s AND c.relkind IN ('v', 'm')
+ORDER BY c.oid
+"""
+
+# Functions installed by extensions (pgcrypto and friends) are not part of our schema.
+ROUTINES_SQL = """
+SELECT 'function', p.proname, l.lanname, p.prosrc, p.oid
+FROM pg_proc p
+JOIN pg_namespace n ON n.oid = p.pronamespace
+JOIN pg_language l ON l.oid = p.prolang
+WHERE n.nspname = %(schema)s AND p.prokind = 'f' AND l.lanname IN ('plpgsql', 'sql')
+  AND NOT EXISTS (SELECT 1 FROM pg_depend d WHERE d.classid = 'pg_proc'::regclass AND d.objid = p.oid AND d.deptype = 'e')
+UNION ALL
+SELECT 'trigger', t.tgname, NULL, pg_get_triggerdef(t.oid, true), t.oid
+FROM pg_trigger t
+JOIN pg_class c ON c.oid = t.tgrelid
+JOIN pg_namespace n ON n.oid = c.relnamespace
+WHERE n.nspname = %(schema)s AND NOT t.tgisinternal
+ORDER BY 1, 5
+"""
+
+STATS_SQL = """
+SELECT c.relname, c.reltuples::bigint, s.n_live_tup, s.n_dead_tup,
+       pg_relation_size(c.oid), pg_indexes_size(c.oid), pg_total_relation_size(c.oid),
+       w.row_width, current_setting('block_size')::int,
+       coalesce((SELECT option_value::int FROM pg_options_to_table(c.reloptions) WHERE option_name = 'fillfactor'), 100)
+FROM pg_class c
+JOIN pg_namespace n ON n.oid = c.relnamespace
+LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid
+LEFT JOIN (
+    SELECT schemaname, tablename, sum((1 - null_frac) * avg_width) AS row_width
+    FROM pg_stats GROUP BY schemaname, tablename
+) w ON w.schemaname = n.nspname AND w.tablename = c.relname
+WHERE n.nspname = %(schema)s AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+ORDER BY c.oid
+"""
+
+
+@dataclass
+class TableStats:
+    table: str
+    rows: int
+    dead_rows: int
+    table_bytes: int
+    index_bytes: int
+    total_bytes: int
+    bloat_bytes: int | None = None
+    exact: bool = False
+
+
+class _CopySink:
+    # File-like target for copy_expert; libpq hands over whole rows, so every flush ends on a line break.
+
+    def __init__(self, feed, chunk_bytes):
+        self.feed = feed
+        self.chunk_bytes = chunk_bytes
+        self.parts = []
+        self.size = 0
+
+    def write(self, data):
+        self.parts.append(data)
+        self.size += len(data)
+        if self.size >= self.chunk_bytes:
+            self.flush()
+
+    def flush(self):
+        if self.parts:
+            self.feed(b"".join(self.parts))
+        self.parts = []
+        self.size = 0
+
+
+class ConnectionPool:
+    """A small read-only psycopg2 pool; queries borrow a connection each so they can run side by side."""
+
+    def __init__(self, dsn="", schema="public", size=POOL_SIZE):
+        try:
+            import psycopg2.pool
+        except ImportError as exc:
+            raise SystemExit("--dsn needs psycopg2 (pip install psycopg2-binary)") from exc
+        options = f"-c search_path={schema} -c statement_timeout={STATEMENT_TIMEOUT_MS} -c default_transaction_read_only=on"
+        self.size = size
+        self._pool = psycopg2.pool.ThreadedConnectionPool(1, size, dsn, options=options, application_name="erd-report")
+
+    def fetch(self, sql, params=None):
+        connection = self._pool.getconn()
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                return cursor.fetchall()
+        finally:
+            self._pool.putconn(connection)
+
+    def stream(self, sql, params=None, itersize=2000):
+        # Server-side cursor: rows arrive in batches of itersize instead of all at once.
+        connection = self._pool.getconn()
+        try:
+            connection.autocommit = False
+            with connection.cursor(name="erd_report_stream") as cursor:
+                cursor.itersize = itersize
+                cursor.execute(sql, params)
+                yield from cursor
+        finally:
+            connection.rollback()
+            self._pool.putconn(connection)
+
+    def copy_out(self, sql, feed, chunk_bytes=COPY_CHUNK_BYTES):
+        """Run COPY ... TO STDOUT and call feed() with blocks of about chunk_bytes of complete lines."""
+        connection = self._pool.getconn()
+        try:
+            connection.autocommit = False
+            sink = _CopySink(feed, chunk_bytes)
+            with connection.cursor() as cursor:
+                # A full-table copy may outlast the statement timeout.
+                cursor.execute("SET LOCAL statement_timeout = 0")
+                cursor.copy_expert(sql, sink)
+            sink.flush()
+        finally:
+            connection.rollback()
+            self._pool.putconn(connection)
+
+    def close(self):
+        self._pool.closeall()
+
+
+def _data_type(formatted, default):
+    base, _, modifier = formatted.partition("(")
+    name = TYPE_NAMES.get(base, base.upper())
+    if default and default.startswith("nextval(") and name in SERIAL_TYPES:
+        return SERIAL_TYPES[name]
+    return name + ("(" + modifier.replace(" ", "") if modifier else "")
+
+
+def _default(expression):
+    if not expression or expression.startswith("nextval("):
+        return None
+    # 'open'::text -> 'open', now() -> NOW() as written in schema.sql
+    expression = re.sub(r"::[\w ]+(\[\])?$", "", expression)
+    return "NOW()" if expression == "now()" else expression
+
+
+def _check_expression(definition):
+    expression = definition[len("CHECK "):] if definition.startswith("CHECK ") else definition
+    while expression.startswith("(") and expression.endswith(")") and _balanced(expression[1:-1]):
+        expression = expression[1:-1]
+    return expression
+
+
+def _balanced(text):
+    depth = 0
+    for ch in text:
+        depth += (ch == "(") - (ch == ")")
+        if depth < 0:
+            return False
+    return depth == 0
+
+
+def _apply_constraint(table, name, kind, columns, ref_table, ref_columns, delete_action, definition):
+    columns = tuple(columns)
+    if kind == "p":
+        table.primary_key = columns
+        for column_name in columns:
+            column = table.column(column_name)
+            column.nullable = False
+            column.primary_key = len(columns) == 1
+    elif kind == "u":
+        table.uniques.append(columns)
+        if len(columns) == 1:
+            table.column(columns[0]).unique = True
+    elif kind == "f":
+        table.foreign_keys.append(ForeignKey(table.name, columns, ref_table, tuple(ref_columns), name, ON_DELETE.get(delete_action)))
+    elif kind == "c":
+        table.checks.append(Check(table.name, _check_expression(definition), columns))
+
+
+def estimate_bloat(rows, table_bytes, row_width, block_size, fillfactor=100):
+    # Pages the live rows would need if packed at the table's fillfactor, compared with pages on disk.
+    if row_width is None or rows < 0:
+        return None
+    tuple_bytes = TUPLE_OVERHEAD + 8 * math.ceil(float(row_width) / 8)
+    usable = (block_size - PAGE_HEADER) * fillfactor / 100
+    expected_pages = math.ceil(rows * tuple_bytes / usable)
+    return max(0, table_bytes // block_size - expected_pages) * block_size
+
+
+def exact_row_counts(pool, tables):
+    # One UNION ALL statement instead of a count(*) round trip per table.
+    from psycopg2 import sql
+
+    counts = {}
+    names = list(tables)
+    for start in range(0, len(names), 200):
+        chunk = names[start:start + 200]
+        query = sql.SQL(" UNION ALL ").join(
+            sql.SQL("SELECT {}, count(*) FROM {}").format(sql.Literal(name), sql.Identifier(name)) for name in chunk
+        )
+        counts.update(pool.fetch(query))
+    return counts
+
+
+def introspect(dsn="", schema="public", exact_counts=False, pool=None):
+    """Read the deployed schema into a Catalog plus per-table TableStats.
+
+    Every catalog query covers all tables at once and they run in parallel
+    over the pool, so the round-trip count does not grow with the schema.
+    """
+    own_pool = pool is None
+    pool = pool or ConnectionPool(dsn, schema)
+    params = {"schema": schema}
+    try:
+        with ThreadPoolExecutor(max_workers=pool.size) as executor:
+            futures = {
+                name: executor.submit(pool.fetch, sql, params)
+                for name, sql in (
+                    ("tables", TABLES_SQL),
+                    ("columns", COLUMNS_SQL),
+                    ("constraints", CONSTRAINTS_SQL),
+                    ("indexes", INDEXES_SQL),
+                    ("views", VIEWS_SQL),
+                    ("routines", ROUTINES_SQL),
+                    ("stats", STATS_SQL),
+                )
+            }
+            results = {name: future.result() for name, future in futures.items()}
+        counts = exact_row_counts(pool, [row[0] for row in results["tables"]]) if exact_counts else {}
+    finally:
+        if own_pool:
+            pool.close()
+
+    catalog = Catalog()
+    for name, comment in results["tables"]:
+        catalog.tables[name] = Table(name, comment)
+    for table_name, name, formatted, not_null, default in results["columns"]:
+        table = catalog.tables.get(table_name)
+        if table:
+            table.columns.append(Column(name, _data_type(formatted, default), not not_null, _default(default)))
+    for table_name, *constraint in results["constraints"]:
+        if table_name in catalog.tables:
+            _apply_constraint(catalog.tables[table_name], *constraint)
+    for name, table_name, unique, columns, where in results["indexes"]:
+        catalog.indexes.append(Index(name, table_name, tuple(columns), unique, where))
+    for name, kind, definition in results["views"]:
+        materialized = "MATERIALIZED " if kind == "m" else ""
+        parse_statement(catalog, f"CREATE {materialized}VIEW {name} AS {definition.strip().rstrip(';')}")
+    for kind, name, language, body, _ in results["routines"]:
+        if kind == "function":
+            catalog.functions[name] = Function(name, language, body.strip())
+        else:
+            parse_statement(catalog, body)
+
+    stats = {}
+    for name, reltuples, live, dead, table_bytes, index_bytes, total_bytes, row_width, block_size, fillfactor in results["stats"]:
+        rows = reltuples if reltuples >= 0 else (live or 0)
+        stats[name] = TableStats(
+            name,
+            counts.get(name, rows),
+            dead or 0,
+            table_bytes,
+            index_bytes,
+            total_bytes,
+            estimate_bloat(rows, table_bytes, row_width, block_size, fillfactor),
+            name in counts,
+        )
+    return catalog, stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Introspect a running database (connection defaults come from PG* variables).")
+    parser.add_argument("--dsn", default="")
+    parser.add_argument("--schema", default="public")
+    parser.add_argument("--exact-counts", action="store_true", help="count(*) every table instead of using planner estimates")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    catalog, stats = introspect(args.dsn, args.schema, args.exact_counts)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(
+        f"{len(catalog.tables)} tables, {len(catalog.foreign_keys())} foreign keys, "
+        f"{sum(len(t.checks) for t in catalog.tables.values())} checks, {len(catalog.indexes)} indexes, "
+        f"{len(catalog.views)} views, {len(catalog.triggers)} triggers introspected in {elapsed_ms:.1f} ms"
+    )
+    print(f"{'table':<32} {'rows':>10} {'dead':>8} {'table KB':>10} {'index KB':>10} {'bloat KB':>10}")
+    for item in stats.values():
+        bloat = "-" if item.bloat_bytes is None else item.bloat_bytes // 1024
+        print(f"{item.table:<32} {item.rows:>10} {item.dead_rows:>8} {item.table_bytes // 1024:>10} {item.index_bytes // 1024:>10} {bloat:>10}")
@@ -0,0 +1,348 @@
+import argparse
+import binascii
+import json
+import os
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from data_profile import copy_fields, read_copy_file
+from synth_data import OUTPUT_DIR
+
+DAMPING = 0.85
+PAGERANK_ITERATIONS = 100
+PAGERANK_TOLERANCE = 1e-6
+TOP_PER_THANA = 3
+# criminal_network.js stops at depth 3; six degrees is the usual question.
+MAX_DEPTH = 6
+
+
+def uuid_keys(values):
+    """Pack 36-character UUID texts into 16-byte keys that sort and compare like the UUIDs."""
+    return np.frombuffer(binascii.unhexlify(b"".join(values).replace(b"-", b"")), dtype="S16")
+
+
+def uuid_text(key):
+    return str(uuid.UUID(bytes=key.ljust(16, b"\0")))
+
+
+def scan(source, table, columns, convert):
+    """convert(*column_values) for every block of a table, from a dump directory or a ConnectionPool."""
+    parts = []
+    if isinstance(source, str):
+        with open(os.path.join(source, "manifest.json"), encoding="utf-8") as handle:
+            entry = next(item for item in json.load(handle)["tables"] if item["name"] == table)
+        width = len(entry["columns"])
+        picks = [entry["columns"].index(column) for column in columns]
+    else:
+        width = len(columns)
+        picks = range(width)
+
+    def feed(block):
+        fields = copy_fields(block, width)
+        if fields:
+            parts.append(convert(*[fields[i::width] for i in picks]))
+
+    if isinstance(source, str):
+        for name in entry["files"]:
+            read_copy_file(os.path.join(source, name), feed)
+    else:
+        from psycopg2 import sql
+
+        statement = sql.SQL("COPY {} ({}) TO STDOUT").format(sql.Identifier(table), sql.SQL(", ").join(map(sql.Identifier, columns)))
+        source.copy_out(statement, feed)
+    return parts
+
+
+def _thana_ids(values):
+    return np.array([-1 if value == b"\\N" else int(value) for value in values], dtype=np.int32)
+
+
+@dataclass
+class Graph:
+    """Undirected CSR adjacency: criminals are nodes [0, criminals), organizations follow."""
+
+    indptr: np.ndarray
+    indices: np.ndarray
+    keys: np.ndarray
+    criminals: int
+    thanas: np.ndarray
+    relations: int = 0
+    memberships: int = 0
+
+    @property
+    def nodes(self):
+        return len(self.indptr) - 1
+
+    def degree(self):
+        return np.diff(self.indptr)
+
+    def neighbours(self, node):
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def node(self, text):
+        """Node index of a criminal or organization UUID, or None."""
+        found = np.flatnonzero(self.keys == uuid_keys([text.encode()])[0])
+        return int(found[0]) if len(found) else None
+
+
+def csr(nodes, sources, targets):
+    """indptr/indices for the undirected graph with these edges; parallel edges are kept as stronger ties."""
+    rows = np.concatenate([sources, targets])
+    order = np.argsort(rows, kind="stable")
+    indptr = np.zeros(nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=nodes), out=indptr[1:])
+    del rows
+    return indptr, np.concatenate([targets, sources])[order].astype(np.int32, copy=False)
+
+
+def _hashed(keys):
+    # 64-bit mix of both halves: searching uint64 is several times faster than 16-byte strings.
+    halves = keys.view(">u8").reshape(-1, 2).astype(np.uint64)
+    return halves[:, 0] * np.uint64(0x9E3779B97F4A7C15) ^ halves[:, 1]
+
+
+def _lookup(index, keys, hashes):
+    """Node index of every key, or -1; index is (sorted hashes, their node order, node keys)."""
+    sorted_hashes, order, node_keys = index
+    # Sorted needles walk the haystack in order instead of missing the cache on every probe.
+    needles = np.argsort(hashes)
+    position = np.empty_like(needles)
+    position[needles] = np.searchsorted(sorted_hashes, hashes[needles])
+    nodes = order[np.minimum(position, len(sorted_hashes) - 1)]
+    # The full key comparison rules out a (vanishingly unlikely) 64-bit collision.
+    return np.where(node_keys[nodes] == keys, nodes, -1).astype(np.int32)
+
+
+def load_graph(source):
+    """Bulk-load criminals, organizations, criminal_relations and criminal_organizations into a Graph."""
+    people = scan(source, "criminals", ["criminal_id", "registered_thana_id"], lambda ids, thanas: (uuid_keys(ids), _thana_ids(thanas)))
+    groups = scan(source, "organizations", ["org_id"], uuid_keys)
+    criminal_keys = np.concatenate([keys for keys, _ in people]) if people else np.zeros(0, dtype="S16")
+    thanas = np.concatenate([ids for _, ids in people]) if people else np.zeros(0, dtype=np.int32)
+    keys = np.concatenate([criminal_keys, *groups])
+    hashes = _hashed(keys)
+    order = np.argsort(hashes)
+    index = (hashes[order], order, keys)
+
+    def pairs(first, second):
+        ends = [uuid_keys(first), uuid_keys(second)]
+        return tuple(_lookup(index, end, _hashed(end)) for end in ends)
+
+    relations = scan(source, "criminal_relations", ["criminal_id_1", "criminal_id_2"], pairs)
+    memberships = scan(source, "criminal_organizations", ["criminal_id", "org_id"], pairs)
+    counts = sum(len(a) for a, _ in relations), sum(len(a) for a, _ in memberships)
+    sources = np.concatenate([np.zeros(0, dtype=np.int32)] + [a for a, _ in relations + memberships])
+    targets = np.concatenate([np.zeros(0, dtype=np.int32)] + [b for _, b in relations + memberships])
+    del relations, memberships
+    # Rows whose ends are not loaded (deleted in between, or filtered dumps) are dropped.
+    keep = (sources >= 0) & (targets >= 0)
+    if not keep.all():
+        sources, targets = sources[keep], targets[keep]
+    graph = Graph(*csr(len(keys), sources, targets), keys, len(criminal_keys), thanas)
+    graph.relations, graph.memberships = counts
+    return graph
+
+
+def _expand(graph, frontier):
+    # Neighbours of every frontier node in one gather, with the frontier node each was reached from.
+    starts = graph.indptr[frontier]
+    lengths = graph.indptr[frontier + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return graph.indices[offsets], np.repeat(frontier, lengths)
+
+
+def bfs(graph, sources, max_depth=None, target=None):
+    """Hop distance to the nearest source (-1 if unreached) and the BFS parent of every node.
+
+    One frontier is expanded per level with array operations; target stops the search once reached.
+    """
+    distance = np.full(graph.nodes, -1, dtype=np.int32)
+    parent = np.full(graph.nodes, -1, dtype=np.int32)
+    frontier = np.unique(np.asarray(sources, dtype=np.int32))
+    distance[frontier] = 0
+    depth = 0
+    while len(frontier) and (max_depth is None or depth < max_depth) and (target is None or distance[target] < 0):
+        depth += 1
+        reached, via = _expand(graph, frontier)
+        fresh = distance[reached] < 0
+        frontier, first = np.unique(reached[fresh], return_index=True)
+        distance[frontier] = depth
+        parent[frontier] = via[fresh][first]
+    return distance, parent
+
+
+def shortest_path(graph, source, target, max_depth=MAX_DEPTH):
+    """Nodes from source to target (through organizations too), or [] beyond max_depth."""
+    distance, parent = bfs(graph, [source], max_depth, target)
+    if distance[target] < 0:
+        return []
+    path = [target]
+    while path[-1] != source:
+        path.append(int(parent[path[-1]]))
+    return path[::-1]
+
+
+def k_hop(graph, sources, k):
+    """(nodes, distances) within k hops of the sources, the sources themselves excluded."""
+    distance, _ = bfs(graph, sources, k)
+    nodes = np.flatnonzero(distance > 0)
+    return nodes, distance[nodes]
+
+
+def components(graph):
+    """Connected component label (smallest member) per node: hook roots along edges, then pointer-jump."""
+    labels = np.arange(graph.nodes, dtype=np.int32)
+    rows = np.repeat(labels, graph.degree())
+    forward = rows < graph.indices
+    sources, targets = rows[forward], graph.indices[forward]
+    while True:
+        a, b = labels[sources], labels[targets]
+        moved = a != b
+        if not moved.any():
+            return labels
+        np.minimum.at(labels, np.maximum(a[moved], b[moved]), np.minimum(a[moved], b[moved]))
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+
+def pagerank(graph, damping=DAMPING, iterations=PAGERANK_ITERATIONS, tolerance=PAGERANK_TOLERANCE):
+    """Power iteration; isolated nodes spread their rank evenly. Scores sum to 1."""
+    n = graph.nodes
+    if not n:
+        return np.zeros(0)
+    degree = graph.degree()
+    linked = np.flatnonzero(degree)
+    starts = graph.indptr[:-1][linked]
+    isolated = degree == 0
+    rank = np.full(n, 1.0 / n)
+    incoming = np.zeros(n)
+    for _ in range(iterations):
+        share = np.divide(rank, degree, out=np.zeros(n), where=~isolated)
+        if len(linked):
+            incoming[linked] = np.add.reduceat(share[graph.indices], starts)
+        updated = (1 - damping) / n + damping * (incoming + rank[isolated].sum() / n)
+        change = np.abs(updated - rank).sum()
+        rank = updated
+        if change < tolerance:
+            break
+    return rank
+
+
+@dataclass
+class NetworkSummary:
+    criminals: int
+    organizations: int
+    relations: int
+    memberships: int
+    components: int
+    largest: int
+    isolated: int
+    # (thana, criminal name, degree, score relative to the average criminal)
+    central: list = field(default_factory=list)
+
+
+def _names(source, table, key_column, name_column, wanted):
+    wanted = set(wanted)
+
+    def pick(keys, names):
+        return [(key, name) for key, name in zip(keys, names) if key in wanted]
+
+    return {key: name.decode("utf-8", "replace") for part in scan(source, table, [key_column, name_column], pick) for key, name in part}
+
+
+def summarize(graph, source, rank=None, labels=None, top=TOP_PER_THANA):
+    """Component counts and the top-ranked criminals of every thana, by PageRank over the whole network."""
+    rank = pagerank(graph) if rank is None else rank
+    labels = components(graph) if labels is None else labels
+    people = slice(0, graph.criminals)
+    sizes = np.bincount(labels[people], minlength=graph.nodes)
+    degree = graph.degree()
+    summary = NetworkSummary(
+        graph.criminals,
+        graph.nodes - graph.criminals,
+        graph.relations,
+        graph.memberships,
+        len(np.unique(labels)),
+        int(sizes.max()) if graph.criminals else 0,
+        int(np.count_nonzero(degree[people] == 0)),
+    )
+    scores = rank[people]
+    order = np.lexsort((-scores, graph.thanas))
+    thanas = graph.thanas[order]
+    first = np.searchsorted(thanas, thanas, side="left")
+    chosen = order[(np.arange(len(order)) - first < top) & (thanas >= 0) & (degree[order] > 0)]
+    keys = [uuid_text(key).encode() for key in graph.keys[chosen]]
+    names = _names(source, "criminals", "criminal_id", "full_name", keys)
+    thana_names = _names(source, "thanas", "thana_id", "name", {str(int(t)).encode() for t in graph.thanas[chosen]})
+    mean = scores.mean() if len(scores) else 1.0
+    for node, key in zip(chosen, keys):
+        thana = thana_names.get(str(int(graph.thanas[node])).encode(), str(int(graph.thanas[node])))
+        summary.central.append((thana, names.get(key, key.decode()), int(degree[node]), float(scores[node] / mean)))
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load the criminal network into CSR arrays and time BFS, components, k-hop and PageRank.")
+    parser.add_argument("--dsn", help="load from a running database with COPY TO STDOUT ('' uses PG* variables)")
+    parser.add_argument("--dump", default=OUTPUT_DIR, help="synth_data.py output directory, used without --dsn")
+    parser.add_argument("--path", nargs=2, metavar="UUID", help="shortest chain between two criminals or organizations")
+    parser.add_argument("--hops", type=int, default=2, help="k of the k-hop neighbourhood timed from the most connected criminal")
+    args = parser.parse_args(argv)
+
+    pool = None
+    if args.dsn is not None:
+        from catalog_introspect import ConnectionPool
+
+        pool = ConnectionPool(args.dsn)
+    source = pool or args.dump
+    started = time.perf_counter()
+    graph = load_graph(source)
+    print(
+        f"{graph.criminals:,} criminals, {graph.nodes - graph.criminals:,} organizations, {graph.relations:,} relations, "
+        f"{graph.memberships:,} memberships loaded into CSR in {time.perf_counter() - started:.2f}s"
+    )
+    if graph.criminals:
+        hub = int(np.argmax(graph.degree()[:graph.criminals]))
+        timings = {}
+        started = time.perf_counter()
+        distance, _ = bfs(graph, [hub])
+        timings["bfs"] = time.perf_counter() - started
+        started = time.perf_counter()
+        nodes, _ = k_hop(graph, [hub], args.hops)
+        timings[f"{args.hops}-hop"] = time.perf_counter() - started
+        started = time.perf_counter()
+        labels = components(graph)
+        timings["components"] = time.perf_counter() - started
+        started = time.perf_counter()
+        rank = pagerank(graph)
+        timings["pagerank"] = time.perf_counter() - started
+        print(
+            f"from {uuid_text(graph.keys[hub])}: {np.count_nonzero(distance >= 0):,} nodes reachable, "
+            f"{len(nodes):,} within {args.hops} hops, eccentricity {distance.max()}"
+        )
+        print("  ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items()))
+        summary = summarize(graph, source, rank, labels)
+        print(f"{summary.components:,} components, largest holds {summary.largest:,} criminals, {summary.isolated:,} criminals without ties")
+        for thana, name, degree, score in summary.central[:15]:
+            print(f"  {thana:<28} {name:<32} degree {degree:>5}  {score:>6.1f}x average")
+    if args.path:
+        ends = [graph.node(text) for text in args.path]
+        if None in ends:
+            print("unknown UUID", file=sys.stderr)
+            return 1
+        path = shortest_path(graph, *ends)
+        print(" → ".join(uuid_text(graph.keys[node]) for node in path) if path else f"no chain within {MAX_DEPTH} hops")
+    if pool:
+        pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
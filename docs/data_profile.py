@@ -0,0 +1,425 @@
+import argparse
+import json
+import math
+import os
+import re
+import resource
+import sys
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from schema_catalog import SERIAL_TYPES, load_catalog
+from synth_data import OUTPUT_DIR
+
+# 4,096 one-byte registers: about 1.6% standard error on distinct counts.
+HLL_PRECISION = 12
+SKETCH_DEPTH = 4
+SKETCH_WIDTH = 4096
+# Odd multipliers and offsets of the sketch rows' hash functions.
+SKETCH_SEEDS = ((0x9E3779B1, 0x7F4A7C15), (0x85EBCA77, 0x165667B1), (0xC2B2AE3D, 0x27D4EB2F), (0x61C88647, 0x3C6EF372))
+TOP_K = 5
+# Heavy-hitter candidates kept per column; only their counts are ever read back from the sketch.
+CANDIDATES = 64
+BINS = 32
+# Up to this many bytes of COPY text are split into rows at a time.
+CHUNK_BYTES = 2 << 20
+# Every worker process holds its own profiles and COPY block, so a dump pass needs about this many times one
+# worker's peak RSS on top of the parent's.
+MAX_WORKERS = 4
+NULL = b"\\N"
+
+NUMBER_TYPES = {"INT", "BIGINT", "SMALLINT", "REAL", "DOUBLE PRECISION", *SERIAL_TYPES}
+# Credentials: only the null rate and distinct count are kept, never a value.
+SECRET_COLUMN = re.compile(r"password|passwd|secret|token|salt|hash", re.I)
+COPY_ESCAPES = {b"\\t": b"\t", b"\\n": b"\n", b"\\r": b"\r", b"\\\\": b"\\"}
+
+
+def hash_values(values):
+    """32-bit hashes of byte strings: crc32, then the murmur3 finalizer so every bit is mixed."""
+    hashes = np.fromiter(map(zlib.crc32, values), dtype=np.uint32, count=len(values))
+    hashes ^= hashes >> 16
+    hashes *= np.uint32(0x85EBCA6B)
+    hashes ^= hashes >> 13
+    hashes *= np.uint32(0xC2B2AE35)
+    hashes ^= hashes >> 16
+    return hashes
+
+
+@dataclass
+class HyperLogLog:
+    registers: np.ndarray = field(default_factory=lambda: np.zeros(1 << HLL_PRECISION, dtype=np.uint8))
+
+    def add(self, hashes):
+        rest_bits = 32 - HLL_PRECISION
+        index = hashes >> rest_bits
+        rest = (hashes & np.uint32((1 << rest_bits) - 1)).astype(np.float64)
+        # Position of the leftmost 1 bit in the remaining bits; frexp's exponent is the bit length.
+        rank = (rest_bits + 1 - np.frexp(rest)[1]).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self):
+        m = len(self.registers)
+        raw = 0.7213 / (1 + 1.079 / m) * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int32))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        if raw > 2 ** 32 / 30:
+            return round(-(2 ** 32) * math.log(1 - raw / 2 ** 32))
+        return round(raw)
+
+
+@dataclass
+class CountMinSketch:
+    table: np.ndarray = field(default_factory=lambda: np.zeros((SKETCH_DEPTH, SKETCH_WIDTH), dtype=np.int64))
+
+    def _slots(self, hashes):
+        wide = hashes.astype(np.uint64)
+        return [((wide * np.uint64(a) + np.uint64(b)) >> np.uint64(16)) % np.uint64(SKETCH_WIDTH) for a, b in SKETCH_SEEDS]
+
+    def add(self, hashes, counts):
+        for row, slots in zip(self.table, self._slots(hashes)):
+            row += np.bincount(slots.astype(np.intp), weights=counts, minlength=SKETCH_WIDTH).astype(np.int64)
+
+    def estimate(self, hashes):
+        return np.min([row[slots.astype(np.intp)] for row, slots in zip(self.table, self._slots(hashes))], axis=0)
+
+    def merge(self, other):
+        self.table += other.table
+
+
+@dataclass
+class Histogram:
+    """Fixed number of equal-width bins whose width doubles as the observed range grows, so it never holds values."""
+
+    integral: bool = False
+    low: float = 0.0
+    width: float = 0.0
+    counts: np.ndarray = field(default_factory=lambda: np.zeros(BINS, dtype=np.int64))
+    minimum: float = math.inf
+    maximum: float = -math.inf
+
+    def _cover(self, minimum, maximum, width):
+        # Power-of-two widths keep old bins nested in new ones, so re-binning never splits a count.
+        while math.floor(minimum / width) * width + BINS * width <= maximum:
+            width *= 2
+        low = math.floor(minimum / width) * width
+        if self.width and (width, low) != (self.width, self.low):
+            starts = self.low + self.width * np.arange(BINS)
+            target = np.floor((starts - low) / width).astype(np.intp)
+            self.counts = np.bincount(target, weights=self.counts, minlength=BINS).astype(np.int64)
+        self.low, self.width = low, width
+
+    def add(self, values, counts):
+        if not len(values):
+            return
+        minimum = min(self.minimum, float(values.min()))
+        maximum = max(self.maximum, float(values.max()))
+        width = self.width
+        if not width:
+            span = (maximum - minimum) / BINS
+            width = 1.0 if self.integral and span <= 1 else 2.0 ** math.ceil(math.log2(span)) if span > 0 else 1.0
+        self._cover(minimum, maximum, width)
+        self.minimum, self.maximum = minimum, maximum
+        bins = np.floor((values - self.low) / self.width).astype(np.intp)
+        self.counts += np.bincount(bins, weights=counts, minlength=BINS).astype(np.int64)
+
+    def merge(self, other):
+        if not other.width:
+            return
+        minimum, maximum = min(self.minimum, other.minimum), max(self.maximum, other.maximum)
+        self._cover(minimum, maximum, max(self.width, other.width))
+        starts = other.low + other.width * np.arange(BINS)
+        self.counts += np.bincount(np.floor((starts - self.low) / self.width).astype(np.intp), weights=other.counts, minlength=BINS).astype(np.int64)
+        self.minimum, self.maximum = minimum, maximum
+
+    def quantile(self, q):
+        total = int(self.counts.sum())
+        if not total:
+            return None
+        cumulative = np.cumsum(self.counts)
+        i = int(np.searchsorted(cumulative, q * total))
+        before = cumulative[i - 1] if i else 0
+        value = self.low + self.width * (i + (q * total - before) / max(self.counts[i], 1))
+        return min(max(value, self.minimum), self.maximum)
+
+    def bins(self):
+        """(start, count) for every non-empty bin."""
+        return [(self.low + self.width * i, int(count)) for i, count in enumerate(self.counts) if count]
+
+
+def _parse(kind, values):
+    raw = np.array(values, dtype=np.bytes_)
+    if kind == "date":
+        return raw.astype("datetime64[D]").astype(np.int64)
+    if kind == "timestamp":
+        # Local wall-clock time: the "+06" offset is cut off with the fractional seconds.
+        return raw.astype("S19").astype("datetime64[s]").astype(np.int64)
+    return raw.astype(np.float64)
+
+
+def column_kind(table, column):
+    """secret or key (distinct only), reference/text (top values), or number/date/timestamp (histogram)."""
+    if SECRET_COLUMN.search(column.name):
+        return "secret"
+    if [column.name] == list(table.primary_key) or (column.name,) in map(tuple, table.uniques):
+        return "key"
+    if any(column.name in fk.columns for fk in table.foreign_keys):
+        return "reference"
+    if column.data_type in NUMBER_TYPES or column.data_type.startswith(("NUMERIC", "DECIMAL")):
+        return "number"
+    if column.data_type == "DATE":
+        return "date"
+    if column.data_type.startswith("TIMESTAMP"):
+        return "timestamp"
+    return "text"
+
+
+@dataclass
+class ColumnProfile:
+    name: str
+    kind: str
+    rows: int = 0
+    nulls: int = 0
+    distinct: HyperLogLog = field(default_factory=HyperLogLog)
+    sketch: CountMinSketch | None = None
+    candidates: dict = field(default_factory=dict)
+    histogram: Histogram | None = None
+
+    def __post_init__(self):
+        if self.kind in ("reference", "text") and self.sketch is None:
+            self.sketch = CountMinSketch()
+        if self.kind in ("number", "date", "timestamp") and self.histogram is None:
+            self.histogram = Histogram(integral=self.kind != "timestamp")
+
+    def add(self, values):
+        # Duplicates within a chunk are counted once by Counter, so the sketches only see distinct values.
+        counts = Counter(values)
+        self.rows += len(values)
+        self.nulls += counts.pop(NULL, 0)
+        if not counts:
+            return
+        keys = list(counts)
+        weights = np.fromiter(counts.values(), dtype=np.float64, count=len(keys))
+        hashes = hash_values(keys)
+        self.distinct.add(hashes)
+        if self.sketch is not None:
+            self.sketch.add(hashes, weights)
+            self._keep(value for value, _ in counts.most_common(CANDIDATES))
+        if self.histogram is not None:
+            self.histogram.add(_parse(self.kind, keys), weights)
+
+    def _keep(self, values):
+        candidates = list(dict.fromkeys([*self.candidates, *values]))
+        estimates = self.sketch.estimate(hash_values(candidates))
+        order = np.argsort(-estimates, kind="stable")[:CANDIDATES]
+        self.candidates = {candidates[i]: int(estimates[i]) for i in order}
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.distinct.merge(other.distinct)
+        if self.sketch is not None:
+            self.sketch.merge(other.sketch)
+            self._keep(other.candidates)
+        if self.histogram is not None:
+            self.histogram.merge(other.histogram)
+
+    def top(self, k=TOP_K):
+        """[(value, estimated count)] for the most frequent values."""
+        return [(_unescape(value), count) for value, count in list(self.candidates.items())[:k]]
+
+
+@dataclass
+class TableProfile:
+    name: str
+    columns: list
+    rows: int = 0
+    seconds: float = 0.0
+
+    def feed(self, block):
+        """Add a block of complete COPY text lines."""
+        width = len(self.columns)
+        fields = copy_fields(block, width)
+        self.rows += len(fields) // width
+        for i, column in enumerate(self.columns):
+            column.add(fields[i::width])
+
+    def merge(self, other):
+        self.rows += other.rows
+        self.seconds += other.seconds
+        for column, theirs in zip(self.columns, other.columns):
+            column.merge(theirs)
+
+
+def _unescape(value):
+    for escape, char in COPY_ESCAPES.items():
+        value = value.replace(escape, char)
+    return value.decode("utf-8", "replace")
+
+
+def new_profile(catalog, name, columns):
+    table = catalog.tables[name]
+    return TableProfile(name, [ColumnProfile(column, column_kind(table, table.column(column))) for column in columns])
+
+
+def copy_fields(block, width):
+    """All fields of a block of complete COPY text lines, row after row; column i is fields[i::width]."""
+    block = block.rstrip(b"\n")
+    if not block:
+        return []
+    # Every COPY row has one field per column, so one split over tabs and line breaks and a
+    # strided slice per column replace splitting row by row.
+    fields = block.replace(b"\n", b"\t").split(b"\t")
+    if len(fields) % width:
+        raise ValueError(f"COPY rows do not have {width} fields")
+    return fields
+
+
+def read_copy_file(path, feed, chunk_bytes=CHUNK_BYTES):
+    """Call feed() with blocks of complete lines from a COPY text file."""
+    pending = b""
+    with open(path, "rb") as handle:
+        while True:
+            data = handle.read(chunk_bytes)
+            if not data:
+                break
+            data = pending + data
+            cut = data.rfind(b"\n") + 1
+            feed(data[:cut])
+            pending = data[cut:]
+    feed(pending)
+
+
+def profile_file(catalog, name, columns, path):
+    started = time.perf_counter()
+    profile = new_profile(catalog, name, columns)
+    read_copy_file(path, profile.feed)
+    profile.seconds = time.perf_counter() - started
+    return profile
+
+
+def profile_dump(catalog, directory=OUTPUT_DIR, tables=None, workers=None):
+    """Profile the COPY files of a synth_data.py dump (manifest.json), one file per worker task."""
+    with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as handle:
+        manifest = json.load(handle)
+    entries = [entry for entry in manifest["tables"] if entry["name"] in catalog.tables and (not tables or entry["name"] in tables)]
+    files = sum(len(entry["files"]) for entry in entries)
+    profiles = {}
+    with ProcessPoolExecutor(max_workers=max(1, min(workers or MAX_WORKERS, MAX_WORKERS, files))) as executor:
+        futures = {
+            entry["name"]: [
+                executor.submit(profile_file, catalog, entry["name"], entry["columns"], os.path.join(directory, name))
+                for name in entry["files"]
+            ]
+            for entry in entries
+        }
+        for entry in entries:
+            profile = new_profile(catalog, entry["name"], entry["columns"])
+            for future in futures[entry["name"]]:
+                profile.merge(future.result())
+            profiles[entry["name"]] = profile
+    return profiles
+
+
+def profile_table(pool, catalog, name):
+    from psycopg2 import sql
+
+    started = time.perf_counter()
+    columns = [column.name for column in catalog.tables[name].columns]
+    profile = new_profile(catalog, name, columns)
+    statement = sql.SQL("COPY {} ({}) TO STDOUT").format(sql.Identifier(name), sql.SQL(", ").join(map(sql.Identifier, columns)))
+    pool.copy_out(statement, profile.feed, CHUNK_BYTES)
+    profile.seconds = time.perf_counter() - started
+    return profile
+
+
+def profile_database(pool, catalog, tables=None):
+    """Stream every table once with COPY TO STDOUT, a table per pooled connection."""
+    names = [name for name in catalog.tables if not tables or name in tables]
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        return dict(zip(names, executor.map(lambda name: profile_table(pool, catalog, name), names)))
+
+
+def format_value(kind, value):
+    if kind == "date":
+        return str(np.datetime64(int(math.floor(value)), "D"))
+    if kind == "timestamp":
+        return str(np.datetime64(int(value), "s")).replace("T", " ")[:16]
+    return f"{value:,.0f}" if float(value).is_integer() else f"{value:,.2f}"
+
+
+def distribution(column):
+    """One line describing a column's values: top values, per-value shares or range and median."""
+    present = column.rows - column.nulls
+    if not present:
+        return "all null"
+    if column.kind == "key":
+        return "unique key"
+    if column.kind == "secret":
+        return "values withheld"
+    if column.histogram is not None:
+        histogram = column.histogram
+        bins = histogram.bins()
+        if histogram.integral and histogram.width == 1 and len(bins) <= 12 and column.kind == "number":
+            return " · ".join(f"{format_value(column.kind, start)}: {count / present:.0%}" for start, count in bins)
+        return (
+            f"{format_value(column.kind, histogram.minimum)} … {format_value(column.kind, histogram.maximum)}, "
+            f"median ≈ {format_value(column.kind, histogram.quantile(0.5))}"
+        )
+    top = column.top()
+    if top[0][1] < 0.01 * present:
+        return "no value above 1%"
+    return " · ".join(f"{_shorten(value) or '(empty)'} {count / present:.0%}" for value, count in top)
+
+
+def _shorten(value, limit=40):
+    return value if len(value) <= limit else value[:limit - 1] + "…"
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Peak RSS of this process, or with RUSAGE_CHILDREN of the largest finished worker (not their sum)."""
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile table contents in one streaming pass: nulls, distinct counts, top values, histograms.")
+    parser.add_argument("--dsn", help="stream from a running database with COPY TO STDOUT ('' uses PG* variables)")
+    parser.add_argument("--dump", default=OUTPUT_DIR, help="synth_data.py output directory, used without --dsn")
+    parser.add_argument("--table", action="append", help="profile only this table (repeatable)")
+    parser.add_argument("--workers", type=int, default=min(os.cpu_count(), MAX_WORKERS), help=f"worker processes for --dump (at most {MAX_WORKERS})")
+    args = parser.parse_args(argv)
+
+    catalog = load_catalog()
+    started = time.perf_counter()
+    if args.dsn is not None:
+        from catalog_introspect import ConnectionPool
+
+        pool = ConnectionPool(args.dsn)
+        profiles = profile_database(pool, catalog, args.table)
+        pool.close()
+    else:
+        profiles = profile_dump(catalog, args.dump, args.table, args.workers)
+    elapsed = time.perf_counter() - started
+    rows = sum(profile.rows for profile in profiles.values())
+    memory = f"peak RSS {peak_rss_mb():.0f} MB"
+    if args.dsn is None:
+        memory += f", {peak_rss_mb(resource.RUSAGE_CHILDREN):.0f} MB per worker (at most {min(args.workers, MAX_WORKERS)} at once)"
+    print(f"{rows:,} rows in {len(profiles)} tables profiled in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s), {memory}")
+    for profile in profiles.values():
+        print(f"{profile.name}: {profile.rows:,} rows")
+        for column in profile.columns:
+            nulls = column.nulls / column.rows if column.rows else 0
+            print(f"  {column.name:<28} nulls {nulls:>5.1%}  distinct ≈ {column.distinct.estimate():>12,}  {distribution(column)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
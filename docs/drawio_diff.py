@@ -0,0 +1,297 @@
+import argparse
+import base64
+import codecs
+import difflib
+import html
+import os
+import re
+import sys
+import time
+import xml.etree.ElementTree as ET
+import zlib
+from dataclasses import dataclass, field
+from urllib.parse import unquote_to_bytes
+
+from schema_catalog import load_catalog
+
+DIAGRAM_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "jailmanagement.drawio")
+# Diagram names are hand-typed ("gd_report", "arrest_recoeds"); closer matches than this pair with a table.
+NAME_CUTOFF = 0.75
+CHUNK_SIZE = 1 << 16
+TAG = re.compile(r"<[^>]+>")
+
+
+@dataclass
+class Attribute:
+    name: str
+    key: str = ""
+
+
+@dataclass
+class Entity:
+    id: str
+    name: str
+    attributes: list = field(default_factory=list)
+
+
+@dataclass
+class Edge:
+    id: str
+    source: str | None
+    target: str | None
+    label: str = ""
+
+
+@dataclass
+class Diagram:
+    entities: dict = field(default_factory=dict)
+    relationships: dict = field(default_factory=dict)
+    edges: list = field(default_factory=list)
+    owners: dict = field(default_factory=dict)
+    cells: int = 0
+
+    def connections(self):
+        """Yield (relationship, [(entity, cardinality), ...]); a direct entity-to-entity edge is its own relationship."""
+        participants = {cell_id: [] for cell_id in self.relationships}
+        for edge in self.edges:
+            ends = [self.owners.get(edge.source, edge.source), self.owners.get(edge.target, edge.target)]
+            hubs = [end for end in ends if end in participants]
+            entities = [self.entities[end].name for end in ends if end in self.entities]
+            if hubs and entities:
+                participants[hubs[0]].append((entities[0], edge.label))
+            elif len(entities) == 2:
+                yield edge.label or edge.id, [(entities[0], ""), (entities[1], "")]
+        for cell_id, name in self.relationships.items():
+            yield name, participants[cell_id]
+
+
+@dataclass
+class DiagramDiff:
+    renamed: list = field(default_factory=list)
+    missing_tables: list = field(default_factory=list)
+    extra_entities: list = field(default_factory=list)
+    missing_columns: dict = field(default_factory=dict)
+    extra_attributes: dict = field(default_factory=dict)
+    key_mismatches: dict = field(default_factory=dict)
+    missing_relationships: list = field(default_factory=list)
+    extra_relationships: list = field(default_factory=list)
+    unconnected: list = field(default_factory=list)
+
+    @property
+    def clean(self):
+        return not any(getattr(self, name) for name in self.__dataclass_fields__ if name != "renamed")
+
+
+def cell_text(value):
+    # html=1 cells keep their label as markup, e.g. "<b>admin</b>&nbsp;".
+    return " ".join(html.unescape(TAG.sub(" ", value or "")).split())
+
+
+def _inflate(payload):
+    """Yield the XML text of a compressed <diagram>: base64, raw deflate, then URL-encoding, a chunk at a time."""
+    payload = "".join(payload.split())
+    inflater = zlib.decompressobj(-zlib.MAX_WBITS)
+    # The escapes spell UTF-8 bytes, and a multibyte character can straddle two chunks.
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = b""
+    for start in range(0, len(payload), CHUNK_SIZE):
+        data = pending + inflater.decompress(base64.b64decode(payload[start:start + CHUNK_SIZE]))
+        # Hold back a %XX escape split across chunks.
+        cut = data.rfind(b"%", max(0, len(data) - 2))
+        data, pending = (data[:cut], data[cut:]) if cut >= 0 else (data, b"")
+        yield decoder.decode(unquote_to_bytes(data))
+    yield decoder.decode(unquote_to_bytes(pending + inflater.flush()), final=True)
+
+
+class _Reader:
+    """Turns mxCell start/end events into a Diagram; only the open element path stays in the tree."""
+
+    def __init__(self):
+        self.diagram = Diagram()
+        self.wrapper = None
+        self.rows = {}
+
+    def feed(self, events, path):
+        for event, element in events:
+            if event == "start":
+                path.append(element)
+                if element.tag in ("object", "UserObject"):
+                    self.wrapper = element.attrib
+                continue
+            path.pop()
+            if element.tag == "mxCell":
+                self.cell(element.attrib)
+            elif element.tag in ("object", "UserObject"):
+                self.wrapper = None
+            elif element.tag == "diagram" and (element.text or "").strip():
+                self.compressed(element.text)
+            # Detach finished elements so the tree never holds more than the current path.
+            if path:
+                path[-1].remove(element)
+
+    def compressed(self, payload):
+        parser = ET.XMLPullParser(events=("start", "end"))
+        path = []
+        for text in _inflate(payload):
+            parser.feed(text)
+            self.feed(parser.read_events(), path)
+        parser.close()
+        self.feed(parser.read_events(), path)
+
+    def cell(self, attrib):
+        diagram = self.diagram
+        diagram.cells += 1
+        cell_id = attrib.get("id")
+        value = attrib.get("value")
+        if self.wrapper is not None:
+            cell_id = self.wrapper.get("id", cell_id)
+            value = self.wrapper.get("label", value)
+        style = attrib.get("style") or ""
+        shape = style.split(";", 1)[0]
+        parent = attrib.get("parent")
+        if attrib.get("edge") == "1":
+            diagram.edges.append(Edge(cell_id, attrib.get("source"), attrib.get("target"), cell_text(value)))
+        elif shape == "shape=table":
+            diagram.entities[cell_id] = Entity(cell_id, cell_text(value))
+        elif shape == "shape=rhombus":
+            diagram.relationships[cell_id] = cell_text(value)
+        elif parent in diagram.entities:
+            diagram.owners[cell_id] = parent
+            diagram.entities[parent].attributes.append(Attribute(""))
+            self.rows[cell_id] = diagram.entities[parent].attributes[-1]
+        elif parent in diagram.owners:
+            diagram.owners[cell_id] = diagram.owners[parent]
+            row = self.rows.get(parent)
+            text = cell_text(value)
+            if row is not None and text:
+                # A row holds a key cell ("PK", "FK") and a name cell, in that order.
+                if "align=left" in style or row.key or text not in ("PK", "FK", "PK,FK", "FK,PK"):
+                    row.name = row.name or text
+                else:
+                    row.key = text
+
+
+def parse_diagram(path=DIAGRAM_PATH):
+    """Stream a .drawio file (plain or compressed pages) into entities, relationships and edges."""
+    reader = _Reader()
+    reader.feed(ET.iterparse(path, events=("start", "end")), [])
+    for entity in reader.diagram.entities.values():
+        entity.attributes = [attribute for attribute in entity.attributes if attribute.name]
+    return reader.diagram
+
+
+def match_names(names, tables, cutoff=NAME_CUTOFF):
+    """Pair diagram entity names with table names: exact matches first, then the closest remaining pairs."""
+    pairs = {name: name for name in names if name in tables}
+    scored = []
+    for name in names:
+        if name in pairs:
+            continue
+        for table in tables:
+            if table not in pairs.values():
+                ratio = difflib.SequenceMatcher(None, name.lower(), table).ratio()
+                if ratio >= cutoff:
+                    scored.append((-ratio, name, table))
+    for _, name, table in sorted(scored):
+        if name not in pairs and table not in pairs.values():
+            pairs[name] = table
+    return pairs
+
+
+def _expected_links(catalog, drawn):
+    # A relation table such as criminal_organizations is drawn as a relationship between the tables it joins,
+    # unless the diagram gives it an entity of its own.
+    links = {}
+    for table in catalog.tables.values():
+        keys = [] if table.name in drawn else table.relationship_keys()
+        if keys:
+            links[frozenset(fk.ref_table for fk in keys)] = f"{table.name} ({' ↔ '.join(fk.ref_table for fk in keys)})"
+            fks = [fk for fk in table.foreign_keys if fk not in keys]
+        else:
+            fks = table.foreign_keys
+        for fk in fks:
+            links.setdefault(frozenset((fk.table, fk.ref_table)), f"{fk.table}.{', '.join(fk.columns)} → {fk.ref_table}")
+    return links
+
+
+def diff(diagram, catalog):
+    result = DiagramDiff()
+    names = [entity.name for entity in diagram.entities.values()]
+    pairs = match_names(names, catalog.tables)
+    result.renamed = sorted((name, table) for name, table in pairs.items() if name != table)
+    result.missing_tables = sorted(set(catalog.tables) - set(pairs.values()) - {t.name for t in catalog.tables.values() if t.is_relationship()})
+    result.extra_entities = sorted(set(names) - set(pairs))
+
+    for entity in diagram.entities.values():
+        table = catalog.tables.get(pairs.get(entity.name))
+        if table is None:
+            continue
+        drawn = [attribute.name for attribute in entity.attributes]
+        columns = [column.name for column in table.columns]
+        missing = [column for column in columns if column not in drawn]
+        extra = [name for name in drawn if name not in columns]
+        if missing:
+            result.missing_columns[table.name] = missing
+        if extra:
+            result.extra_attributes[table.name] = extra
+        keys = tuple(attribute.name for attribute in entity.attributes if "PK" in attribute.key)
+        if set(keys) != set(table.primary_key):
+            result.key_mismatches[table.name] = (keys, tuple(table.primary_key))
+
+    expected = _expected_links(catalog, set(pairs.values()))
+    drawn_links = set()
+    for name, participants in diagram.connections():
+        tables = {pairs[entity] for entity, _ in participants if entity in pairs}
+        if len(participants) < 2 and len(tables) < 2:
+            result.unconnected.append(name)
+            continue
+        # A self-relationship (criminal_relations) connects one table twice.
+        link = frozenset(tables)
+        drawn_links.add(link)
+        if link not in expected:
+            result.extra_relationships.append(f"{name} ({' – '.join(sorted(tables))})")
+    result.missing_relationships = sorted(
+        label for link, label in expected.items() if link not in drawn_links and link <= set(pairs.values())
+    )
+    result.unconnected.sort()
+    return result
+
+
+def format_diff(result):
+    lines = [f"renamed: {name} → {table}" for name, table in result.renamed]
+    lines += [f"table not in diagram: {table}" for table in result.missing_tables]
+    lines += [f"entity not in schema: {name}" for name in result.extra_entities]
+    lines += [f"{table}: columns not in diagram: {', '.join(columns)}" for table, columns in sorted(result.missing_columns.items())]
+    lines += [f"{table}: attributes not in schema: {', '.join(names)}" for table, names in sorted(result.extra_attributes.items())]
+    lines += [
+        f"{table}: diagram key ({', '.join(drawn) or 'none'}) ≠ primary key ({', '.join(key)})"
+        for table, (drawn, key) in sorted(result.key_mismatches.items())
+    ]
+    lines += [f"foreign key not drawn: {label}" for label in result.missing_relationships]
+    lines += [f"relationship without a foreign key: {label}" for label in result.extra_relationships]
+    lines += [f"relationship not connected to two entities: {name}" for name in result.unconnected]
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Diff a draw.io ERD against the schema catalog.")
+    parser.add_argument("path", nargs="?", default=DIAGRAM_PATH)
+    parser.add_argument("--strict", action="store_true", help="exit 1 when the diagram and the schema differ (renames excepted)")
+    args = parser.parse_args(argv)
+
+    catalog = load_catalog()
+    started = time.perf_counter()
+    diagram = parse_diagram(args.path)
+    result = diff(diagram, catalog)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(
+        f"{diagram.cells} cells, {len(diagram.entities)} entities, {len(diagram.relationships)} relationships, "
+        f"{len(diagram.edges)} edges parsed and diffed in {elapsed_ms:.1f} ms"
+    )
+    for line in format_diff(result):
+        print(f"  {line}")
+    return 1 if args.strict and not result.clean else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
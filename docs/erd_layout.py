@@ -0,0 +1,217 @@
+import json
+import os
+import tempfile
+import time
+import zlib
+
+import numpy as np
+
+from report_cache import CACHE_DIR, digest
+
+LAYOUT_FILE = "layout.json"
+LAYOUT_CACHE = os.path.join(CACHE_DIR, LAYOUT_FILE)
+# Past this many tables boxes show only the table name, and past the second limit the diagram is left out:
+# every iteration compares all pairs of tables.
+COMPACT_TABLES = 60
+MAX_TABLES = 1500
+ITERATIONS = 100
+WARM_ITERATIONS = 40
+# Step limit of a warm run, as a fraction of the ideal distance: known tables only settle around new ones.
+WARM_TEMPERATURE = 0.1
+OVERLAP_PASSES = 30
+GAP = 14.0
+GRAVITY = 0.02
+# Ideal distance between box borders, as a fraction of the mean box size.
+SPACING = 0.5
+FONT = "Helvetica"
+HEADER_FONT = "Helvetica-Bold"
+FONT_SIZE = 7
+LINE = 9
+PADDING = 4
+
+
+def box_size(name, columns):
+    from reportlab.pdfbase.pdfmetrics import stringWidth
+
+    width = stringWidth(name, HEADER_FONT, FONT_SIZE + 1)
+    for column in columns:
+        width = max(width, stringWidth(column, FONT, FONT_SIZE))
+    return round(width + 2 * PADDING, 1), float(LINE + 4 + LINE * len(columns))
+
+
+def column_labels(table):
+    foreign = {column for fk in table.foreign_keys for column in fk.columns}
+    labels = []
+    for column in table.columns:
+        marks = ("PK " if column.name in table.primary_key else "") + ("FK " if column.name in foreign else "")
+        labels.append(f"{marks}{column.name}")
+    return labels
+
+
+def _seeded(names, spread):
+    # Cold positions depend only on the table names, so unrelated edits do not reshuffle the drawing.
+    angles = np.array([zlib.crc32(name.encode()) % 3600 for name in names], dtype=np.float64) * (np.pi / 1800)
+    radii = spread * np.sqrt((np.array([zlib.crc32(name[::-1].encode()) % 1000 for name in names]) + 1) / 1000)
+    return np.column_stack([radii * np.cos(angles), radii * np.sin(angles)])
+
+
+def force_layout(sizes, edges, positions, iterations=ITERATIONS, temperature=None):
+    """Fruchterman-Reingold on box centres, with distances measured between box borders.
+
+    sizes is (n, 2) widths and heights, edges (m, 2) node indexes and positions the (n, 2) start.
+    Every iteration is a handful of (n, n) array operations.
+    """
+    n = len(sizes)
+    positions = positions.astype(np.float64, copy=True)
+    if n < 2:
+        return positions
+    radii = (np.hypot(sizes[:, 0], sizes[:, 1]) / 2).astype(np.float32)
+    reach = radii[:, None] + radii[None, :]
+    k = SPACING * float(np.sqrt((sizes[:, 0] + GAP) @ (sizes[:, 1] + GAP) / n))
+    temperature = k * np.sqrt(n) if temperature is None else temperature
+    source, target = edges[:, 0], edges[:, 1]
+    edge_reach = reach[source, target]
+    floor = np.float32(0.05 * k)
+    for step in range(iterations):
+        # float32 (n, n) work arrays: the pairwise repulsion is all of the cost.
+        x = positions[:, 0].astype(np.float32)
+        y = positions[:, 1].astype(np.float32)
+        dx = x[:, None] - x[None, :]
+        dy = y[:, None] - y[None, :]
+        distance = np.sqrt(dx * dx + dy * dy)
+        gap = np.maximum(distance - reach, floor)
+        np.maximum(distance, 1e-6, out=distance)
+        gap *= distance
+        force = np.divide(k * k, gap, out=gap)
+        np.fill_diagonal(force, 0.0)
+        displacement = np.column_stack([(dx * force).sum(axis=1), (dy * force).sum(axis=1)]).astype(np.float64)
+
+        if len(edges):
+            pull = positions[source] - positions[target]
+            length = np.sqrt((pull ** 2).sum(axis=1))
+            spring = np.maximum(length - edge_reach, 0.0) ** 2 / (k * np.maximum(length, 1e-6))
+            pull *= spring[:, None]
+            np.subtract.at(displacement, source, pull)
+            np.add.at(displacement, target, pull)
+        displacement -= GRAVITY * positions * k / np.sqrt(n)
+
+        length = np.sqrt((displacement ** 2).sum(axis=1))
+        limit = temperature * (1 - step / iterations)
+        positions += displacement * (np.minimum(length, limit) / np.maximum(length, 1e-9))[:, None]
+    return positions
+
+
+def remove_overlaps(sizes, positions, passes=OVERLAP_PASSES):
+    """Push overlapping boxes apart along the axis that needs the smaller move."""
+    half = (sizes / 2 + GAP / 2).astype(np.float32)
+    order = np.arange(len(sizes))
+    # Coincident centres are split deterministically by index.
+    tie = np.sign(order[:, None] - order[None, :]).astype(np.float32)
+    for _ in range(passes):
+        moves = []
+        overlaps = []
+        for axis in (0, 1):
+            values = positions[:, axis].astype(np.float32)
+            delta = values[:, None] - values[None, :]
+            overlaps.append(half[:, None, axis] + half[None, :, axis] - np.abs(delta))
+            moves.append(np.where(delta == 0, tie, np.sign(delta)))
+        np.fill_diagonal(overlaps[0], 0.0)
+        clash = (overlaps[0] > 0) & (overlaps[1] > 0)
+        if not clash.any():
+            break
+        along_x = overlaps[0] < overlaps[1]
+        push_x = np.where(clash & along_x, overlaps[0] * moves[0], 0.0).sum(axis=1)
+        push_y = np.where(clash & ~along_x, overlaps[1] * moves[1], 0.0).sum(axis=1)
+        positions = positions + np.column_stack([push_x, push_y]) / 2
+    return positions
+
+
+def _load_cache(path):
+    try:
+        with open(path, encoding="utf-8") as handle:
+            return json.load(handle)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    with os.fdopen(fd, "w", encoding="utf-8") as handle:
+        json.dump(data, handle)
+    os.replace(tmp_path, path)
+
+
+def layout(names, sizes, edges, cache_path=LAYOUT_CACHE):
+    """Centre positions for every box, reusing the cached layout for tables that were laid out before.
+
+    An unchanged graph is returned straight from the cache; otherwise known tables start where they
+    were, new ones start next to their neighbours, and a short cool run settles the result.
+    """
+    sizes = np.asarray(sizes, dtype=np.float64).reshape(-1, 2)
+    index = {name: i for i, name in enumerate(names)}
+    pairs = np.array([(index[a], index[b]) for a, b in edges], dtype=np.int64).reshape(-1, 2)
+    key = digest(names, sizes.tolist(), sorted(edges), ITERATIONS, SPACING, GAP, GRAVITY)
+    cache = _load_cache(cache_path) if cache_path else {}
+    if cache.get("key") == key:
+        return np.array([cache["positions"][name] for name in names], dtype=np.float64)
+
+    known = cache.get("positions", {})
+    spread = np.sqrt((sizes[:, 0] + GAP) @ (sizes[:, 1] + GAP))
+    positions = _seeded(names, spread / 2)
+    warm = np.array([name in known for name in names])
+    for i, name in enumerate(names):
+        if warm[i]:
+            positions[i] = known[name]
+    if warm.any() and not warm.all():
+        for i in np.flatnonzero(~warm):
+            neighbours = [b if a == i else a for a, b in pairs.tolist() if i in (a, b)]
+            placed = [j for j in neighbours if warm[j]]
+            if placed:
+                positions[i] = positions[placed].mean(axis=0) + (positions[i] - positions[placed].mean(axis=0)) * 0.05
+    if warm.mean() > 0.5:
+        k = SPACING * spread / np.sqrt(len(names))
+        positions = force_layout(sizes, pairs, positions, WARM_ITERATIONS, temperature=WARM_TEMPERATURE * k)
+    else:
+        positions = force_layout(sizes, pairs, positions)
+    positions = remove_overlaps(sizes, positions)
+    positions -= positions.min(axis=0) - sizes.max(axis=0) / 2
+
+    if cache_path:
+        _save_cache(cache_path, {"key": key, "positions": {name: [round(x, 1), round(y, 1)] for name, (x, y) in zip(names, positions)}})
+    return np.round(positions, 1)
+
+
+def diagram_nodes(catalog, cache_path=LAYOUT_CACHE):
+    """(nodes, edges) for the report's diagram block, or None when the schema is too large to draw."""
+    tables = list(catalog.tables.values())
+    if not tables or len(tables) > MAX_TABLES:
+        return None
+    compact = len(tables) > COMPACT_TABLES
+    names = [table.name for table in tables]
+    columns = [() if compact else tuple(column_labels(table)) for table in tables]
+    sizes = [box_size(name, labels) for name, labels in zip(names, columns)]
+    edges = sorted({(fk.table, fk.ref_table) for fk in catalog.foreign_keys() if fk.table != fk.ref_table and fk.ref_table in catalog.tables})
+    positions = layout(names, sizes, edges, cache_path)
+    # Bottom-left corners, y growing upwards as in reportlab.
+    top = max(y + h / 2 for (_, y), (_, h) in zip(positions, sizes))
+    nodes = tuple(
+        (name, round(float(x - w / 2), 1), round(float(top - y - h / 2), 1), w, h, labels)
+        for name, (x, y), (w, h), labels in zip(names, positions, sizes, columns)
+    )
+    return nodes, tuple(edges)
+
+
+if __name__ == "__main__":
+    from bench_report_memory import synthetic_catalog
+    from schema_catalog import load_catalog
+
+    catalog = load_catalog()
+    for label, source in (("schema", catalog), ("500 synthetic tables", synthetic_catalog(500))):
+        for run in ("cold", "cached"):
+            started = time.perf_counter()
+            path = os.path.join(tempfile.gettempdir(), f"erd_layout_{len(source.tables)}.json")
+            if run == "cold" and os.path.exists(path):
+                os.remove(path)
+            diagram_nodes(source, path)
+            print(f"{label}: {run} layout in {(time.perf_counter() - started) * 1000:.0f} ms")
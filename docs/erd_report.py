@@ -1,101 +1,356 @@
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from reportlab.lib.units import cm
+import argparse
+import os
+import time
+from contextlib import nullcontext
+from functools import partial
+
+from report_cache import CACHE_DIR, DEFAULT_MAX_BYTES, SectionCache
+from report_profile import phase, profiling
+from report_render import RENDERERS, bullets, chart, data_table, diagram, escape, heading, page_break, paragraph, render_all, spacer, title
+from cardinality import infer
+from schema_catalog import DDL_FILES, SCHEMA_DIR, SEED_FILE, load_catalog
 
 OUTPUT_PATH = "docs/ERD_Report_Updated.pdf"
+BUFFER_NODE_ROWS = 25
 
-styles = getSampleStyleSheet()
-styles.add(ParagraphStyle(name="TitleCenter", parent=styles["Title"], alignment=1))
-styles.add(ParagraphStyle(name="H1", parent=styles["Heading1"], spaceBefore=12, spaceAfter=6))
-styles.add(ParagraphStyle(name="H2", parent=styles["Heading2"], spaceBefore=10, spaceAfter=4))
-styles.add(ParagraphStyle(name="Body", parent=styles["BodyText"], leading=14, spaceAfter=6))
-styles.add(ParagraphStyle(name="TableCell", parent=styles["BodyText"], leading=12, fontSize=9))
+# Prose that cannot be derived from the DDL; tables and columns themselves come from schema.sql.
+TABLE_NOTES = {
+    "admin": {
+        "summary": "Government admins who create Thanas and control system setup.",
+        "attributes": {
+            "admin_id": "Unique admin ID",
+            "full_name": "Admin name",
+            "email": "Admin email",
+        },
+    },
+    "thanas": {
+        "summary": "Police stations in Bangladesh.",
+        "attributes": {
+            "thana_id": "Unique thana ID",
+            "name": "Thana name",
+            "district": "District name",
+            "address": "Thana address",
+            "created_by_admin_id": "Admin who created the thana",
+            "head_officer_id": "Officer in charge",
+        },
+    },
+    "ranks": {
+        "summary": "Police rank list.",
+        "attributes": {
+            "rank_code": "Rank identifier",
+            "rank_name": "Rank name",
+            "level": "Rank order level",
+        },
+    },
+    "officers": {
+        "summary": "Police officers working in a Thana.",
+        "attributes": {
+            "officer_id": "Unique officer ID",
+            "thana_id": "Officer’s thana",
+            "rank_code": "Officer’s rank",
+            "full_name": "Officer name",
+            "badge_no": "Officer badge number",
+        },
+    },
+    "locations": {
+        "summary": "District and thana area locations.",
+        "attributes": {
+            "location_id": "Unique location ID",
+            "district": "District name",
+            "thana_area": "Local thana area",
+            "address": "Address text",
+        },
+    },
+    "users": {
+        "summary": "Citizens who register and use Online GD.",
+        "attributes": {
+            "user_id": "Unique user ID",
+            "full_name": "User name",
+            "nid_number": "National ID number",
+            "phone": "User phone",
+            "address": "User address",
+            "email": "User email",
+            "password_hash": "Password hash for login",
+        },
+    },
+    "gd_reports": {
+        "summary": "Online GD submissions by citizens.",
+        "attributes": {
+            "gd_id": "Unique GD ID",
+            "user_id": "User who submitted",
+            "thana_id": "Assigned thana",
+            "submitted_at": "Submission time",
+            "description": "GD description",
+            "status": "GD status",
+            "approved_by_officer_id": "Officer who approved",
+        },
+    },
+    "criminals": {
+        "summary": "Criminal profiles managed by Thanas.",
+        "attributes": {
+            "criminal_id": "Unique criminal ID",
+            "full_name": "Criminal name",
+            "nid_or_alias": "NID or alias",
+            "status": "Custody status",
+            "risk_level": "Risk level 1–10",
+            "registered_thana_id": "Thana that registered",
+        },
+    },
+    "organizations": {
+        "summary": "Criminal organizations or gangs.",
+        "attributes": {
+            "org_id": "Unique organization ID",
+            "name": "Organization name",
+            "ideology": "Organization ideology",
+            "threat_level": "Threat level 1–10",
+            "created_at": "Record creation time",
+        },
+    },
+    "criminal_organizations": {
+        "summary": "Membership table that connects criminals to organizations.",
+        "attributes": {
+            "criminal_id": "Linked criminal",
+            "org_id": "Linked organization",
+            "role": "Role in organization",
+        },
+    },
+    "criminal_relations": {
+        "summary": "Criminal-to-criminal relationship table.",
+        "attributes": {
+            "relation_id": "Unique relation ID",
+            "criminal_id_1": "First criminal",
+            "criminal_id_2": "Second criminal",
+            "relation_type": "Relation type",
+        },
+    },
+    "case_files": {
+        "summary": "Case records for criminals under a Thana.",
+        "attributes": {
+            "case_id": "Unique case ID",
+            "case_number": "Case number",
+            "criminal_id": "Linked criminal",
+            "thana_id": "Linked thana",
+            "case_type": "Case type",
+            "status": "Case status",
+            "filed_at": "Case filed time",
+        },
+    },
+    "jails": {
+        "summary": "Jail facilities.",
+        "attributes": {
+            "jail_id": "Unique jail ID",
+            "name": "Jail name",
+            "district": "Jail district",
+            "address": "Jail address",
+            "capacity": "Total capacity",
+        },
+    },
+    "cell_blocks": {
+        "summary": "Blocks inside a jail.",
+        "attributes": {
+            "block_id": "Unique block ID",
+            "jail_id": "Parent jail",
+            "block_name": "Block name",
+            "capacity": "Block capacity",
+        },
+    },
+    "cells": {
+        "summary": "Cells inside a block.",
+        "attributes": {
+            "cell_id": "Unique cell ID",
+            "block_id": "Parent block",
+            "cell_number": "Cell number",
+            "capacity": "Cell capacity",
+            "status": "Cell status",
+        },
+    },
+    "arrest_records": {
+        "summary": "Arrest history for criminals.",
+        "attributes": {
+            "arrest_id": "Unique arrest ID",
+            "criminal_id": "Arrested criminal",
+            "thana_id": "Arresting thana",
+            "arrest_date": "Arrest date",
+            "bail_due_date": "Bail due date",
+            "custody_status": "Custody status",
+            "case_reference": "Case reference",
+        },
+    },
+    "incarcerations": {
+        "summary": "Jail placement for an arrest. (Junction table linking Arrests to Jails/Cells)",
+        "attributes": {
+            "incarceration_id": "Unique incarceration ID",
+            "arrest_id": "Linked arrest",
+            "jail_id": "Jail where kept",
+            "cell_id": "Cell assigned",
+            "admitted_at": "Admit time",
+            "released_at": "Release time",
+        },
+    },
+    "bail_records": {
+        "summary": "Bail details for an arrest.",
+        "attributes": {
+            "bail_id": "Unique bail ID",
+            "arrest_id": "Linked arrest",
+            "court_name": "Court name",
+            "bail_amount": "Bail amount",
+            "granted_at": "Bail date",
+            "surety_name": "Surety name",
+            "status": "Bail status",
+        },
+    },
+    "criminal_locations": {
+        "summary": "Criminals linked to locations for public viewing.",
+        "attributes": {
+            "criminal_location_id": "Unique record ID",
+            "criminal_id": "Linked criminal",
+            "location_id": "Linked location",
+            "noted_at": "Recorded time",
+        },
+    },
+}
+# Relationship verbs for the Chen table, by (referencing table, FK columns); cardinalities come from cardinality.py.
+RELATION_VERBS = {
+    ("thanas", ("created_by_admin_id",)): "registers",
+    ("thanas", ("head_officer_id",)): "heads",
+    ("officers", ("thana_id",)): "employs",
+    ("officers", ("rank_code",)): "assigned_to",
+    ("gd_reports", ("user_id",)): "submits",
+    ("gd_reports", ("thana_id",)): "receives",
+    ("gd_reports", ("approved_by_officer_id",)): "approves",
+    ("criminals", ("registered_thana_id",)): "registers",
+    ("criminal_organizations", ("criminal_id", "org_id")): "member_of",
+    ("criminal_relations", ("criminal_id_1", "criminal_id_2")): "related_to",
+    ("case_files", ("criminal_id",)): "has",
+    ("case_files", ("thana_id",)): "files",
+    ("cell_blocks", ("jail_id",)): "has",
+    ("cells", ("block_id",)): "has",
+    ("arrest_records", ("criminal_id",)): "has",
+    ("arrest_records", ("thana_id",)): "records",
+    ("incarcerations", ("arrest_id",)): "has",
+    ("incarcerations", ("jail_id",)): "holds",
+    ("incarcerations", ("cell_id",)): "assigned_to",
+    ("bail_records", ("arrest_id",)): "has",
+    ("criminal_locations", ("criminal_id",)): "seen_at",
+    ("criminal_locations", ("location_id",)): "sighting_in",
+}
 
 
-def add_table(story, rows):
-    col_count = len(rows[0])
-    if col_count == 2:
-        col_widths = [5.5 * cm, 11.5 * cm]
-    elif col_count == 3:
-        col_widths = [4.5 * cm, 6.0 * cm, 7.0 * cm]
-    else:
-        col_widths = None
+def column_type(table, column):
+    parts = [column.data_type]
+    if column.name in table.primary_key:
+        parts.append("PK")
+    for fk in table.foreign_keys:
+        if column.name in fk.columns:
+            parts.append(f"FK → {fk.ref_table}")
+    if not column.nullable and column.name not in table.primary_key:
+        parts.append("NOT NULL")
+    if column.unique:
+        parts.append("UNIQUE")
+    return ", ".join(parts)
 
-    wrapped_rows = []
-    for row in rows:
-        wrapped_rows.append([Paragraph(str(cell), styles["TableCell"]) for cell in row])
 
-    table = Table(wrapped_rows, colWidths=col_widths)
-    table.setStyle(
-        TableStyle(
-            [
-                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#0b3d91")),
-                ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
-                ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#d0d7de")),
-                ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-                ("VALIGN", (0, 0), (-1, -1), "TOP"),
-            ]
-        )
-    )
-    story.append(table)
-    story.append(Spacer(1, 10))
-
-
-def build():
-    doc = SimpleDocTemplate(
-        OUTPUT_PATH,
-        pagesize=A4,
-        leftMargin=2 * cm,
-        rightMargin=2 * cm,
-        topMargin=2 * cm,
-        bottomMargin=2 * cm,
-        title="Bangladesh Thana & Jail Management System",
-    )
+def connected_to(catalog, table):
+    links = []
+    for fk in table.foreign_keys:
+        links.append(fk.ref_table if fk.ref_table != table.name else f"{table.name} (self-relation)")
+    for fk in catalog.referencing(table.name):
+        if fk.table == table.name:
+            continue
+        if fk.columns == fk.ref_columns:
+            links.append(fk.table)
+        else:
+            links.append(f"{fk.table} ({', '.join(fk.columns)})")
+    return ", ".join(dict.fromkeys(links)) or "none"
+
+
+def relation_verb(relation):
+    return RELATION_VERBS.get((relation.via, tuple(relation.columns)), "references")
+
+
+def relationship_lines(relations):
+    lines = []
+    for relation in relations:
+        left, right = relation.left, relation.right
+        many = "N" if left.max is None else "1"
+        if relation.many_to_many:
+            lines.append(f"{left.table} {many} ↔ {'N' if right.max is None else '1'} {right.table} (via {relation.via})")
+        else:
+            lines.append(
+                f"{left.table} {'1' if right.total else '0..1'} → {many} {right.table} ({relation.via}.{', '.join(relation.columns)})"
+            )
+    return lines
+
+
+def participation_lines(relations):
+    lines = []
+    for relation in relations:
+        verb = relation_verb(relation)
+        if relation.many_to_many:
+            lines.append(
+                f"{relation.left.table} {verb} {relation.right.table}: both sides are partial ({relation.evidence[0]}; a row may have none)."
+            )
+        else:
+            kind = "total" if relation.right.total else "partial"
+            lines.append(f"{relation.left.table} {verb} {relation.right.table}: {relation.right.table} participation is {kind} ({relation.evidence[0]}).")
+    lines.append("Every referenced side is partial: no constraint can require a referencing row to exist.")
+    return lines
+
+
+def chen_rows(relations):
+    rows = [["Relation", "Cardinality (Left — Right)", "Derived from"]]
+    for relation in relations:
+        verb = relation_verb(relation)
+        name = f"{relation.left.table} {verb} {relation.right.table}"
+        if relation.many_to_many:
+            name += f" (via {relation.via})"
+        rows.append([name, f"{relation.left} — {verb} — {relation.right}", "; ".join(relation.evidence)])
+    return rows
+
+
+def overview_section(catalog, relations=(), cache_dir=CACHE_DIR):
+    # cache_dir holds the diagram's layout between builds; None lays it out from scratch.
+    from erd_layout import LAYOUT_FILE, diagram_nodes
 
     story = []
 
-    story.append(Paragraph("Bangladesh Thana & Jail Management System", styles["TitleCenter"]))
-    story.append(Spacer(1, 8))
-    story.append(Paragraph("ERD Explanation and Project Overview", styles["Body"]))
+    story.append(title("Bangladesh Thana & Jail Management System"))
+    story.append(spacer(8))
+    story.append(paragraph("ERD Explanation and Project Overview"))
 
-    story.append(Paragraph("1. Project Overview", styles["H1"]))
+    story.append(heading("1. Project Overview"))
     story.append(
-        Paragraph(
+        paragraph(
             "This project is a Bangladesh-based Thana and Jail Management System. "
             "It helps the government and police stations keep criminal records, arrests, jail placement, "
             "and online GD (General Diary) submissions in one place.",
-            styles["Body"],
         )
     )
 
-    story.append(Paragraph("2. MVP Features", styles["H1"]))
+    story.append(heading("2. MVP Features"))
     story.append(
-        Paragraph(
+        paragraph(
             "• Admin registers Thanas and assigns a head officer.<br/>"
             "• Thanas manage officers, criminals, arrests, cases, and jail placement.<br/>"
             "• Citizens register and submit Online GD reports.<br/>"
             "• Thana officers approve or reject GD reports.<br/>"
             "• Criminals can be viewed by location.",
-            styles["Body"],
         )
     )
 
-    story.append(Paragraph("3. Users and Scope", styles["H1"]))
+    story.append(heading("3. Users and Scope"))
     story.append(
-        Paragraph(
+        paragraph(
             "Admin (Government): Registers Thanas, assigns head officers, controls all system setup.<br/>"
             "Thana Head (Officer-in-Charge): Oversees officers, approves GD decisions, and monitors cases.<br/>"
             "Police Officers: Manage criminals, arrests, case files, jail placement, and bail tracking.<br/>"
             "Citizens (General Users): Register, submit Online GD, and view criminal locations.",
-            styles["Body"],
         )
     )
 
-    story.append(Paragraph("4. Real-Life Use Case Flow", styles["H1"]))
+    story.append(heading("4. Real-Life Use Case Flow"))
     story.append(
-        Paragraph(
+        paragraph(
             "1) Admin creates a Thana and assigns its head officer.<br/>"
             "2) Thana adds officers and registers criminals.<br/>"
             "3) If a criminal is arrested, an arrest record is created and linked to a case.<br/>"
@@ -103,443 +358,630 @@ def build():
             "5) If bail is granted, a bail record is stored.<br/>"
             "6) Citizens submit Online GD; Thana reviews and approves or rejects it.<br/>"
             "7) Citizens can see criminal locations based on recorded sightings.",
-            styles["Body"],
         )
     )
 
-    story.append(Paragraph("5. ER Diagram Summary", styles["H1"]))
+    story.append(heading("5. ER Diagram Summary"))
     story.append(
-        Paragraph(
+        paragraph(
             "The ERD is built with strong entities for core records (Thana, Officer, Criminal, Jail, User). "
             "The only relationship tables are membership and relation tables, which keep links simple and clear.",
-            styles["Body"],
         )
     )
 
-    story.append(Paragraph("5.1 Strong vs Weak Entities", styles["H2"]))
+    story.append(heading("5.1 Strong vs Weak Entities", 2))
+    strong = [t.name for t in catalog.tables.values() if not t.is_relationship()]
     story.append(
-        Paragraph(
-            "Strong entities: admin, thanas, ranks, officers, locations, users, gd_reports, criminals, "
-            "organizations, case_files, jails, cell_blocks, cells, arrest_records, incarcerations, bail_records, criminal_locations.<br/>"
+        paragraph(
+            f"Strong entities: {escape(', '.join(strong))}.<br/>"
             "Weak entities: none. Every table has its own primary key, so no weak entity is required.",
-            styles["Body"],
         )
     )
 
-    story.append(PageBreak())
+    figure = diagram_nodes(catalog, os.path.join(cache_dir, LAYOUT_FILE) if cache_dir else None)
+    if figure:
+        story.append(page_break())
+        story.append(heading("5.2 Entity-Relationship Diagram", 2))
+        story.append(paragraph("Laid out from the foreign keys in schema.sql; arrows point at the referenced table."))
+        links = [
+            (r.left.table, (r.left.min, r.left.max), r.right.table, (r.right.min, r.right.max), relation_verb(r) + (f" (via {r.via})" if r.many_to_many else ""))
+            for r in relations
+        ]
+        story.append(diagram(*figure, links))
 
-    story.append(Paragraph("6. Tables and Attributes", styles["H1"]))
+    story.append(page_break())
 
-    tables = [
-        {
-            "name": "admin",
-            "summary": "Government admins who create Thanas and control system setup.",
-            "connected_to": "thanas (created_by_admin_id)",
-            "attributes": [
-                ("admin_id", "Unique admin ID"),
-                ("full_name", "Admin name"),
-                ("email", "Admin email"),
-            ],
-        },
-        {
-            "name": "thanas",
-            "summary": "Police stations in Bangladesh.",
-            "connected_to": "admin, officers, gd_reports, criminals, case_files, arrest_records",
-            "attributes": [
-                ("thana_id", "Unique thana ID"),
-                ("name", "Thana name"),
-                ("district", "District name"),
-                ("address", "Thana address"),
-                ("created_by_admin_id", "Admin who created the thana"),
-                ("head_officer_id", "Officer in charge"),
-            ],
-        },
-        {
-            "name": "ranks",
-            "summary": "Police rank list.",
-            "connected_to": "officers",
-            "attributes": [
-                ("rank_code", "Rank identifier"),
-                ("rank_name", "Rank name"),
-                ("level", "Rank order level"),
-            ],
-        },
-        {
-            "name": "officers",
-            "summary": "Police officers working in a Thana.",
-            "connected_to": "thanas, ranks, gd_reports (approval)",
-            "attributes": [
-                ("officer_id", "Unique officer ID"),
-                ("thana_id", "Officer’s thana"),
-                ("rank_code", "Officer’s rank"),
-                ("full_name", "Officer name"),
-                ("badge_no", "Officer badge number"),
-            ],
-        },
-        {
-            "name": "locations",
-            "summary": "District and thana area locations.",
-            "connected_to": "criminal_locations",
-            "attributes": [
-                ("location_id", "Unique location ID"),
-                ("district", "District name"),
-                ("thana_area", "Local thana area"),
-                ("address", "Address text"),
-            ],
-        },
-        {
-            "name": "users",
-            "summary": "Citizens who register and use Online GD.",
-            "connected_to": "gd_reports",
-            "attributes": [
-                ("user_id", "Unique user ID"),
-                ("full_name", "User name"),
-                ("nid_number", "National ID number"),
-                ("phone", "User phone"),
-                ("address", "User address"),
-                ("email", "User email"),
-                ("password_hash", "Password hash for login"),
-            ],
-        },
-        {
-            "name": "gd_reports",
-            "summary": "Online GD submissions by citizens.",
-            "connected_to": "users, thanas, officers (approval)",
-            "attributes": [
-                ("gd_id", "Unique GD ID"),
-                ("user_id", "User who submitted"),
-                ("thana_id", "Assigned thana"),
-                ("submitted_at", "Submission time"),
-                ("description", "GD description"),
-                ("status", "GD status"),
-                ("approved_by_officer_id", "Officer who approved"),
-            ],
-        },
-        {
-            "name": "criminals",
-            "summary": "Criminal profiles managed by Thanas.",
-            "connected_to": "thanas, case_files, arrest_records, criminal_organizations, criminal_relations, criminal_locations",
-            "attributes": [
-                ("criminal_id", "Unique criminal ID"),
-                ("full_name", "Criminal name"),
-                ("nid_or_alias", "NID or alias"),
-                ("status", "Custody status"),
-                ("risk_level", "Risk level 1–10"),
-                ("registered_thana_id", "Thana that registered"),
-            ],
-        },
-        {
-            "name": "organizations",
-            "summary": "Criminal organizations or gangs.",
-            "connected_to": "criminal_organizations",
-            "attributes": [
-                ("org_id", "Unique organization ID"),
-                ("name", "Organization name"),
-                ("ideology", "Organization ideology"),
-                ("threat_level", "Threat level 1–10"),
-                ("created_at", "Record creation time"),
-            ],
-        },
-        {
-            "name": "criminal_organizations",
-            "summary": "Membership table that connects criminals to organizations.",
-            "connected_to": "criminals, organizations",
-            "attributes": [
-                ("criminal_id", "Linked criminal"),
-                ("org_id", "Linked organization"),
-                ("role", "Role in organization"),
-            ],
-        },
-        {
-            "name": "criminal_relations",
-            "summary": "Criminal-to-criminal relationship table.",
-            "connected_to": "criminals (self-relation)",
-            "attributes": [
-                ("relation_id", "Unique relation ID"),
-                ("criminal_id_1", "First criminal"),
-                ("criminal_id_2", "Second criminal"),
-                ("relation_type", "Relation type"),
-            ],
-        },
-        {
-            "name": "case_files",
-            "summary": "Case records for criminals under a Thana.",
-            "connected_to": "criminals, thanas",
-            "attributes": [
-                ("case_id", "Unique case ID"),
-                ("case_number", "Case number"),
-                ("criminal_id", "Linked criminal"),
-                ("thana_id", "Linked thana"),
-                ("case_type", "Case type"),
-                ("status", "Case status"),
-                ("filed_at", "Case filed time"),
-            ],
-        },
-        {
-            "name": "jails",
-            "summary": "Jail facilities.",
-            "connected_to": "cell_blocks, incarcerations",
-            "attributes": [
-                ("jail_id", "Unique jail ID"),
-                ("name", "Jail name"),
-                ("district", "Jail district"),
-                ("address", "Jail address"),
-                ("capacity", "Total capacity"),
-            ],
-        },
-        {
-            "name": "cell_blocks",
-            "summary": "Blocks inside a jail.",
-            "connected_to": "jails, cells",
-            "attributes": [
-                ("block_id", "Unique block ID"),
-                ("jail_id", "Parent jail"),
-                ("block_name", "Block name"),
-                ("capacity", "Block capacity"),
-            ],
-        },
-        {
-            "name": "cells",
-            "summary": "Cells inside a block.",
-            "connected_to": "cell_blocks, incarcerations",
-            "attributes": [
-                ("cell_id", "Unique cell ID"),
-                ("block_id", "Parent block"),
-                ("cell_number", "Cell number"),
-                ("capacity", "Cell capacity"),
-                ("status", "Cell status"),
-            ],
-        },
-        {
-            "name": "arrest_records",
-            "summary": "Arrest history for criminals.",
-            "connected_to": "criminals, thanas, bail_records, incarcerations",
-            "attributes": [
-                ("arrest_id", "Unique arrest ID"),
-                ("criminal_id", "Arrested criminal"),
-                ("thana_id", "Arresting thana"),
-                ("arrest_date", "Arrest date"),
-                ("bail_due_date", "Bail due date"),
-                ("custody_status", "Custody status"),
-                ("case_reference", "Case reference"),
-            ],
-        },
-        {
-            "name": "incarcerations",
-            "summary": "Jail placement for an arrest. (Junction table linking Arrests to Jails/Cells)",
-            "connected_to": "arrest_records, jails, cells",
-            "attributes": [
-                ("incarceration_id", "Unique incarceration ID"),
-                ("arrest_id", "Linked arrest"),
-                ("jail_id", "Jail where kept"),
-                ("cell_id", "Cell assigned"),
-                ("admitted_at", "Admit time"),
-                ("released_at", "Release time"),
-            ],
-        },
-        {
-            "name": "bail_records",
-            "summary": "Bail details for an arrest.",
-            "connected_to": "arrest_records",
-            "attributes": [
-                ("bail_id", "Unique bail ID"),
-                ("arrest_id", "Linked arrest"),
-                ("court_name", "Court name"),
-                ("bail_amount", "Bail amount"),
-                ("granted_at", "Bail date"),
-                ("surety_name", "Surety name"),
-                ("status", "Bail status"),
-            ],
-        },
-        {
-            "name": "criminal_locations",
-            "summary": "Criminals linked to locations for public viewing.",
-            "connected_to": "criminals, locations",
-            "attributes": [
-                ("criminal_location_id", "Unique record ID"),
-                ("criminal_id", "Linked criminal"),
-                ("location_id", "Linked location"),
-                ("noted_at", "Recorded time"),
-            ],
-        },
-    ]
-
-    for table in tables:
-        story.append(Paragraph(f"Table: {table['name']}", styles["H2"]))
-        story.append(Paragraph(f"Purpose: {table['summary']}", styles["Body"]))
-        story.append(Paragraph(f"Connected to: {table['connected_to']}", styles["Body"]))
-        rows = [["Attribute", "Purpose"]]
-        for attr, desc in table["attributes"]:
-            rows.append([attr, desc])
-        add_table(story, rows)
-
-        if table["name"] == "incarcerations":
-            story.append(Paragraph("<b>Detailed Explanation:</b>", styles["H2"]))
-            story.append(Paragraph("<b>Scenario:</b> A criminal is arrested by Thana A and sent to Dhaka Central Jail. The arrest table records the 'event' of the arrest. However, the physical placement in a jail and specific cell is a separate timeline. This 'incarcerations' table manages that placement.", styles["Body"]))
-            story.append(Paragraph("<b>Why it is absolutely needed:</b> Arrest and jail placement are not 1:1 in the real world. A person can be arrested but not sent to jail (bailed immediately). Or, one arrest can lead to multiple jail transfers (Jail A -> Jail B). Separate tables prevent data duplication and confusion.", styles["Body"]))
-
-    story.append(PageBreak())
-
-    story.append(Paragraph("7. Relationships (Cardinality)", styles["H1"]))
-    relationship_lines = [
-        "Admin 1 → N Thanas (Admin creates Thanas)",
-        "Thana 1 → N Officers (Officers belong to one Thana)",
-        "Rank 1 → N Officers (Each officer has one rank)",
-        "Thana 0..1 → 1 Head Officer (Optional head officer)",
-        "User 1 → N GD Reports (User submits GD)",
-        "Thana 1 → N GD Reports (Thana receives GD)",
-        "Officer 0..1 → N GD Reports (Officer approves GD)",
-        "Thana 1 → N Criminals (Thana registers criminals)",
-        "Criminal 1 → N Case Files (Cases for a criminal)",
-        "Criminal 1 → N Arrest Records (Arrest history)",
-        "Thana 1 → N Arrest Records (Arrests recorded by thana)",
-        "Arrest 1 → N Bail Records (Bail info for an arrest)",
-        "Arrest 1 → N Incarcerations (Jail placements)",
-        "Cell 0..1 → N Incarcerations (A cell can be used many times over time; an incarceration may or may not have a cell yet)",
-        "Jail 1 → N Cell Blocks (Jail structure)",
-        "Block 1 → N Cells (Cells inside a block)",
-        "Criminal N ↔ N Organizations (Memberships via criminal_organizations)",
-        "Criminal N ↔ N Criminal (Relations via criminal_relations)",
-        "Criminal 1 → N Locations (Seen in different locations)",
-    ]
-    for line in relationship_lines:
-        story.append(Paragraph(f"• {line}", styles["Body"]))
-
-    story.append(Paragraph("7.1 Participation (Total vs Partial)", styles["H2"]))
-    participation_lines = [
-        "Thana in Officers is total (every officer must belong to one thana).",
-        "Rank in Officers is total (every officer has one rank).",
-        "User in GD Reports is total (every GD must have a user).",
-        "Thana in GD Reports is total (every GD goes to one thana).",
-        "Criminal in Arrest Records is total (every arrest must have a criminal).",
-        "Criminal in Case Files is total (every case must have a criminal).",
-        "Thana Head is partial (a thana may or may not have a head).",
-        "Criminal in Organizations and Criminal Relations is partial (a criminal may have none).",
-    ]
-    for line in participation_lines:
-        story.append(Paragraph(f"• {line}", styles["Body"]))
-
-    story.append(Paragraph("7.2 Chen Cardinality (Left/Right of Diamond)", styles["H2"]))
+    story.append(heading("6. Tables and Attributes"))
+
+    return story
+
+
+def table_section(catalog, table):
+    story = []
+
+    notes = TABLE_NOTES.get(table.name, {})
+    attributes = notes.get("attributes", {})
+    story.append(heading(f"Table: {escape(table.name)}", 2))
+    # TABLE_NOTES are authored markup; a comment read back with --dsn is data.
+    story.append(paragraph(f"Purpose: {notes.get('summary') or escape(table.comment or '') or 'Not documented.'}"))
+    story.append(paragraph(f"Connected to: {escape(connected_to(catalog, table))}"))
+    rows = [["Attribute", "Type", "Purpose"]]
+    for column in table.columns:
+        rows.append([escape(column.name), escape(column_type(table, column)), attributes.get(column.name, "")])
+    story.append(data_table(rows))
+
+    if table.name == "incarcerations":
+        story.append(heading("<b>Detailed Explanation:</b>", 2))
+        story.append(paragraph("<b>Scenario:</b> A criminal is arrested by Thana A and sent to Dhaka Central Jail. The arrest table records the 'event' of the arrest. However, the physical placement in a jail and specific cell is a separate timeline. This 'incarcerations' table manages that placement."))
+        story.append(paragraph("<b>Why it is absolutely needed:</b> Arrest and jail placement are not 1:1 in the real world. A person can be arrested but not sent to jail (bailed immediately). Or, one arrest can lead to multiple jail transfers (Jail A -> Jail B). Separate tables prevent data duplication and confusion."))
+
+    return story
+
+
+def relationships_section(relations):
+    story = []
+
+    story.append(page_break())
+
+    story.append(heading("7. Relationships (Cardinality)"))
+    story.append(bullets([escape(line) for line in relationship_lines(relations)]))
+
+    story.append(heading("7.1 Participation (Total vs Partial)", 2))
+    story.append(bullets([escape(line) for line in participation_lines(relations)]))
+
+    story.append(heading("7.2 Chen Cardinality (Left/Right of Diamond)", 2))
     story.append(
-        Paragraph(
+        paragraph(
             "For each relation below, the four numbers show minimum and maximum on both sides of the diamond. "
-            "Format: LeftEntity (min,max) — Relation — RightEntity (min,max).",
-            styles["Body"],
+            "Format: LeftEntity (min,max) — Relation — RightEntity (min,max). "
+            "They are derived from the NOT NULL, UNIQUE, primary key and foreign key constraints in schema.sql.",
         )
     )
+    story.append(data_table([[escape(cell) for cell in row] for row in chen_rows(relations)]))
+
+    return story
+
+
+def objects_section(catalog):
+    story = []
+
+    story.append(heading("8. Indexes, Views and Triggers"))
+    story.append(heading("8.1 Indexes", 2))
+    rows = [["Index", "Table", "Columns"]]
+    for index in catalog.indexes:
+        columns = ", ".join(index.columns)
+        if index.where:
+            columns += f" WHERE {index.where}"
+        rows.append([escape(index.name), escape(index.table), escape(columns)])
+    story.append(data_table(rows))
+
+    story.append(heading("8.2 Views", 2))
+    rows = [["View", "Reads from"]]
+    for view in catalog.views:
+        rows.append([escape(view.name), escape(", ".join(dict.fromkeys(name for name, _ in view.sources)))])
+    story.append(data_table(rows))
+
+    story.append(heading("8.3 Triggers", 2))
+    rows = [["Trigger", "Fires on", "Function"]]
+    for trigger in catalog.triggers:
+        events = " OR ".join(trigger.events)
+        if trigger.update_columns:
+            events += f" OF {', '.join(trigger.update_columns)}"
+        rows.append([escape(trigger.name), escape(f"{trigger.timing} {events} ON {trigger.table}"), escape(trigger.function)])
+    story.append(data_table(rows))
+
+    return story
+
 
-    chen_rows = [
-        ["Relation", "Cardinality (Left — Right)", "Why this makes sense"],
-        [
-            "Cell assigned to Incarceration",
-            "Cell (0,*) — assigned_to — Incarceration (0,1)",
-            "A cell can host many incarcerations over time; an incarceration may be pending without a cell.",
-        ],
-        [
-            "Admin registers Thana",
-            "Admin (1,*) — registers — Thana (1,1)",
-            "A thana must be created by exactly one admin; one admin can create many thanas.",
-        ],
-        [
-            "Thana employs Officer",
-            "Thana (1,*) — employs — Officer (1,1)",
-            "Every officer works for one thana; a thana has many officers.",
-        ],
-        [
-            "Rank assigned to Officer",
-            "Rank (1,*) — assigned_to — Officer (1,1)",
-            "Each officer has exactly one rank; a rank is shared by many officers.",
-        ],
-        [
-            "Thana headed by Officer",
-            "Thana (0,1) — headed_by — Officer (0,1)",
-            "A thana may or may not have a head; an officer may or may not be a head.",
-        ],
-        [
-            "User submits GD",
-            "User (1,*) — submits — GD_Report (1,1)",
-            "Every GD is submitted by exactly one user; a user can submit many GDs.",
-        ],
-        [
-            "Thana receives GD",
-            "Thana (1,*) — receives — GD_Report (1,1)",
-            "Each GD goes to one thana; a thana receives many GDs.",
-        ],
-        [
-            "Officer approves GD",
-            "Officer (0,*) — approves — GD_Report (0,1)",
-            "A GD may be pending or approved by one officer; an officer can approve many GDs.",
-        ],
-        [
-            "Thana registers Criminal",
-            "Thana (1,*) — registers — Criminal (1,1)",
-            "Each criminal is registered by one thana; a thana registers many criminals.",
-        ],
-        [
-            "Criminal has Case",
-            "Criminal (1,*) — has — Case_File (1,1)",
-            "A case file is for one criminal; a criminal can have multiple cases.",
-        ],
-        [
-            "Criminal has Arrest",
-            "Criminal (1,*) — has — Arrest_Record (1,1)",
-            "Each arrest record is for one criminal; a criminal can be arrested multiple times.",
-        ],
-        [
-            "Thana records Arrest",
-            "Thana (1,*) — records — Arrest_Record (1,1)",
-            "An arrest is recorded by one thana; a thana records many arrests.",
-        ],
-        [
-            "Arrest has Bail",
-            "Arrest_Record (0,*) — has — Bail_Record (1,1)",
-            "A bail record must belong to one arrest; an arrest can have none or many bail updates.",
-        ],
-        [
-            "Arrest has Incarceration",
-            "Arrest_Record (0,*) — has — Incarceration (1,1)",
-            "An incarceration must belong to one arrest; an arrest may have none or many transfers.",
-        ],
-        [
-            "Jail has Blocks",
-            "Jail (1,*) — has — Cell_Block (1,1)",
-            "Each block belongs to one jail; a jail has many blocks.",
-        ],
-        [
-            "Block has Cells",
-            "Cell_Block (1,*) — has — Cell (1,1)",
-            "Each cell belongs to one block; a block has many cells.",
-        ],
-        [
-            "Criminal member of Organization",
-            "Criminal (0,*) — member_of — Organization (0,*)",
-            "A criminal may have no organization; organizations can have many criminals.",
-        ],
-        [
-            "Criminal related to Criminal",
-            "Criminal (0,*) — related_to — Criminal (0,*)",
-            "A criminal may have no relations; relations can link many criminals.",
-        ],
-        [
-            "Criminal seen at Location",
-            "Criminal (1,*) — seen_at — Location (1,*)",
-            "Each record links one criminal and one location; many records can exist over time.",
-        ],
-    ]
-    add_table(story, chen_rows)
-
-    story.append(Paragraph("8. Project Scope", styles["H1"]))
+def advisor_section(catalog, number):
+    from index_advisor import advise
+
+    story = []
+
+    advice = advise(catalog)
+    story.append(heading(f"{number}. Index Advisor"))
+    story.append(
+        paragraph(
+            "Access paths implied by foreign keys and by the join and filter predicates of the views, "
+            f"checked against the primary keys, unique constraints and indexes above. {advice.covered} are already "
+            "served by an index or by the leading columns of a composite one. "
+            "Selectivity is the share of rows one lookup returns in seed_data.sql.",
+        )
+    )
+    if advice.suggestions:
+        rows = [["#", "Suggested index", "Why", "Selectivity"]]
+        for rank, suggestion in enumerate(advice.suggestions, 1):
+            selectivity = "n/a" if suggestion.selectivity is None else f"{suggestion.selectivity:.2f} ({suggestion.seed_rows} rows)"
+            rows.append([rank, escape(suggestion.statement), escape("; ".join(suggestion.reasons)), selectivity])
+        story.append(data_table(rows))
+    else:
+        story.append(paragraph("Every foreign key and view predicate is already indexed."))
+
+    if advice.redundant:
+        story.append(heading(f"{number}.1 Redundant Indexes", 2))
+        rows = [["Index", "Table", "Leading columns of"]]
+        for item in advice.redundant:
+            rows.append([escape(item.index), escape(item.table), escape(item.covered_by)])
+        story.append(data_table(rows))
+
+    return story
+
+
+def cardinality_section(observations, number):
+    story = []
+
+    story.append(heading(f"{number}. Cardinality in the Data"))
     story.append(
-        Paragraph(
+        paragraph(
+            "Each relation from section 7.2 was checked against the deployed data with one aggregate query. "
+            "Notes mark where the data is stricter than the schema requires, or breaks it.",
+        )
+    )
+    rows = [["Relation", "Schema", "Data", "Note"]]
+    for observation in observations:
+        relation = observation.relation
+        rows.append([
+            escape(f"{relation.left.table} {relation_verb(relation)} {relation.right.table}"),
+            f"{relation.left} — {relation.right}",
+            f"{observation.left} — {observation.right}",
+            escape("; ".join(observation.notes)) or "as declared",
+        ])
+    story.append(data_table(rows))
+
+    return story
+
+
+def data_profile_section(profiles, source, number):
+    from data_profile import distribution
+
+    story = []
+
+    story.append(heading(f"{number}. Data Profile"))
+    story.append(
+        paragraph(
+            f"Every table was read once from {escape(source)}. Distinct counts are HyperLogLog estimates (about 2% error), "
+            "frequent values come from a count-min sketch, and ranges and medians from fixed-size histograms, "
+            "so memory stays constant however many rows a table has.",
+        )
+    )
+    for i, profile in enumerate(profiles.values(), 1):
+        story.append(heading(f"{number}.{i} {escape(profile.name)} ({profile.rows:,} row{'' if profile.rows == 1 else 's'})", 2))
+        rows = [["Column", "Nulls", "Distinct", "Values"]]
+        for column in profile.columns:
+            rows.append([
+                escape(column.name),
+                f"{column.nulls / column.rows:.1%}" if column.rows else "-",
+                f"≈ {column.distinct.estimate():,}",
+                escape(distribution(column)),
+            ])
+        story.append(data_table(rows))
+
+    return story
+
+
+def network_section(summary, number):
+    story = []
+
+    story.append(heading(f"{number}. Criminal Network"))
+    story.append(
+        paragraph(
+            f"{summary.criminals:,} criminals and {summary.organizations:,} organizations, joined by "
+            f"{summary.relations:,} criminal_relations rows and {summary.memberships:,} criminal_organizations rows, "
+            f"form {summary.components:,} connected component{'' if summary.components == 1 else 's'}. The largest holds {summary.largest:,} criminals; "
+            f"{summary.isolated:,} criminals have no recorded ties.",
+        )
+    )
+    story.append(
+        paragraph(
+            "Centrality is PageRank over relations and memberships together, so a shared organization links its members. "
+            "Score is relative to the average criminal; the top-ranked criminals of each registered thana are listed.",
+        )
+    )
+    if summary.central:
+        rows = [["Thana", "Criminal", "Ties", "Score"]]
+        for thana, name, degree, score in summary.central:
+            rows.append([escape(thana), escape(name), f"{degree:,}", f"{score:.1f}×"])
+        story.append(data_table(rows))
+    else:
+        story.append(paragraph("No criminal has a recorded tie."))
+
+    return story
+
+
+def occupancy_section(summary, number):
+    from occupancy import FORECAST_DAYS, HISTORY_DAYS
+
+    story = []
+    forecasts = FORECAST_DAYS[:len(summary.jails[0]) - 5] if summary.jails else ()
+
+    story.append(heading(f"{number}. Custody and Occupancy"))
+    story.append(
+        paragraph(
+            f"Daily occupancy from {summary.intervals:,} incarcerations, as of {summary.as_of}: {summary.held:,} prisoners held, "
+            f"{summary.pending_bail:,} of them with a bail due date still ahead. Past days count each stay from admitted_at to "
+            "released_at. Later days assume every prisoner held now stays until released_at, or until the arrest's bail_due_date "
+            "if that comes first; new admissions are not forecast, so the projection is a floor.",
+        )
+    )
+
+    story.append(heading(f"{number}.1 Jails", 2))
+    rows = [["Jail", "Capacity", "Held", f"Peak ({HISTORY_DAYS // 365} years)", "Peak day", *(f"+{days} days" for days in forecasts)]]
+    for name, capacity, now, peak, peak_day, *ahead in summary.jails:
+        rows.append([escape(name), f"{capacity:,}", f"{now:,}", f"{peak:,}", peak_day, *(f"{value:,}" for value in ahead)])
+    story.append(data_table(rows))
+    for caption, labels, series, marker in summary.charts:
+        story.append(chart(caption, labels, series, marker))
+
+    story.append(heading(f"{number}.2 Cell Blocks and Cells", 2))
+    story.append(
+        paragraph(
+            f"{summary.cells_over:,} of {summary.cells:,} cells hold more prisoners than their capacity"
+            + (f", and {summary.cells_over_forecast:,} will in {forecasts[0]} days from current stays alone." if forecasts else "."),
+        )
+    )
+    if summary.blocks:
+        rows = [["Jail", "Block", "Capacity", "Held", *([f"+{forecasts[0]} days"] if forecasts else [])]]
+        for jail, block, capacity, now, ahead in summary.blocks:
+            rows.append([escape(jail), escape(block), f"{capacity:,}", f"{now:,}", *([f"{ahead:,}"] if forecasts else [])])
+        story.append(data_table(rows))
+    if summary.crowded_cells:
+        rows = [["Jail", "Block", "Cell", "Capacity", "Held"]]
+        for jail, block, cell, capacity, now in summary.crowded_cells:
+            rows.append([escape(jail), escape(block), escape(cell), f"{capacity:,}", f"{now:,}"])
+        story.append(data_table(rows))
+
+    return story
+
+
+def format_bytes(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def deployed_section(stats, number):
+    story = []
+
+    story.append(heading(f"{number}. Deployed Database"))
+    exact = all(item.exact for item in stats.values())
+    story.append(
+        paragraph(
+            f"Sizes and {'exact row counts' if exact else 'planner row estimates'} read from the running database. "
+            "Bloat is the space left after packing the live rows at the table's fillfactor, "
+            "estimated from pg_stats column widths (shown as - until the table is analyzed).",
+        )
+    )
+    rows = [["Table", "Rows", "Dead rows", "Table size", "Index size", "Total size", "Est. bloat"]]
+    for item in sorted(stats.values(), key=lambda item: item.total_bytes, reverse=True):
+        rows.append(
+            [
+                escape(item.table),
+                f"{item.rows:,}",
+                f"{item.dead_rows:,}",
+                format_bytes(item.table_bytes),
+                format_bytes(item.index_bytes),
+                format_bytes(item.total_bytes),
+                "-" if item.bloat_bytes is None else format_bytes(item.bloat_bytes),
+            ]
+        )
+    story.append(data_table(rows))
+
+    return story
+
+
+def performance_section(report, number):
+    story = []
+
+    story.append(heading(f"{number}. Performance"))
+    story.append(
+        paragraph(
+            f"Analysis of {report.probes:,} EXPLAIN (ANALYZE, BUFFERS) plans recorded in query_probes "
+            f"across {len(report.latencies)} query labels.",
+        )
+    )
+
+    story.append(heading(f"{number}.1 Latency by Label", 2))
+    rows = [["Label", "Probes", "p50 ms", "p95 ms", "p99 ms", "Max ms", "Execution p95 ms"]]
+    for item in report.latencies:
+        rows.append(
+            [
+                escape(item.label),
+                f"{item.probes:,}",
+                f"{item.p50_ms:.2f}",
+                f"{item.p95_ms:.2f}",
+                f"{item.p99_ms:.2f}",
+                f"{item.max_ms:.2f}",
+                f"{item.execution_p95_ms:.2f}",
+            ]
+        )
+    story.append(data_table(rows))
+
+    story.append(heading(f"{number}.2 Sequential Scans on Large Tables", 2))
+    if report.seq_scans:
+        rows = [["Table", "Label", "Scans", "Max rows read"]]
+        for scan in report.seq_scans:
+            rows.append([escape(scan.table), escape(scan.label), f"{scan.scans:,}", f"{scan.max_rows:,}"])
+        story.append(data_table(rows))
+    else:
+        story.append(paragraph("No probe scanned a large table sequentially."))
+
+    story.append(heading(f"{number}.3 Unused Indexes", 2))
+    if report.unused_indexes:
+        story.append(paragraph("Indexes that no recorded plan used. They still cost a write on every insert and update."))
+        rows = [["Index", "Table", "Columns"]]
+        for index in report.unused_indexes:
+            rows.append([escape(index.name), escape(index.table), escape(", ".join(index.columns))])
+        story.append(data_table(rows))
+    else:
+        story.append(paragraph("Every index was used by at least one probe."))
+
+    story.append(heading(f"{number}.4 Buffer-Heavy Nodes", 2))
+    if report.buffer_nodes:
+        story.append(paragraph("Plan nodes that touched the most shared buffers themselves, excluding their children."))
+        rows = [["Label", "Node", "Relation", "Count", "Mean blocks", "Max blocks", "Blocks read"]]
+        for node in report.buffer_nodes[:BUFFER_NODE_ROWS]:
+            rows.append(
+                [
+                    escape(node.label),
+                    escape(node.node),
+                    escape(node.relation),
+                    f"{node.count:,}",
+                    f"{node.mean_blocks:,.0f}",
+                    f"{node.max_blocks:,}",
+                    f"{node.read_blocks:,}",
+                ]
+            )
+        story.append(data_table(rows))
+    else:
+        story.append(paragraph("No plan node touched enough shared buffers to flag."))
+
+    return story
+
+
+def trigger_profile_section(profile, number):
+    from trigger_profile import hotspots, overheads
+
+    story = []
+    meta = profile["meta"]
+
+    story.append(heading(f"{number}. Trigger Write Path"))
+    story.append(
+        paragraph(
+            f"{meta['threads']} client connections each sent {meta['statements']:,} single-row statements per run, "
+            f"autocommitted, against a scale {meta['scale']} database (PostgreSQL {escape(meta['server_version'])}, "
+            f"{meta['cpus']} CPU{'' if meta['cpus'] == 1 else 's'}). Each workload ran with its triggers enabled and "
+            f"with each one disabled in turn, interleaved over {meta['rounds']} round{'' if meta['rounds'] == 1 else 's'}. "
+            "Latency is measured by the client and includes the commit; waits come from sampling pg_stat_activity and pg_locks.",
+        )
+    )
+
+    story.append(heading(f"{number}.1 Overhead by Trigger", 2))
+    story.append(
+        paragraph(
+            "The difference between the run with every trigger on and the run without this one. "
+            "Function time is the trigger function's own time per call from pg_stat_user_functions.",
+        )
+    )
+    rows = [["Trigger", "Workload", "p50 ms", "p95 ms", "Throughput", "Function ms/call"]]
+    for trigger, workload, on, off, per_call in overheads(profile):
+        rows.append([
+            escape(trigger),
+            escape(workload),
+            f"{off['p50_ms']:.2f} → {on['p50_ms']:.2f}",
+            f"{off['p95_ms']:.2f} → {on['p95_ms']:.2f}",
+            f"{on['throughput'] / off['throughput'] - 1:+.0%}",
+            "-" if per_call is None else f"{per_call:.3f}",
+        ])
+    story.append(data_table(rows))
+
+    story.append(heading(f"{number}.2 Contention", 2))
+    story.append(
+        paragraph(
+            "Lock wait is the share of samples in which a client waited on a heavyweight lock; "
+            "the most frequent waits show where, such as a row every client updates.",
+        )
+    )
+    rows = [["Workload", "Configuration", "Stmts/s", "Lock wait", "Top waits"]]
+    for workload, label, run, waits in hotspots(profile):
+        rows.append([
+            escape(workload),
+            escape(label),
+            f"{run['throughput']:,.0f}",
+            f"{run['lock_share']:.0%}",
+            escape("; ".join(f"{wait} {share:.0%}" for wait, share in waits)) or "-",
+        ])
+    story.append(data_table(rows))
+
+    return story
+
+
+def scope_section(catalog, number=9):
+    story = []
+
+    story.append(heading(f"{number}. Project Scope"))
+    story.append(
+        paragraph(
             "This scope focuses on core policing and jail management. "
             "It covers Thana operations, criminal records, arrests, jail placement, bail, and citizen GD. "
             "It does not cover advanced surveillance, court workflows, or analytics.",
-            styles["Body"],
         )
     )
 
-    doc.build(story)
+    return story
+
+
+def report_sections(catalog, chapters=(), relations=None, cache_dir=CACHE_DIR):
+    # Yields (name, story blocks) in document order; renderers cache each section by a hash of its blocks.
+    # Further chapters are (name, make(number)) pairs numbered from 9; the scope always comes last.
+    # build() infers the relations once and passes them in, so every format's pass reuses them.
+    relations = infer(catalog) if relations is None else relations
+    yield "overview", overview_section(catalog, relations, cache_dir)
+    for table in catalog.tables.values():
+        yield f"table:{table.name}", table_section(catalog, table)
+    yield "relationships", relationships_section(relations)
+    yield "objects", objects_section(catalog)
+    number = 9
+    for name, make in (("advisor", partial(advisor_section, catalog)), *chapters):
+        yield name, make(number)
+        number += 1
+    yield "scope", scope_section(catalog, number)
+
+
+def output_targets(formats, output_path=OUTPUT_PATH):
+    base = os.path.splitext(output_path)[0]
+    return {name: base + RENDERERS[name].extension for name in formats}
+
+
+def build(formats=("pdf",), output_path=OUTPUT_PATH, cache=None, catalog=None, chapters=(), parallel=True, cache_dir=CACHE_DIR):
+    if catalog is None:
+        with phase("load catalog"):
+            catalog = load_catalog()
+    sections = partial(report_sections, catalog, tuple(chapters), infer(catalog), cache_dir)
+    return render_all(sections, output_targets(formats, output_path), cache, parallel)
+
+
+def watched_paths():
+    paths = [os.path.abspath(__file__)]
+    paths += [os.path.join(SCHEMA_DIR, name) for name in (*DDL_FILES, SEED_FILE)]
+    return [path for path in paths if os.path.exists(path)]
+
+
+def watch(formats, cache, chapters=(), interval=0.5, cache_dir=CACHE_DIR):
+    seen = None
+    while True:
+        mtimes = [os.stat(path).st_mtime_ns for path in watched_paths()]
+        if mtimes != seen:
+            seen = mtimes
+            started = time.perf_counter()
+            cache.hits = cache.misses = 0
+            results = build(formats, cache=cache, chapters=chapters, cache_dir=cache_dir)
+            print(f"rebuilt {', '.join(path for _, path, *_ in results)} in {time.perf_counter() - started:.2f}s", flush=True)
+        time.sleep(interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the ERD report.")
+    parser.add_argument("--format", action="append", choices=sorted(RENDERERS), help="output format (repeatable, default pdf)")
+    parser.add_argument("--all", action="store_true", help="build every format in parallel")
+    parser.add_argument("--no-cache", action="store_true", help="render every section from scratch")
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_BYTES // (1024 * 1024), help="cache size limit in MB")
+    parser.add_argument("--watch", action="store_true", help="rebuild whenever the DDL files or this script change")
+    parser.add_argument("--dsn", help="read the catalog from a running database instead of the DDL files ('' uses PG* variables)")
+    parser.add_argument("--schema", default="public", help="schema to introspect with --dsn")
+    parser.add_argument("--exact-counts", action="store_true", help="count(*) every table instead of using planner estimates")
+    parser.add_argument("--probes", help="JSONL export of query_probes for the Performance chapter (read from the database with --dsn)")
+    parser.add_argument(
+        "--data-profile", nargs="?", const="", metavar="DUMP_DIR",
+        help="add a Data Profile chapter, streamed from the --dsn database or from a synth_data.py dump directory",
+    )
+    parser.add_argument(
+        "--network", nargs="?", const="", metavar="DUMP_DIR",
+        help="add a Criminal Network chapter, loaded from the --dsn database or from a synth_data.py dump directory",
+    )
+    parser.add_argument(
+        "--occupancy", nargs="?", const="", metavar="DUMP_DIR",
+        help="add a Custody and Occupancy chapter, loaded from the --dsn database or from a synth_data.py dump directory",
+    )
+    parser.add_argument("--trigger-profile", help="JSON from trigger_profile.py --out for the Trigger Write Path chapter")
+    parser.add_argument(
+        "--profile", metavar="JSON",
+        help="record wall time and peak RSS per build phase here, plus a .folded stack file for flamegraphs",
+    )
+    parser.add_argument(
+        "--profile-allocations", action="store_true",
+        help="with --profile, rebuild once more under tracemalloc and add each phase's allocations to the JSON",
+    )
+    args = parser.parse_args(argv)
+    if args.watch and args.dsn is not None:
+        parser.error("--watch follows the DDL files and cannot be combined with --dsn")
+    if args.watch and args.profile:
+        parser.error("--profile records a single build and cannot be combined with --watch")
+    if args.profile_allocations and not args.profile:
+        parser.error("--profile-allocations adds to the --profile JSON")
+    if args.data_profile == "" and args.dsn is None:
+        parser.error("--data-profile without a dump directory reads the --dsn database")
+    if args.network == "" and args.dsn is None:
+        parser.error("--network without a dump directory reads the --dsn database")
+    if args.occupancy == "" and args.dsn is None:
+        parser.error("--occupancy without a dump directory reads the --dsn database")
+
+    formats = sorted(RENDERERS) if args.all else (args.format or ["pdf"])
+    cache = SectionCache(args.cache_dir, args.cache_size * 1024 * 1024, enabled=not args.no_cache)
+    # The diagram layout is cached next to the sections, and not at all with --no-cache.
+    cache_dir = None if args.no_cache else args.cache_dir
+    catalog = None
+    stats = None
+    pool = None
+    chapters = []
+    if args.dsn is not None:
+        from cardinality import verify
+        from catalog_introspect import ConnectionPool, introspect
+
+        pool = ConnectionPool(args.dsn, args.schema)
+        catalog, stats = introspect(schema=args.schema, exact_counts=args.exact_counts, pool=pool)
+        chapters.append(("deployed", partial(deployed_section, stats)))
+        chapters.append(("cardinality", partial(cardinality_section, verify(pool, catalog))))
+    if args.data_profile is not None:
+        from data_profile import profile_database, profile_dump
+
+        if args.data_profile:
+            profiles = profile_dump(catalog or load_catalog(), args.data_profile)
+            source = f"the COPY files in {args.data_profile}"
+        else:
+            profiles = profile_database(pool, catalog)
+            source = "the database with COPY TO STDOUT"
+        chapters.append(("profile", partial(data_profile_section, profiles, source)))
+    if args.network is not None:
+        from criminal_graph import load_graph, summarize
+
+        source = args.network or pool
+        chapters.append(("network", partial(network_section, summarize(load_graph(source), source))))
+    if args.occupancy is not None:
+        from occupancy import load_timeline, summarize
+
+        chapters.append(("occupancy", partial(occupancy_section, summarize(load_timeline(args.occupancy or pool)))))
+    if args.probes or pool:
+        from probe_analysis import analyze, read_probe_file, read_probe_table
+
+        probes = read_probe_file(args.probes) if args.probes else read_probe_table(pool)
+        report = analyze(probes, catalog or load_catalog(), stats)
+        if report.probes:
+            chapters.append(("performance", partial(performance_section, report)))
+    if args.trigger_profile:
+        from trigger_profile import read_profile
 
+        chapters.append(("triggers", partial(trigger_profile_section, read_profile(args.trigger_profile))))
+    if pool:
+        pool.close()
+    if args.watch:
+        watch(formats, cache, chapters, cache_dir=cache_dir)
+        return
+    # Profiled builds render the formats one after another in this process, so every phase is recorded.
+    with profiling() if args.profile else nullcontext() as profile:
+        results = build(formats, cache=cache, catalog=catalog, chapters=chapters, parallel=profile is None, cache_dir=cache_dir)
+    for name, path, seconds, hits, misses in results:
+        print(f"{name}: {path} in {seconds:.2f}s ({hits} cached, {misses} rendered)")
+    if profile:
+        allocations = None
+        if args.profile_allocations:
+            # A second, uncached pass under tracemalloc: its wall times are inflated, so only allocations are kept.
+            # Modules the first pass imported (reportlab) are not imported again and do not show up.
+            with profiling(traced=True) as allocations:
+                build(formats, cache=SectionCache(enabled=False), catalog=catalog, chapters=chapters, parallel=False, cache_dir=None)
+        folded = os.path.splitext(args.profile)[0] + ".folded"
+        profile.write(args.profile, folded, allocations)
+        traced = allocations.phases if allocations else {}
+        print(f"\n{'phase':<64} {'calls':>6} {'total s':>8} {'self s':>8} {'RSS MB':>7} {'alloc MB':>9} {'peak MB':>8}")
+        for path, stats in sorted(profile.phases.items(), key=lambda item: -item[1]["seconds"]):
+            memory = traced.get(path)
+            memory = f"{memory['allocated_bytes'] / 2**20:>9.1f} {memory['peak_bytes'] / 2**20:>8.1f}" if memory else f"{'-':>9} {'-':>8}"
+            print(f"{path:<64} {stats['calls']:>6} {stats['seconds']:>8.3f} {stats['self_seconds']:>8.3f} {stats['peak_rss_mb']:>7.1f} {memory}")
+        if allocations:
+            print("alloc/peak MB come from a separate traced pass (tracemalloc, 1 frame); times and RSS from the untraced build")
+        print(f"profile: {args.profile}, {folded}")
 
 if __name__ == "__main__":
-    build()
+    main()
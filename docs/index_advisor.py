@@ -0,0 +1,200 @@
+import re
+import time
+from dataclasses import dataclass, field
+
+from schema_catalog import load_catalog, load_seed
+
+# Aggregate FILTER (WHERE ...) clauses and CASE expressions compare columns of rows that are
+# already joined; they never drive an index lookup.
+FILTER_CLAUSE = re.compile(r"\bFILTER\s*\(\s*WHERE\b[^()]*(?:\([^()]*\)[^()]*)*\)", re.I)
+CASE_EXPRESSION = re.compile(r"\bCASE\b.*?\bEND\b", re.I | re.S)
+JOIN_PREDICATE = re.compile(r"\b(\w+)\.(\w+)\s*=\s*(\w+)\.(\w+)\b")
+EQUALITY_FILTER = re.compile(r"\b(\w+)\.(\w+)\s*(?:=\s*(?:'|-?\d|\$)|IN\s*\()", re.I)
+RANGE_FILTER = re.compile(r"\b(\w+)\.(\w+)\s*(?:<=|>=|<|>|BETWEEN\b)", re.I)
+NULL_FILTER = re.compile(r"\b(\w+)\.(\w+)\s+IS\s+(NOT\s+)?NULL\b", re.I)
+# Used when a table has no seed rows to estimate from.
+DEFAULT_SELECTIVITY = 0.5
+
+
+@dataclass
+class Suggestion:
+    table: str
+    columns: tuple
+    where: str | None = None
+    reasons: list = field(default_factory=list)
+    selectivity: float | None = None
+    seed_rows: int = 0
+    score: float = 0.0
+
+    @property
+    def name(self):
+        suffix = "_partial" if self.where else ""
+        return f"idx_{self.table}_{'_'.join(self.columns)}{suffix}"
+
+    @property
+    def statement(self):
+        where = f" WHERE {self.where}" if self.where else ""
+        return f"CREATE INDEX IF NOT EXISTS {self.name} ON {self.table}({', '.join(self.columns)}){where};"
+
+
+@dataclass
+class Redundancy:
+    index: str
+    table: str
+    covered_by: str
+
+
+@dataclass
+class IndexAdvice:
+    suggestions: list = field(default_factory=list)
+    redundant: list = field(default_factory=list)
+    covered: int = 0
+
+
+def _key(columns):
+    # "risk_level DESC" and risk_level serve the same equality lookups.
+    return tuple(column.split()[0].strip('"') for column in columns)
+
+
+def _normalize(where):
+    return " ".join(where.split()).lower() if where else None
+
+
+def _covers(index_columns, index_where, columns, where):
+    if index_where and _normalize(index_where) != _normalize(where):
+        return False
+    prefix = index_columns[:len(columns)]
+    return len(prefix) == len(columns) and set(prefix) == set(columns)
+
+
+def existing_keys(catalog, table_name):
+    """(name, key columns, where) for every index on a table, including primary keys and unique constraints."""
+    table = catalog.tables[table_name]
+    keys = []
+    if table.primary_key:
+        keys.append((f"{table_name}_pkey", tuple(table.primary_key), None))
+    for unique in table.uniques:
+        keys.append((f"{table_name}_{'_'.join(unique)}_key", tuple(unique), None))
+    for index in catalog.indexes:
+        if index.table == table_name:
+            keys.append((index.name, _key(index.columns), index.where))
+    return keys
+
+
+def view_predicates(view):
+    """Yield (table, columns, where, reason) access paths implied by a view's joins and filters."""
+    aliases = {alias: table for table, alias in view.sources}
+    sql = CASE_EXPRESSION.sub(" ", FILTER_CLAUSE.sub(" ", view.sql))
+    filters = {}
+    nulls = {}
+    for alias, column in EQUALITY_FILTER.findall(sql):
+        if alias in aliases:
+            filters.setdefault(alias, []).append(column)
+    for alias, column in RANGE_FILTER.findall(sql):
+        if alias in aliases and column not in filters.get(alias, []):
+            filters.setdefault(alias, []).append(column)
+    for alias, column, negated in NULL_FILTER.findall(sql):
+        if alias in aliases:
+            nulls.setdefault(alias, []).append(f"{column} IS {'NOT ' if negated else ''}NULL")
+
+    def where(alias):
+        return " AND ".join(nulls[alias]) if alias in nulls else None
+
+    for left_alias, left, right_alias, right in JOIN_PREDICATE.findall(sql):
+        for alias, column, other in ((left_alias, left, right_alias), (right_alias, right, left_alias)):
+            if alias in aliases and other in aliases:
+                yield aliases[alias], (column,), where(alias), f"join in {view.name}"
+    for alias, columns in filters.items():
+        yield aliases[alias], tuple(dict.fromkeys(columns)), where(alias), f"filter in {view.name}"
+
+
+def foreign_key_predicates(catalog):
+    for fk in catalog.foreign_keys():
+        action = f", ON DELETE {fk.on_delete}" if fk.on_delete else ""
+        yield fk.table, tuple(fk.columns), None, f"FK → {fk.ref_table}{action}"
+
+
+def _where_matches(row, positions, where):
+    for predicate in where.split(" AND "):
+        column, _, test = predicate.partition(" IS ")
+        value = row[positions[column]] if column in positions else None
+        if (value is None) != (test == "NULL"):
+            return False
+    return True
+
+
+def estimate_selectivity(seed_table, columns, where):
+    """Fraction of the indexed rows one equality lookup returns, and how many seed rows the index would hold."""
+    if seed_table is None or not seed_table.rows:
+        return None, 0
+    positions = {column: i for i, column in enumerate(seed_table.columns)}
+    rows = seed_table.rows
+    if where:
+        rows = [row for row in rows if _where_matches(row, positions, where)]
+    if not rows:
+        return None, 0
+    keys = {tuple(row[positions[c]] if c in positions else None for c in columns) for row in rows}
+    return 1 / len(keys), len(rows)
+
+
+def advise(catalog, seed=None):
+    """Rank CREATE INDEX suggestions for FK columns and view predicates no existing index serves."""
+    seed = load_seed(catalog) if seed is None else seed
+    advice = IndexAdvice()
+
+    needs = {}
+    predicates = list(foreign_key_predicates(catalog))
+    for view in catalog.views:
+        predicates.extend(view_predicates(view))
+    for table, columns, where, reason in predicates:
+        if table not in catalog.tables or not all(catalog.tables[table].column(c) for c in columns):
+            continue
+        need = needs.setdefault((table, columns, where), Suggestion(table, columns, where))
+        if reason not in need.reasons:
+            need.reasons.append(reason)
+
+    # Widest first, so a composite suggestion absorbs narrower needs that are its prefix.
+    chosen = []
+    for need in sorted(needs.values(), key=lambda need: (need.table, -len(need.columns), need.columns)):
+        if any(_covers(key, key_where, need.columns, need.where) for _, key, key_where in existing_keys(catalog, need.table)):
+            advice.covered += 1
+            continue
+        wider = next(
+            (s for s in chosen if s.table == need.table and _covers(s.columns, s.where, need.columns, need.where)),
+            None,
+        )
+        if wider:
+            wider.reasons.extend(reason for reason in need.reasons if reason not in wider.reasons)
+            continue
+        chosen.append(need)
+
+    for suggestion in chosen:
+        suggestion.selectivity, suggestion.seed_rows = estimate_selectivity(seed.get(suggestion.table), suggestion.columns, suggestion.where)
+        selectivity = DEFAULT_SELECTIVITY if suggestion.selectivity is None else suggestion.selectivity
+        suggestion.score = round(len(suggestion.reasons) * (1 - selectivity), 3)
+    advice.suggestions = sorted(chosen, key=lambda s: (-s.score, s.table, s.columns))
+
+    for table_name in catalog.tables:
+        keys = existing_keys(catalog, table_name)
+        for index in catalog.indexes:
+            if index.table != table_name:
+                continue
+            columns = _key(index.columns)
+            for name, key, key_where in keys:
+                if name != index.name and len(key) > len(columns) and key[:len(columns)] == columns and _normalize(key_where) == _normalize(index.where):
+                    advice.redundant.append(Redundancy(index.name, table_name, name))
+                    break
+    return advice
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    catalog = load_catalog()
+    advice = advise(catalog)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"{len(advice.suggestions)} suggestions, {advice.covered} access paths already indexed, {len(advice.redundant)} redundant indexes in {elapsed_ms:.1f} ms")
+    for rank, suggestion in enumerate(advice.suggestions, 1):
+        selectivity = "n/a" if suggestion.selectivity is None else f"{suggestion.selectivity:.2f}"
+        print(f"{rank:>2}. {suggestion.statement}  -- score {suggestion.score}, selectivity {selectivity}; {'; '.join(suggestion.reasons)}")
+    for item in advice.redundant:
+        print(f"    {item.index} is a prefix of {item.covered_by}")
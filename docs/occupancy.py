@@ -0,0 +1,349 @@
+import argparse
+import sys
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from criminal_graph import scan
+from synth_data import OUTPUT_DIR
+
+# Charted and tabled around the as-of day: this much history, and this far ahead from pending bail dates.
+HISTORY_DAYS = 730
+HORIZON_DAYS = 180
+FORECAST_DAYS = (30, 90, 180)
+CHART_STEP_DAYS = 7
+CHART_JAILS = 4
+TOP_BLOCKS = 10
+TOP_CELLS = 10
+# Cells whose daily curves are held at once; 4,096 cells over 911 days is about 30 MB of counts.
+CELL_CHUNK = 4096
+NO_DAY = np.iinfo(np.int32).max
+BENCH_INTERVALS = 10_000_000
+EPOCH = np.datetime64("1970-01-01")
+
+
+def day_numbers(values):
+    """Days since 1970-01-01 from the leading YYYY-MM-DD of COPY date or timestamp fields; NULL is NO_DAY.
+
+    Timestamps keep the calendar day they were written in (+06 for synth_data.py dumps, the session
+    time zone for COPY from a database).
+    """
+    if not values:
+        return np.zeros(0, dtype=np.int32)
+    digits = np.array(values, dtype="S10").view(np.uint8).reshape(-1, 10).astype(np.int32) - ord("0")
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 5] * 10 + digits[:, 6]
+    day = digits[:, 8] * 10 + digits[:, 9]
+    # Howard Hinnant's days_from_civil, with March as the first month so leap days come last.
+    year -= month <= 2
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    days = era * 146097 + day_of_era - 719468
+    days[digits[:, 0] == ord("\\") - ord("0")] = NO_DAY
+    return days.astype(np.int32)
+
+
+def _ids(values):
+    ids = np.array(values)
+    ids[ids == b"\\N"] = b"-1"
+    return ids.astype(np.int64)
+
+
+def _dense(ids, values, fill):
+    """values[i] placed at position ids[i] of an array covering every id."""
+    out = np.full(int(ids.max()) + 1 if len(ids) else 0, fill, dtype=np.asarray(values).dtype)
+    out[ids] = values
+    return out
+
+
+def _texts(values):
+    return [value.decode("utf-8", "replace") for value in values]
+
+
+@dataclass
+class Timeline:
+    """Incarceration intervals [start, end) in day numbers, with the places they are in and their capacities.
+
+    jail, block and cell are ids; place arrays are indexed by id, so a jail's capacity is jail_capacity[jail_id].
+    """
+
+    jail: np.ndarray
+    cell: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    # the arrest's bail_due_date, NO_DAY when it has none
+    bail: np.ndarray
+    cell_block: np.ndarray
+    cell_capacity: np.ndarray
+    block_jail: np.ndarray
+    block_capacity: np.ndarray
+    jail_capacity: np.ndarray
+    jail_names: dict = field(default_factory=dict)
+    block_names: dict = field(default_factory=dict)
+    cell_numbers: dict = field(default_factory=dict)
+
+    @property
+    def block(self):
+        return np.where(self.cell >= 0, self.cell_block[np.maximum(self.cell, 0)], -1)
+
+    def __len__(self):
+        return len(self.start)
+
+
+def _concat(parts, column, dtype):
+    return np.concatenate([np.zeros(0, dtype=dtype)] + [part[column] for part in parts])
+
+
+def load_timeline(source):
+    """Bulk-load incarcerations, bail due dates and the jail, block and cell tables from a dump directory or a ConnectionPool."""
+    jails = scan(source, "jails", ["jail_id", "name", "capacity"], lambda ids, names, capacity: (_ids(ids), names, _ids(capacity)))
+    blocks = scan(
+        source, "cell_blocks", ["block_id", "jail_id", "block_name", "capacity"],
+        lambda ids, jail, names, capacity: (_ids(ids), _ids(jail), names, _ids(capacity)),
+    )
+    cells = scan(
+        source, "cells", ["cell_id", "block_id", "cell_number", "capacity"],
+        lambda ids, block, numbers, capacity: (_ids(ids), _ids(block), numbers, _ids(capacity)),
+    )
+    arrests = scan(source, "arrest_records", ["arrest_id", "bail_due_date"], lambda ids, bail: (_ids(ids), day_numbers(bail)))
+    stays = scan(
+        source, "incarcerations", ["arrest_id", "jail_id", "cell_id", "admitted_at", "released_at"],
+        lambda arrest, jail, cell, admitted, released: (_ids(arrest), _ids(jail).astype(np.int32), _ids(cell).astype(np.int32),
+                                                        day_numbers(admitted), day_numbers(released)),
+    )
+
+    jail_ids, block_ids, cell_ids = _concat(jails, 0, np.int64), _concat(blocks, 0, np.int64), _concat(cells, 0, np.int64)
+    bail_by_arrest = _dense(_concat(arrests, 0, np.int64), _concat(arrests, 1, np.int32), NO_DAY)
+    arrest = _concat(stays, 0, np.int64)
+    known = arrest < len(bail_by_arrest)
+    bail = np.full(len(arrest), NO_DAY, dtype=np.int32)
+    bail[known] = bail_by_arrest[arrest[known]]
+    return Timeline(
+        jail=_concat(stays, 1, np.int32),
+        cell=_concat(stays, 2, np.int32),
+        start=_concat(stays, 3, np.int32),
+        end=_concat(stays, 4, np.int32),
+        bail=bail,
+        cell_block=_dense(cell_ids, _concat(cells, 1, np.int64), -1),
+        cell_capacity=_dense(cell_ids, _concat(cells, 3, np.int64), 0),
+        block_jail=_dense(block_ids, _concat(blocks, 1, np.int64), -1),
+        block_capacity=_dense(block_ids, _concat(blocks, 3, np.int64), 0),
+        jail_capacity=_dense(jail_ids, _concat(jails, 2, np.int64), 0),
+        jail_names=dict(zip(jail_ids.tolist(), _texts(name for part in jails for name in part[1]))),
+        block_names=dict(zip(block_ids.tolist(), _texts(name for part in blocks for name in part[2]))),
+        cell_numbers=dict(zip(cell_ids.tolist(), _texts(number for part in cells for number in part[2]))),
+    )
+
+
+def daily_counts(groups, starts, ends, groups_count, first, days, out=None):
+    """Intervals open on each of `days` days from `first`, per group, as a (groups_count, days) array.
+
+    A sweep line without the sort: every interval adds +1 on its first day and -1 on the day it ends,
+    both counted with one bincount, and a prefix sum along each row turns the events into occupancy.
+    Intervals starting before the window count from its first day. The counts go into `out` when given.
+    """
+    starts = np.clip(starts.astype(np.int64) - first, 0, days)
+    ends = np.clip(ends.astype(np.int64) - first, 0, days)
+    keep = (starts < ends) & (groups >= 0) & (groups < groups_count)
+    width = days + 1
+    base = groups[keep].astype(np.int64) * width
+    size = groups_count * width
+    events = np.bincount(base + starts[keep], minlength=size)
+    events -= np.bincount(base + ends[keep], minlength=size)
+    return np.cumsum(events.reshape(groups_count, width)[:, :days], axis=1, dtype=np.int32, out=out)
+
+
+def projected_ends(timeline, as_of):
+    """End days as known on as_of: an interval still open then is expected to end on a later bail due date.
+
+    Intervals that start after as_of are dropped (end = start), so days past as_of only count
+    prisoners already held; admissions are not forecast.
+    """
+    ends = np.where(timeline.end > as_of, np.minimum(timeline.end, np.where(timeline.bail > as_of, timeline.bail, NO_DAY)), timeline.end)
+    return np.where(timeline.start > as_of, timeline.start, ends)
+
+
+def cell_curves(timeline, ends, first, days, chunk=CELL_CHUNK):
+    """(cell ids, daily counts) for cells in chunks of `chunk`, so the whole cell × day matrix never exists at once.
+
+    The counts array is reused for every chunk: read what is needed from it before asking for the next one.
+    """
+    cell_count = len(timeline.cell_capacity)
+    chunks = -(-cell_count // chunk)
+    # Intervals only need grouping by chunk, not sorting by cell: a stable argsort of a uint16 key is a
+    # radix sort, linear in the intervals. Cells outside the table land in a last bucket that is skipped.
+    bucket = np.where((timeline.cell >= 0) & (timeline.cell < cell_count), timeline.cell // chunk, chunks)
+    order = np.argsort(bucket.astype(np.uint16 if chunks < 1 << 16 else np.int64), kind="stable")
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(bucket, minlength=chunks + 1))])
+    cells, starts, stops = timeline.cell[order], timeline.start[order], ends[order]
+    out = np.empty((min(chunk, cell_count), days), dtype=np.int32)
+    for index, low in enumerate(range(0, cell_count, chunk)):
+        high = min(low + chunk, cell_count)
+        part = slice(bounds[index], bounds[index + 1])
+        yield np.arange(low, high), daily_counts(cells[part] - low, starts[part], stops[part], high - low, first, days, out[:high - low])
+
+
+@dataclass
+class OccupancySummary:
+    as_of: str
+    intervals: int
+    held: int
+    # prisoners held on the as-of day whose arrest has a bail due date after it
+    pending_bail: int
+    # (jail, capacity, now, peak over the history window, peak date, *forecasts in FORECAST_DAYS order)
+    jails: list = field(default_factory=list)
+    # (jail, block, capacity, now, forecast at FORECAST_DAYS[0]) for the fullest blocks
+    blocks: list = field(default_factory=list)
+    cells: int = 0
+    cells_over: int = 0
+    cells_over_forecast: int = 0
+    # (jail, block, cell number, capacity, now) for the most overcrowded cells
+    crowded_cells: list = field(default_factory=list)
+    # (title, x labels, ((series name, values), ...), index of the as-of point)
+    charts: list = field(default_factory=list)
+    seconds: dict = field(default_factory=dict)
+
+
+def _date(day):
+    return str(EPOCH + np.timedelta64(int(day), "D"))
+
+
+def _chart(title, curve, capacity, first, today, step=CHART_STEP_DAYS):
+    # Every step-th day, lined up so the as-of day is one of the points; the last tuple item is its index.
+    points = np.arange(today % step, len(curve), step)
+    labels = [_date(first + int(point))[:7] for point in points]
+    series = [("held", tuple(int(value) for value in curve[points]))]
+    if capacity:
+        series.append(("capacity", (int(capacity),) * len(points)))
+    return title, tuple(labels), tuple(series), today // step
+
+
+def summarize(timeline, as_of=None, history=HISTORY_DAYS, horizon=HORIZON_DAYS):
+    """Daily curves per jail, block and cell around as_of (default: the latest admission) and what they show."""
+    timings = {}
+    if as_of is None:
+        as_of = int(timeline.start.max()) if len(timeline) else 0
+    first, days = as_of - history, history + horizon + 1
+    today = history
+    ahead = [today + offset for offset in FORECAST_DAYS if offset <= horizon]
+    started = time.perf_counter()
+    ends = projected_ends(timeline, as_of)
+    held = (timeline.start <= as_of) & (timeline.end > as_of)
+    summary = OccupancySummary(
+        _date(as_of), len(timeline), int(held.sum()), int(np.count_nonzero(held & (timeline.bail > as_of) & (timeline.bail < timeline.end))),
+    )
+    timings["projection"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    jails = daily_counts(timeline.jail, timeline.start, ends, len(timeline.jail_capacity), first, days)
+    timings["jails"] = time.perf_counter() - started
+    # Fullest first, by the share of capacity held on the as-of day.
+    filled = np.flatnonzero(timeline.jail_capacity)
+    filled = filled[np.argsort(-jails[filled, today] / timeline.jail_capacity[filled], kind="stable")]
+    summary.charts.append(_chart("All jails", jails.sum(axis=0), int(timeline.jail_capacity.sum()), first, today))
+    for rank, jail in enumerate(filled):
+        curve = jails[jail]
+        name = timeline.jail_names.get(int(jail), str(jail))
+        peak = int(np.argmax(curve[:today + 1]))
+        summary.jails.append(
+            (name, int(timeline.jail_capacity[jail]), int(curve[today]), int(curve[peak]), _date(first + peak),
+             *(int(curve[day]) for day in ahead))
+        )
+        if rank < CHART_JAILS:
+            summary.charts.append(_chart(name, curve, int(timeline.jail_capacity[jail]), first, today))
+
+    started = time.perf_counter()
+    blocks = daily_counts(timeline.block, timeline.start, ends, len(timeline.block_capacity), first, days)
+    timings["blocks"] = time.perf_counter() - started
+    filled = np.flatnonzero(timeline.block_capacity)
+    ratio = blocks[filled, today] / timeline.block_capacity[filled]
+    for block in filled[np.argsort(-ratio, kind="stable")[:TOP_BLOCKS]]:
+        summary.blocks.append(
+            (timeline.jail_names.get(int(timeline.block_jail[block]), "-"), timeline.block_names.get(int(block), str(block)),
+             int(timeline.block_capacity[block]), int(blocks[block, today]), int(blocks[block, ahead[0]]) if ahead else None)
+        )
+
+    started = time.perf_counter()
+    over_ids, over_counts = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int32)]
+    for ids, counts in cell_curves(timeline, ends, first, days):
+        capacity = timeline.cell_capacity[ids]
+        real = capacity > 0
+        over = real & (counts[:, today] > capacity)
+        summary.cells += int(real.sum())
+        summary.cells_over += int(over.sum())
+        if ahead:
+            summary.cells_over_forecast += int(np.count_nonzero(real & (counts[:, ahead[0]] > capacity)))
+        over_ids.append(ids[over])
+        over_counts.append(counts[over, today])
+    timings["cells"] = time.perf_counter() - started
+    over_ids, over_counts = np.concatenate(over_ids), np.concatenate(over_counts)
+    fullest = np.argsort(-over_counts / timeline.cell_capacity[over_ids], kind="stable")[:TOP_CELLS]
+    for cell, now in zip(over_ids[fullest].tolist(), over_counts[fullest].tolist()):
+        block = int(timeline.cell_block[cell])
+        summary.crowded_cells.append(
+            (timeline.jail_names.get(int(timeline.block_jail[block]), "-"), timeline.block_names.get(block, str(block)),
+             timeline.cell_numbers.get(cell, str(cell)), int(timeline.cell_capacity[cell]), now)
+        )
+    summary.seconds = timings
+    return summary
+
+
+def synthetic_timeline(intervals, jails=68, blocks=1_000, cells=40_000, days=4_000, seed=7):
+    """Uniformly placed stays of up to two years, for timing the sweep without a dump."""
+    rng = np.random.default_rng(seed)
+    cell = rng.integers(1, cells + 1, intervals, dtype=np.int32)
+    cell_block = np.concatenate([[-1], rng.integers(1, blocks + 1, cells)])
+    block_jail = np.concatenate([[-1], rng.integers(1, jails + 1, blocks)])
+    start = rng.integers(0, days, intervals, dtype=np.int32) + 16_436
+    end = np.where(rng.random(intervals) < 0.1, NO_DAY, start + rng.integers(1, 720, intervals, dtype=np.int32))
+    bail = np.where(rng.random(intervals) < 0.4, start + rng.integers(1, 180, intervals, dtype=np.int32), NO_DAY)
+    return Timeline(
+        jail=block_jail[cell_block[cell]].astype(np.int32), cell=cell, start=start, end=end.astype(np.int32), bail=bail.astype(np.int32),
+        cell_block=cell_block, cell_capacity=np.concatenate([[0], rng.integers(1, 9, cells)]),
+        block_jail=block_jail, block_capacity=np.concatenate([[0], rng.integers(100, 400, blocks)]),
+        jail_capacity=np.concatenate([[0], rng.integers(2_000, 8_000, jails)]),
+        jail_names={jail: f"Jail {jail}" for jail in range(1, jails + 1)},
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daily jail, block and cell occupancy from incarcerations, with a bail-date forecast.")
+    parser.add_argument("--dsn", help="load from a running database with COPY TO STDOUT ('' uses PG* variables)")
+    parser.add_argument("--dump", default=OUTPUT_DIR, help="synth_data.py output directory, used without --dsn")
+    parser.add_argument("--as-of", help="day to measure from, YYYY-MM-DD (default: the latest admission)")
+    parser.add_argument("--bench", type=int, nargs="?", const=BENCH_INTERVALS, metavar="INTERVALS", help="time the sweep on random intervals instead")
+    args = parser.parse_args(argv)
+
+    pool = None
+    started = time.perf_counter()
+    if args.bench:
+        timeline = synthetic_timeline(args.bench)
+        print(f"{len(timeline):,} random intervals generated in {time.perf_counter() - started:.2f}s")
+    else:
+        if args.dsn is not None:
+            from catalog_introspect import ConnectionPool
+
+            pool = ConnectionPool(args.dsn)
+        timeline = load_timeline(pool or args.dump)
+        print(f"{len(timeline):,} incarcerations loaded in {time.perf_counter() - started:.2f}s")
+    as_of = None if args.as_of is None else int((np.datetime64(args.as_of) - EPOCH).astype(np.int64))
+    started = time.perf_counter()
+    summary = summarize(timeline, as_of)
+    print(
+        f"as of {summary.as_of}: {summary.held:,} held, {summary.pending_bail:,} with a pending bail date; "
+        f"{summary.cells_over:,} of {summary.cells:,} cells over capacity ({summary.cells_over_forecast:,} in {FORECAST_DAYS[0]} days)"
+    )
+    print("  ".join(f"{name} {seconds:.2f}s" for name, seconds in summary.seconds.items()) + f"  total {time.perf_counter() - started:.2f}s")
+    print(f"{'jail':<28} {'capacity':>9} {'now':>8} {'peak':>8} {'peak day':>11}" + "".join(f" {f'+{d}d':>8}" for d in FORECAST_DAYS))
+    for name, capacity, now, peak, peak_day, *ahead in summary.jails[:15]:
+        print(f"{name[:28]:<28} {capacity:>9,} {now:>8,} {peak:>8,} {peak_day:>11}" + "".join(f" {value:>8,}" for value in ahead))
+    if pool:
+        pool.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,679 @@
+"""Range-partition the append-heavy tables by their time column, and move existing rows over online.
+
+The planner picks monthly or yearly partitions from the row count and date span (synth_data.py's profile
+offline, the live table with --dsn) and writes the partitioned DDL. PostgreSQL only enforces a primary key or
+UNIQUE constraint on a partitioned table when it contains the partition key. A key that still has to be unique on
+its own, because a foreign key points at it or because it is a UNIQUE such as case_files.case_number, moves to a
+<table>_<columns>_keys table kept in step by statement-level triggers, and the referencing foreign keys move there too.
+
+The migration builds <table>_partitioned next to the live table and mirrors every write into it with triggers.
+It copies the existing rows in short keyed batches, then swaps the names in one brief transaction. The old table
+is kept as <table>_old until --drop-old.
+"""
+import argparse
+import datetime
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+
+from rollups import SERIAL_KEY_TYPES
+from schema_catalog import load_catalog
+
+# Append-only tables and the time column each one grows along.
+PARTITION_KEYS = {
+    "criminal_locations": "noted_at",
+    "gd_reports": "submitted_at",
+    "arrest_records": "arrest_date",
+    "case_files": "filed_at",
+}
+INTERVALS = ("month", "year")
+# A month gets its own partition once it holds this many rows; below that, one partition per year.
+MONTHLY_MIN_ROWS = 250_000
+# Empty partitions created past the newest row; later rows land in the DEFAULT partition.
+AHEAD = 3
+# Partitions start at local midnight, not UTC.
+TIMEZONE = "Asia/Dhaka"
+BATCH_ROWS = 20_000
+PAUSE_SECONDS = 0.05
+# Batches and the final swap give up on a lock after this long and retry, instead of queueing writers behind them.
+LOCK_TIMEOUT = "2s"
+CUTOVER_ATTEMPTS = 30
+BENCH_ROWS = 50_000_000
+BENCH_SCALE = 0.001
+BENCH_TRIALS = 5
+BENCH_BATCH_ROWS = 200_000
+SAMPLE_CRIMINALS = 1_000
+# The newest-row-per-parent shape (ORDER BY <key> DESC LIMIT 1) that has to visit every partition.
+NEWEST_ROW = r"FROM\s+{table}\b[^()]*ORDER\s+BY\s+{key}\s+DESC\s+LIMIT\s+1"
+
+BACKFILL_SQL = """
+INSERT INTO {staging} ({columns})
+SELECT {columns} FROM {table} WHERE {id} >= %s AND {id} < %s
+FOR SHARE
+ON CONFLICT ({primary_key}) DO NOTHING
+"""
+# pg_partition_tree() is empty for a plain table, so the table itself is included.
+LARGEST_INDEX_SQL = """
+SELECT max(pg_relation_size(i.indexrelid))
+FROM pg_index i
+WHERE i.indrelid = %(table)s::regclass OR i.indrelid IN (SELECT relid FROM pg_partition_tree(%(table)s) WHERE isleaf)
+"""
+
+BENCH_QUERIES = {
+    "one month": (
+        "SELECT count(*) FROM criminal_locations "
+        "WHERE noted_at >= %(month)s AND noted_at < %(month)s::timestamptz + interval '1 month'"
+    ),
+    "criminal, last 90 days": (
+        "SELECT noted_at, location_id FROM criminal_locations "
+        "WHERE criminal_id = %(criminal)s AND noted_at >= %(recent)s ORDER BY noted_at DESC"
+    ),
+    "v_criminal_last_location": "SELECT * FROM v_criminal_last_location WHERE criminal_id = ANY(%(criminals)s::uuid[])",
+}
+
+
+@dataclass
+class GlobalKey:
+    """A key that must stay unique across partitions, enforced through its own table."""
+
+    table: str
+    columns: tuple
+    types: tuple
+    referenced_by: list = field(default_factory=list)
+
+
+@dataclass
+class PartitionPlan:
+    table: str
+    key: str
+    key_type: str
+    interval: str
+    first: datetime.date
+    end: datetime.date
+    rows: int
+    columns: list
+    id_column: str
+    primary_key: tuple
+    global_keys: list = field(default_factory=list)
+    indexes: list = field(default_factory=list)
+    foreign_keys: list = field(default_factory=list)
+    notes: list = field(default_factory=list)
+
+    @property
+    def staging(self):
+        return f"{self.table}_partitioned"
+
+    @property
+    def old(self):
+        return f"{self.table}_old"
+
+    def partitions(self):
+        """(name, start, end) for each range partition, oldest first."""
+        day = self.first
+        while day < self.end:
+            following = _advance(day, self.interval)
+            suffix = f"m{day:%Y%m}" if self.interval == "month" else f"y{day:%Y}"
+            yield f"{self.table}_{suffix}", day, following
+            day = following
+
+
+def _advance(day, interval, count=1):
+    if interval == "year":
+        return day.replace(year=day.year + count)
+    months = day.year * 12 + day.month - 1 + count
+    return day.replace(year=months // 12, month=months % 12 + 1)
+
+
+def _truncate(day, interval):
+    return day.replace(month=1, day=1) if interval == "year" else day.replace(day=1)
+
+
+def _bound(plan, day):
+    if plan.key_type == "DATE":
+        return f"'{day.isoformat()}'"
+    return f"'{day.isoformat()} 00:00:00 {TIMEZONE}'"
+
+
+def _local_day(key, key_type):
+    return key if key_type == "DATE" else f"({key} AT TIME ZONE '{TIMEZONE}')::date"
+
+
+def plan_partitions(catalog, table_name, rows, first, last, interval=None, ahead=AHEAD):
+    """Partition layout and key rewrites for one table whose key spans first..last."""
+    table = catalog.tables[table_name]
+    key = PARTITION_KEYS[table_name]
+    if len(table.primary_key) != 1:
+        raise ValueError(f"{table_name}: the online migration copies by a single-column primary key")
+    id_column = table.primary_key[0]
+    months = (last.year - first.year) * 12 + last.month - first.month + 1
+    interval = interval or ("month" if rows / months >= MONTHLY_MIN_ROWS else "year")
+    start = _truncate(first, interval)
+    plan = PartitionPlan(
+        table=table_name,
+        key=key,
+        key_type=table.column(key).data_type,
+        interval=interval,
+        first=start,
+        end=_advance(_truncate(last, interval), interval, 1 + ahead),
+        rows=rows,
+        columns=[column.name for column in table.columns],
+        id_column=id_column,
+        primary_key=table.primary_key if key in table.primary_key else table.primary_key + (key,),
+        indexes=[index for index in catalog.indexes if index.table == table_name],
+        foreign_keys=list(table.foreign_keys),
+    )
+    count = sum(1 for _ in plan.partitions())
+    filled = months if interval == "month" else last.year - first.year + 1
+    plan.notes.append(
+        f"{count} {interval}ly partitions from {start:%Y-%m} (about {rows // filled:,} rows each) plus "
+        f"{table_name}_default; the primary key becomes ({', '.join(plan.primary_key)})"
+    )
+    incoming = [fk for fk in catalog.referencing(table_name) if fk.table != table_name]
+    for unique in [table.primary_key, *table.uniques]:
+        if key in unique:
+            continue
+        referencing = [fk for fk in incoming if tuple(fk.ref_columns) == tuple(unique)]
+        if unique == table.primary_key and not referencing:
+            plan.notes.append(f"{id_column} stays unique through its sequence; a lookup by {id_column} alone probes every partition")
+            continue
+        types = tuple(SERIAL_KEY_TYPES.get(table.column(c).data_type, table.column(c).data_type) for c in unique)
+        global_key = GlobalKey(f"{table_name}_{'_'.join(unique)}_keys", tuple(unique), types, referencing)
+        plan.global_keys.append(global_key)
+        sources = ", ".join(f"{fk.table}.{'/'.join(fk.columns)}" for fk in referencing)
+        why = f"referenced by {sources}" if referencing else "UNIQUE"
+        plan.notes.append(f"({', '.join(unique)}) is {why}: enforced through {global_key.table}")
+    newest = re.compile(NEWEST_ROW.format(table=table_name, key=key), re.I | re.S)
+    for view in catalog.views:
+        if newest.search(view.sql):
+            plan.notes.append(f"{view.name} reads the newest {table_name} row per parent, which visits every partition")
+    return plan
+
+
+def synth_stats(catalog, scale=1.0):
+    """{table: (rows, first day, last day)} for synth_data.py's profile at scale."""
+    from synth_data import DAYS, FIRST_DAY, build_plans
+
+    rows = {plan.name: plan.rows for plan in build_plans(catalog, scale)}
+    first = FIRST_DAY.astype(datetime.date)
+    # synth_data spreads event dates over DAYS - 720 days; the tail is only reachable by "after" columns.
+    last = first + datetime.timedelta(days=DAYS - 721)
+    return {name: (rows.get(name, 0), first, last) for name in PARTITION_KEYS}
+
+
+def live_stats(cursor, catalog, table_name):
+    key = PARTITION_KEYS[table_name]
+    day = _local_day(key, catalog.tables[table_name].column(key).data_type)
+    cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", (table_name,))
+    rows = cursor.fetchone()[0]
+    if rows < 0:
+        cursor.execute(f"SELECT count(*) FROM {table_name}")
+        rows = cursor.fetchone()[0]
+    cursor.execute(f"SELECT min({day}), max({day}) FROM {table_name}")
+    first, last = cursor.fetchone()
+    today = datetime.date.today()
+    return rows, first or today, last or today
+
+
+def create_sql(plan):
+    """The partitioned table, its partitions, keys, foreign keys and indexes, and the global key tables."""
+    statements = [
+        f"CREATE TABLE {plan.staging} (LIKE {plan.table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE "
+        f"INCLUDING COMMENTS) PARTITION BY RANGE ({plan.key})",
+        *(
+            f"CREATE TABLE {name} PARTITION OF {plan.staging} FOR VALUES FROM ({_bound(plan, start)}) TO ({_bound(plan, end)})"
+            for name, start, end in plan.partitions()
+        ),
+        f"CREATE TABLE {plan.table}_default PARTITION OF {plan.staging} DEFAULT",
+        f"ALTER TABLE {plan.staging} ADD CONSTRAINT {plan.table}_pkey_new PRIMARY KEY ({', '.join(plan.primary_key)})",
+    ]
+    # PostgreSQL 16 cannot add a NOT VALID foreign key to a partitioned table, so these check each row as it is copied.
+    for fk in plan.foreign_keys:
+        name = fk.name or f"{plan.table}_{'_'.join(fk.columns)}_fkey"
+        action = f" ON DELETE {fk.on_delete}" if fk.on_delete else ""
+        statements.append(
+            f"ALTER TABLE {plan.staging} ADD CONSTRAINT {name} FOREIGN KEY ({', '.join(fk.columns)}) "
+            f"REFERENCES {fk.ref_table}({', '.join(fk.ref_columns)}){action}"
+        )
+    for index in plan.indexes:
+        where = f" WHERE {index.where}" if index.where else ""
+        unique = "UNIQUE " if index.unique else ""
+        statements.append(f"CREATE {unique}INDEX {index.name}_new ON {plan.staging} ({', '.join(index.columns)}){where}")
+    if plan.global_keys:
+        statements += _global_key_sql(plan)
+    return statements
+
+
+def _matches(columns, left, right):
+    return " AND ".join(f"{left}.{column} = {right}.{column}" for column in columns)
+
+
+def _global_key_sql(plan):
+    statements = []
+    inserted, updated_out, updated_in, deleted, truncated = [], [], [], [], []
+    for key in plan.global_keys:
+        names = ", ".join(key.columns)
+        definition = ", ".join(f"{column} {data_type} NOT NULL" for column, data_type in zip(key.columns, key.types))
+        statements.append(f"CREATE TABLE {key.table} ({definition}, PRIMARY KEY ({names}))")
+        selected = ", ".join(f"n.{column}" for column in key.columns)
+        inserted.append(f"INSERT INTO {key.table} ({names}) SELECT {names} FROM new_rows;")
+        updated_out.append(
+            f"DELETE FROM {key.table} k USING old_rows o WHERE {_matches(key.columns, 'k', 'o')}\n"
+            f"          AND NOT EXISTS (SELECT 1 FROM new_rows n WHERE {_matches(key.columns, 'n', 'o')});"
+        )
+        updated_in.append(
+            f"INSERT INTO {key.table} ({names}) SELECT {selected} FROM new_rows n\n"
+            f"        WHERE NOT EXISTS (SELECT 1 FROM old_rows o WHERE {_matches(key.columns, 'o', 'n')});"
+        )
+        deleted.append(f"DELETE FROM {key.table} k USING old_rows o WHERE {_matches(key.columns, 'k', 'o')};")
+        # DELETE rather than TRUNCATE, so the moved foreign keys apply their ON DELETE actions.
+        truncated.append(f"DELETE FROM {key.table};")
+    separator = "\n        "
+    statements.append(
+        f"""CREATE OR REPLACE FUNCTION fn_partition_keys_{plan.table}()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- A duplicate key fails the INSERT into the key table, and with it the statement that wrote it.
+    IF TG_OP = 'INSERT' THEN
+        {separator.join(inserted)}
+    ELSIF TG_OP = 'DELETE' THEN
+        {separator.join(deleted)}
+    ELSIF TG_OP = 'UPDATE' THEN
+        {separator.join(updated_out)}
+        {separator.join(updated_in)}
+    ELSE
+        {separator.join(truncated)}
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql"""
+    )
+    statements += _statement_triggers(f"trg_partition_keys_{plan.table}", plan.staging, f"fn_partition_keys_{plan.table}")
+    return statements
+
+
+def _statement_triggers(prefix, table, function):
+    return [
+        f"CREATE TRIGGER {prefix}_{event}\nAFTER {event.upper()} ON {table}\n{referencing}FOR EACH STATEMENT\nEXECUTE FUNCTION {function}()"
+        for event, referencing in (
+            ("insert", "REFERENCING NEW TABLE AS new_rows "),
+            ("update", "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "),
+            ("delete", "REFERENCING OLD TABLE AS old_rows "),
+            ("truncate", ""),
+        )
+    ]
+
+
+def mirror_sql(plan):
+    """Triggers on the live table that repeat every write on the partitioned copy while rows are moved."""
+    columns = ", ".join(plan.columns)
+    conflict = ", ".join(plan.primary_key)
+    assignments = ", ".join(f"{c} = EXCLUDED.{c}" for c in plan.columns if c not in plan.primary_key)
+    return [
+        f"""CREATE OR REPLACE FUNCTION fn_partition_mirror_{plan.table}()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Rows the backfill has not reached yet are inserted here; it skips them when it gets there.
+    IF TG_OP = 'DELETE' THEN
+        DELETE FROM {plan.staging} s USING old_rows o WHERE {_matches(plan.primary_key, 's', 'o')};
+    ELSIF TG_OP = 'UPDATE' THEN
+        DELETE FROM {plan.staging} s USING old_rows o WHERE {_matches(plan.primary_key, 's', 'o')}
+          AND NOT EXISTS (SELECT 1 FROM new_rows n WHERE {_matches(plan.primary_key, 'n', 'o')});
+    ELSIF TG_OP = 'TRUNCATE' THEN
+        TRUNCATE {plan.staging};
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO {plan.staging} ({columns}) SELECT {columns} FROM new_rows
+        ON CONFLICT ({conflict}) DO UPDATE SET {assignments};
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql""",
+        *_statement_triggers(f"trg_partition_mirror_{plan.table}", plan.table, f"fn_partition_mirror_{plan.table}"),
+    ]
+
+
+def cutover_sql(plan):
+    """One transaction: take both locks, move triggers, views and foreign keys, and swap the names.
+
+    Each foreign key into the table is rebuilt from pg_constraint's column and action fields, pointing at
+    the key table for its columns or else at the partitioned copy. The swap fails, and rolls back, if any
+    foreign key from another table would still reference <table>_old.
+    """
+    # A foreign key to a moved key points at that key's table; anything else at the partitioned copy.
+    targets = ""
+    for key in plan.global_keys:
+        columns = ", ".join(f"'{column}'" for column in key.columns)
+        targets += f"WHEN ARRAY[{columns}] THEN '{key.table}' "
+    target = f"CASE r.referenced {targets}ELSE '{plan.staging}' END" if targets else f"'{plan.staging}'"
+    return [
+        f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'",
+        f"LOCK TABLE {plan.table}, {plan.staging} IN ACCESS EXCLUSIVE MODE",
+        *(f"DROP TRIGGER trg_partition_mirror_{plan.table}_{event} ON {plan.table}" for event in ("insert", "update", "delete", "truncate")),
+        f"""DO $$
+DECLARE
+    r record;
+    triggers text[] := '{{}}';
+    view_names text[] := '{{}}';
+    view_sql text[] := '{{}}';
+    stale text;
+BEGIN
+    -- Triggers and views would follow the old table through the rename; keep their definitions instead.
+    FOR r IN SELECT t.tgname, pg_get_triggerdef(t.oid) AS def FROM pg_trigger t
+             WHERE t.tgrelid = '{plan.table}'::regclass AND NOT t.tgisinternal LOOP
+        triggers := triggers || r.def;
+        EXECUTE format('DROP TRIGGER %I ON {plan.table}', r.tgname);
+    END LOOP;
+    FOR r IN SELECT DISTINCT v.oid::regclass::text AS name, pg_get_viewdef(v.oid) AS def
+             FROM pg_depend d JOIN pg_rewrite w ON w.oid = d.objid JOIN pg_class v ON v.oid = w.ev_class
+             WHERE d.refobjid = '{plan.table}'::regclass AND v.oid <> '{plan.table}'::regclass LOOP
+        view_names := view_names || r.name;
+        view_sql := view_sql || r.def;
+    END LOOP;
+    FOR r IN SELECT c.conrelid::regclass::text AS child, c.conname,
+                    (SELECT array_agg(a.attname::text ORDER BY k.n) FROM unnest(c.conkey) WITH ORDINALITY k(attnum, n)
+                     JOIN pg_attribute a ON a.attrelid = c.conrelid AND a.attnum = k.attnum) AS columns,
+                    (SELECT array_agg(a.attname::text ORDER BY k.n) FROM unnest(c.confkey) WITH ORDINALITY k(attnum, n)
+                     JOIN pg_attribute a ON a.attrelid = c.confrelid AND a.attnum = k.attnum) AS referenced,
+                    c.confmatchtype, c.confupdtype, c.confdeltype, c.condeferrable, c.condeferred
+             FROM pg_constraint c
+             WHERE c.confrelid = '{plan.table}'::regclass AND c.contype = 'f' AND c.conrelid <> '{plan.table}'::regclass LOOP
+        EXECUTE format('ALTER TABLE %s DROP CONSTRAINT %I', r.child, r.conname);
+        EXECUTE format(
+            'ALTER TABLE %s ADD CONSTRAINT %I FOREIGN KEY (%s) REFERENCES %I (%s) MATCH %s ON UPDATE %s ON DELETE %s %s NOT VALID',
+            r.child, r.conname,
+            (SELECT string_agg(quote_ident(name), ', ') FROM unnest(r.columns) name),
+            {target},
+            (SELECT string_agg(quote_ident(name), ', ') FROM unnest(r.referenced) name),
+            CASE r.confmatchtype WHEN 'f' THEN 'FULL' WHEN 'p' THEN 'PARTIAL' ELSE 'SIMPLE' END,
+            {_fk_action("r.confupdtype")},
+            {_fk_action("r.confdeltype")},
+            CASE WHEN NOT r.condeferrable THEN 'NOT DEFERRABLE'
+                 WHEN r.condeferred THEN 'DEFERRABLE INITIALLY DEFERRED' ELSE 'DEFERRABLE INITIALLY IMMEDIATE' END
+        );
+    END LOOP;
+    FOR r IN SELECT pg_get_serial_sequence('{plan.table}', a.attname) AS seq, a.attname FROM pg_attribute a
+             WHERE a.attrelid = '{plan.table}'::regclass AND a.attnum > 0 AND NOT a.attisdropped LOOP
+        IF r.seq IS NOT NULL THEN
+            EXECUTE format('ALTER SEQUENCE %s OWNED BY {plan.staging}.%I', r.seq, r.attname);
+        END IF;
+    END LOOP;
+    FOR r IN SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE i.indrelid = '{plan.table}'::regclass LOOP
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', r.relname, left(r.relname, 59) || '_old');
+    END LOOP;
+    ALTER TABLE {plan.table} RENAME TO {plan.old};
+    ALTER TABLE {plan.staging} RENAME TO {plan.table};
+    SELECT string_agg(conrelid::regclass::text || '.' || conname, ', ') INTO stale FROM pg_constraint
+    WHERE contype = 'f' AND confrelid = '{plan.old}'::regclass AND conrelid <> '{plan.old}'::regclass;
+    IF stale IS NOT NULL THEN
+        RAISE EXCEPTION 'foreign keys still reference {plan.old} after the swap: %', stale;
+    END IF;
+    FOR r IN SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+             WHERE i.indrelid = '{plan.table}'::regclass AND c.relname LIKE '%\\_new' LOOP
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', r.relname, left(r.relname, length(r.relname) - 4));
+    END LOOP;
+    FOR i IN 1 .. coalesce(array_length(triggers, 1), 0) LOOP
+        EXECUTE triggers[i];
+    END LOOP;
+    FOR i IN 1 .. coalesce(array_length(view_names, 1), 0) LOOP
+        EXECUTE format('CREATE OR REPLACE VIEW %s AS %s', view_names[i], view_sql[i]);
+    END LOOP;
+END;
+$$""",
+    ]
+
+
+def _fk_action(code):
+    return (
+        f"CASE {code} WHEN 'r' THEN 'RESTRICT' WHEN 'c' THEN 'CASCADE' WHEN 'n' THEN 'SET NULL' "
+        f"WHEN 'd' THEN 'SET DEFAULT' ELSE 'NO ACTION' END"
+    )
+
+
+def validate_sql(plan):
+    """Check the rebuilt foreign keys against the key tables and the new table, after the swap has released its locks."""
+    return [
+        f"""DO $$
+DECLARE
+    r record;
+BEGIN
+    FOR r IN SELECT conrelid::regclass::text AS child, conname FROM pg_constraint
+             WHERE confrelid = '{table}'::regclass AND NOT convalidated LOOP
+        EXECUTE format('ALTER TABLE %s VALIDATE CONSTRAINT %I', r.child, r.conname);
+    END LOOP;
+END;
+$$"""
+        for table in [*(key.table for key in plan.global_keys), plan.table]
+    ]
+
+
+def drop_old_sql(plan):
+    return [f"DROP TABLE IF EXISTS {plan.old}", f"DROP FUNCTION IF EXISTS fn_partition_mirror_{plan.table}()"]
+
+
+def backfill_sql(plan):
+    return BACKFILL_SQL.format(
+        staging=plan.staging,
+        table=plan.table,
+        columns=", ".join(plan.columns),
+        id=plan.id_column,
+        primary_key=", ".join(plan.primary_key),
+    ).strip()
+
+
+def script(plan):
+    """The whole migration as SQL text, for review or for running by hand."""
+    header = [f"-- {plan.table}: {plan.rows:,} rows partitioned by {plan.key}"] + [f"--   {note}" for note in plan.notes]
+    sections = [
+        ("1. partitioned copy", create_sql(plan)),
+        ("2. mirror writes", mirror_sql(plan)),
+        (
+            f"3. backfill: repeat per {plan.id_column} range [start, start + batch) up to the max at mirror time",
+            [backfill_sql(plan).replace("%s", ":start", 1).replace("%s", ":start + :batch", 1)],
+        ),
+        ("4. swap, in one transaction", ["BEGIN", *cutover_sql(plan), "COMMIT"]),
+        ("5. validate the moved foreign keys", validate_sql(plan)),
+        (f"6. once satisfied: drop {plan.old}", drop_old_sql(plan)),
+    ]
+    lines = header
+    for title, statements in sections:
+        lines.append(f"\n-- {title}")
+        lines += [f"{statement};" for statement in statements]
+    return "\n".join(lines) + "\n"
+
+
+def _retrying(connection, work, attempts, wait_seconds):
+    """Run work(cursor) in a transaction, retrying when it cannot get a lock in time."""
+    import psycopg2.errors
+
+    for attempt in range(attempts):
+        try:
+            with connection.cursor() as cursor:
+                result = work(cursor)
+            connection.commit()
+            return result, attempt
+        except (psycopg2.errors.LockNotAvailable, psycopg2.errors.DeadlockDetected):
+            connection.rollback()
+            time.sleep(wait_seconds)
+    raise RuntimeError(f"gave up after {attempts} lock timeouts")
+
+
+def migrate(connection, plan, batch_rows=BATCH_ROWS, pause=PAUSE_SECONDS, progress=None):
+    """Build the partitioned copy, backfill it in batches while writes continue, and swap it in."""
+    connection.autocommit = True
+    cursor = connection.cursor()
+    started = time.perf_counter()
+    for statement in create_sql(plan) + mirror_sql(plan):
+        cursor.execute(statement)
+    # Rows above this id arrive after the mirror is in place, so the mirror copies them.
+    cursor.execute(f"SELECT min({plan.id_column}), max({plan.id_column}) FROM {plan.table}")
+    low, high = cursor.fetchone()
+    connection.autocommit = False
+    backfill = backfill_sql(plan)
+    copied = retries = batches = 0
+    for start in range(low or 0, (high or -1) + 1, batch_rows):
+
+        def batch(cursor, start=start):
+            cursor.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+            cursor.execute(backfill, (start, start + batch_rows))
+            return cursor.rowcount
+
+        rows, attempts = _retrying(connection, batch, CUTOVER_ATTEMPTS, pause or PAUSE_SECONDS)
+        copied += rows
+        retries += attempts
+        batches += 1
+        if progress and batches % 50 == 0:
+            progress(f"{plan.table}: {copied:,} rows copied, {copied / (time.perf_counter() - started):,.0f} rows/s")
+        if pause:
+            time.sleep(pause)
+    backfilled = time.perf_counter()
+
+    def swap(cursor):
+        for statement in cutover_sql(plan):
+            cursor.execute(statement)
+
+    _, attempts = _retrying(connection, swap, CUTOVER_ATTEMPTS, 1.0)
+    swapped = time.perf_counter()
+    connection.autocommit = True
+    for statement in validate_sql(plan):
+        cursor.execute(statement)
+    cursor.execute(f"ANALYZE {plan.table}")
+    return {
+        "rows": copied,
+        "batches": batches,
+        "lock_retries": retries + attempts,
+        "backfill_s": backfilled - started,
+        "swap_ms": (swapped - backfilled) * 1000,
+        "total_s": time.perf_counter() - started,
+    }
+
+
+def verify(cursor, plan):
+    """(rows only in the old table, rows only in the new one); (0, 0) when nothing was written since the swap."""
+    columns = ", ".join(plan.columns)
+    cursor.execute(
+        f"SELECT (SELECT count(*) FROM (SELECT {columns} FROM {plan.old} EXCEPT ALL SELECT {columns} FROM {plan.table}) a), "
+        f"(SELECT count(*) FROM (SELECT {columns} FROM {plan.table} EXCEPT ALL SELECT {columns} FROM {plan.old}) b)"
+    )
+    return cursor.fetchone()
+
+
+def benchmark(dsn, rows=BENCH_ROWS, trials=BENCH_TRIALS, workers=None, batch_rows=BENCH_BATCH_ROWS):
+    """Range scans and v_criminal_last_location on criminal_locations before and after partitioning it."""
+    from bench_queries import prepare, run_query
+    from synth_data import BASE_ROWS
+
+    catalog = load_catalog()
+    started = time.perf_counter()
+    overrides = {"criminal_locations": rows, "criminals": BASE_ROWS["criminals"]}
+    connection = prepare(dsn, BENCH_SCALE, workers, overrides=overrides, name=f"erd_partition_{rows}")
+    cursor = connection.cursor()
+    print(f"{rows:,} criminal_locations: loaded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    count, first, last = live_stats(cursor, catalog, "criminal_locations")
+    plan = plan_partitions(catalog, "criminal_locations", count, first, last)
+    middle = first + (last - first) / 2
+    cursor.execute("SELECT max(noted_at) - interval '90 days' FROM criminal_locations")
+    recent = cursor.fetchone()[0]
+    cursor.execute(
+        "SELECT array_agg(criminal_id::text) FROM (SELECT criminal_id FROM criminals ORDER BY md5(criminal_id::text) LIMIT %s) s",
+        (SAMPLE_CRIMINALS,),
+    )
+    criminals = cursor.fetchone()[0]
+    params = {"month": f"{_truncate(middle, 'month')} 00:00:00 {TIMEZONE}", "recent": recent, "criminal": criminals[0], "criminals": criminals}
+
+    def measure():
+        cursor.execute(LARGEST_INDEX_SQL, {"table": "criminal_locations"})
+        largest = cursor.fetchone()[0]
+        return largest, {name: run_query(cursor, sql, params, trials=trials)["p50_ms"] for name, sql in BENCH_QUERIES.items()}
+
+    before_index, before = measure()
+    migration = migrate(connection, plan, batch_rows, pause=0, progress=lambda line: print(line, file=sys.stderr))
+    cursor = connection.cursor()
+    cursor.execute("VACUUM ANALYZE criminal_locations")
+    after_index, after = measure()
+    connection.close()
+    return {
+        "rows": rows,
+        "interval": plan.interval,
+        "partitions": sum(1 for _ in plan.partitions()) + 1,
+        "largest_index_mb": (before_index / 2**20, after_index / 2**20),
+        "queries": {name: (before[name], after[name]) for name in BENCH_QUERIES},
+        "migration": migration,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan time-range partitions for the append-heavy tables and migrate them online.")
+    parser.add_argument("--table", action="append", choices=sorted(PARTITION_KEYS), help="table to plan (repeatable, default all)")
+    parser.add_argument("--interval", choices=INTERVALS, help="force monthly or yearly partitions")
+    parser.add_argument("--ahead", type=int, default=AHEAD, help="empty partitions past the newest row")
+    parser.add_argument("--scale", type=float, default=1.0, help="synth_data.py profile to size from without --dsn")
+    parser.add_argument("--dsn", help="size from this database ('' uses PG* variables)")
+    parser.add_argument("--out", help="write the migration SQL here instead of printing it")
+    parser.add_argument("--migrate", action="store_true", help="run the online migration in --dsn")
+    parser.add_argument("--batch-rows", type=int, default=BATCH_ROWS)
+    parser.add_argument("--pause", type=float, default=PAUSE_SECONDS, help="seconds between backfill batches")
+    parser.add_argument("--drop-old", action="store_true", help="drop the <table>_old copies left by --migrate")
+    parser.add_argument("--bench", action="store_true", help="before/after timings on criminal_locations (superuser DSN; recreates erd_partition_*)")
+    parser.add_argument("--rows", type=int, default=BENCH_ROWS, help="criminal_locations rows for --bench")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args(argv)
+    if (args.migrate or args.drop_old or args.bench) and args.dsn is None:
+        parser.error("--migrate, --drop-old and --bench need --dsn")
+
+    if args.bench:
+        result = benchmark(args.dsn, args.rows, workers=args.workers)
+        low, high = result["largest_index_mb"]
+        print(f"criminal_locations: {result['rows']:,} rows, {result['partitions']} {result['interval']}ly partitions")
+        print(f"{'query':<28}{'before ms':>11}{'after ms':>11}{'ratio':>8}")
+        for name, (before, after) in result["queries"].items():
+            print(f"{name:<28}{before:>11.2f}{after:>11.2f}{after / before if before else float('inf'):>8.2f}")
+        print(f"largest index {low:,.0f} MB -> {high:,.0f} MB")
+        migration = result["migration"]
+        print(
+            f"migration: {migration['rows']:,} rows in {migration['backfill_s']:.1f}s "
+            f"({migration['rows'] / migration['backfill_s']:,.0f} rows/s, {migration['batches']} batches), "
+            f"swap {migration['swap_ms']:.0f} ms, {migration['lock_retries']} lock retries"
+        )
+        return 0
+
+    catalog = load_catalog()
+    tables = args.table or list(PARTITION_KEYS)
+    connection = None
+    if args.dsn is not None:
+        from bench_queries import _connect
+
+        connection = _connect(args.dsn)
+        stats = {name: live_stats(connection.cursor(), catalog, name) for name in tables}
+    else:
+        stats = synth_stats(catalog, args.scale)
+    plans = [plan_partitions(catalog, name, *stats[name], interval=args.interval, ahead=args.ahead) for name in tables]
+
+    if args.drop_old:
+        for plan in plans:
+            for statement in drop_old_sql(plan):
+                connection.cursor().execute(statement)
+        print(f"dropped {', '.join(plan.old for plan in plans)}")
+    elif args.migrate:
+        for plan in plans:
+            result = migrate(connection, plan, args.batch_rows, args.pause, progress=lambda line: print(line, file=sys.stderr))
+            print(
+                f"{plan.table}: {result['rows']:,} rows in {result['batches']} batches, {result['backfill_s']:.1f}s backfill, "
+                f"{result['swap_ms']:.0f} ms swap ({result['lock_retries']} lock retries); old rows kept in {plan.old}"
+            )
+    else:
+        text = "\n".join(script(plan) for plan in plans)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as handle:
+                handle.write(text)
+            print(f"{len(plans)} migration scripts written to {args.out}")
+        else:
+            print(text)
+    if connection is not None:
+        connection.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+import argparse
+import json
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from schema_catalog import load_catalog
+
+# A sequential scan is worth flagging once it reads this many rows (or the table holds this many).
+LARGE_TABLE_ROWS = 10_000
+# Shared blocks touched by a single node, excluding its children (1,000 blocks = 8 MB).
+BUFFER_HEAVY_BLOCKS = 1_000
+INDEX_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+PERCENTILES = (50, 95, 99)
+
+# plan::text so rows from the database and from a JSONL export go through the same json.loads.
+PROBES_SQL = "SELECT label, duration_ms, plan::text FROM query_probes WHERE plan IS NOT NULL"
+# query_explainer.js stores whatever label the caller passed, NULL included.
+UNLABELLED = "(unlabelled)"
+
+
+@dataclass
+class LabelLatency:
+    label: str
+    probes: int
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    execution_p95_ms: float
+
+
+@dataclass
+class SeqScan:
+    table: str
+    label: str
+    scans: int = 0
+    max_rows: int = 0
+
+
+@dataclass
+class BufferNode:
+    label: str
+    node: str
+    relation: str
+    count: int = 0
+    total_blocks: int = 0
+    read_blocks: int = 0
+    max_blocks: int = 0
+
+    @property
+    def mean_blocks(self):
+        return self.total_blocks / self.count if self.count else 0
+
+
+@dataclass
+class PerformanceReport:
+    probes: int = 0
+    latencies: list = field(default_factory=list)
+    seq_scans: list = field(default_factory=list)
+    unused_indexes: list = field(default_factory=list)
+    buffer_nodes: list = field(default_factory=list)
+    index_usage: Counter = field(default_factory=Counter)
+
+
+def read_probe_file(path):
+    """Yield (label, duration_ms, plan) from a JSONL export of query_probes."""
+    with open(path, encoding="utf-8") as handle:
+        for line in handle:
+            if line.strip():
+                row = json.loads(line)
+                yield row.get("label") or UNLABELLED, row.get("duration_ms"), row["plan"]
+
+
+def read_probe_table(pool):
+    """Yield (label, duration_ms, plan_text) from query_probes, or nothing if the table is missing."""
+    if not pool.fetch("SELECT to_regclass('query_probes') IS NOT NULL")[0][0]:
+        return
+    for label, duration_ms, plan in pool.stream(PROBES_SQL):
+        yield label or UNLABELLED, duration_ms, plan
+
+
+def _walk(plan):
+    stack = [plan]
+    while stack:
+        node = stack.pop()
+        children = node.get("Plans", ())
+        stack.extend(children)
+        yield node, children
+
+
+def analyze(probes, catalog, stats=None, large_rows=LARGE_TABLE_ROWS, heavy_blocks=BUFFER_HEAVY_BLOCKS):
+    """Walk every probe's plan once, keeping only the aggregates the Performance chapter needs."""
+    report = PerformanceReport()
+    durations = defaultdict(list)
+    executions = defaultdict(list)
+    seq_scans = {}
+    buffer_nodes = {}
+    stats = stats or {}
+
+    for label, duration_ms, plan in probes:
+        document = json.loads(plan) if isinstance(plan, str) else plan
+        if isinstance(document, list):
+            document = document[0]
+        report.probes += 1
+        execution_ms = document.get("Execution Time", 0.0)
+        durations[label].append(float(duration_ms) if duration_ms is not None else execution_ms)
+        executions[label].append(execution_ms)
+
+        for node, children in _walk(document["Plan"]):
+            kind = node["Node Type"]
+            relation = node.get("Relation Name", "")
+            if kind in INDEX_NODES:
+                report.index_usage[node["Index Name"]] += 1
+            elif kind == "Seq Scan":
+                loops = node.get("Actual Loops", 1)
+                rows = (node.get("Actual Rows", 0) + node.get("Rows Removed by Filter", 0)) * loops
+                table_stats = stats.get(relation)
+                if rows >= large_rows or (table_stats and table_stats.rows >= large_rows):
+                    scan = seq_scans.setdefault((relation, label), SeqScan(relation, label))
+                    scan.scans += 1
+                    scan.max_rows = max(scan.max_rows, rows)
+            # BUFFERS counts include the children; subtract them to find the node doing the work.
+            hit = node.get("Shared Hit Blocks", 0) - sum(child.get("Shared Hit Blocks", 0) for child in children)
+            read = node.get("Shared Read Blocks", 0) - sum(child.get("Shared Read Blocks", 0) for child in children)
+            if hit + read >= heavy_blocks:
+                target = relation or node.get("Index Name", "")
+                heavy = buffer_nodes.setdefault((label, kind, target), BufferNode(label, kind, target))
+                heavy.count += 1
+                heavy.total_blocks += hit + read
+                heavy.read_blocks += read
+                heavy.max_blocks = max(heavy.max_blocks, hit + read)
+
+    for label in sorted(durations):
+        values = np.asarray(durations[label], dtype=np.float64)
+        p50, p95, p99 = np.percentile(values, PERCENTILES)
+        execution_p95 = np.percentile(np.asarray(executions[label], dtype=np.float64), 95)
+        report.latencies.append(LabelLatency(label, len(values), p50, p95, p99, values.max(), execution_p95))
+
+    report.seq_scans = sorted(seq_scans.values(), key=lambda scan: (-scan.max_rows, scan.table, scan.label))
+    report.unused_indexes = [index for index in catalog.indexes if index.name not in report.index_usage]
+    report.buffer_nodes = sorted(buffer_nodes.values(), key=lambda node: -node.total_blocks)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze EXPLAIN (ANALYZE, BUFFERS) plans stored in query_probes.")
+    parser.add_argument("--probes", help="JSONL export with label, duration_ms and plan per line")
+    parser.add_argument("--dsn", help="read query_probes from a running database ('' uses PG* variables)")
+    args = parser.parse_args()
+    if args.probes is None and args.dsn is None:
+        parser.error("pass --probes or --dsn")
+
+    pool = None
+    if args.probes:
+        source = read_probe_file(args.probes)
+    else:
+        from catalog_introspect import ConnectionPool
+
+        pool = ConnectionPool(args.dsn)
+        source = read_probe_table(pool)
+    started = time.perf_counter()
+    report = analyze(source, load_catalog())
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if pool:
+        pool.close()
+
+    print(
+        f"{report.probes} probes, {len(report.latencies)} labels, {len(report.seq_scans)} large seq scans, "
+        f"{len(report.unused_indexes)} unused indexes, {len(report.buffer_nodes)} buffer-heavy nodes in {elapsed_ms:.1f} ms"
+    )
+    print(f"{'label':<32} {'probes':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for item in report.latencies:
+        print(f"{item.label:<32} {item.probes:>7} {item.p50_ms:>9.2f} {item.p95_ms:>9.2f} {item.p99_ms:>9.2f} {item.max_ms:>9.2f}")
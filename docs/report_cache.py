@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from dataclasses import asdict, is_dataclass
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".erd_cache")
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _jsonable(value):
+    if is_dataclass(value):
+        return asdict(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return str(value)
+
+
+def digest(*parts):
+    payload = json.dumps(parts, default=_jsonable, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_digest(*paths):
+    sha = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as handle:
+            sha.update(handle.read())
+    return sha.hexdigest()
+
+
+class SectionCache:
+    """Content-addressed pickle store with size-bounded LRU eviction.
+
+    Entries are files named by key; a hit refreshes the file's mtime so
+    prune() can drop the least recently used entries first.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, enabled=True):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as handle:
+                value = pickle.load(handle)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            self.misses += 1
+            return None
+        os.utime(path)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as handle:
+            pickle.dump(value, handle, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def get_file(self, key, destination):
+        if not self.enabled:
+            return False
+        path = self._path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return False
+        shutil.copyfile(path, destination)
+        os.utime(path)
+        self.hits += 1
+        return True
+
+    def put_file(self, key, source):
+        if not self.enabled:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        os.close(fd)
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, path)
+
+    def prune(self):
+        if not self.enabled or not os.path.isdir(self.directory):
+            return 0
+        entries = []
+        total = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,339 @@
+# The reportlab half of report_render.py. It is imported on first use, so building the story model or the
+# Markdown output never loads reportlab.
+from bisect import bisect_right
+from itertools import accumulate
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Flowable
+from reportlab.lib.units import cm
+from reportlab.graphics import renderSVG
+from reportlab.graphics.charts.legends import LineLegend
+from reportlab.graphics.charts.lineplots import LinePlot
+from reportlab.graphics.shapes import Drawing, Group, Line, Polygon, Rect, String
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+from report_profile import phase
+from report_render import escape_stray
+
+FRAME_WIDTH = A4[0] - 4 * cm
+TABLE_FONT = "Helvetica"
+TABLE_HEADER_FONT = "Helvetica-Bold"
+TABLE_FONT_SIZE = 9
+TABLE_LEADING = 12
+CELL_PADDING = 12  # default LEFTPADDING + RIGHTPADDING
+TABLE_ROW_HEIGHT = TABLE_LEADING + 6  # one line plus default TOPPADDING + BOTTOMPADDING
+MIN_COLUMN_WIDTH = 1.5 * cm
+LONG_TABLE_ROWS = 200
+DIAGRAM_MARGIN = 4
+DIAGRAM_FONT_SIZE = 7
+DIAGRAM_LINE = 9
+DIAGRAM_HEADER = colors.HexColor("#0b3d91")
+DIAGRAM_EDGE = colors.HexColor("#57606a")
+CHART_HEIGHT = 150
+CHART_TICKS = 8
+CHART_COLORS = (colors.HexColor("#0b3d91"), colors.HexColor("#cf222e"), colors.HexColor("#1a7f37"), colors.HexColor("#9a6700"))
+
+with phase("style setup"):
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name="TitleCenter", parent=styles["Title"], alignment=1))
+    styles.add(ParagraphStyle(name="H1", parent=styles["Heading1"], spaceBefore=12, spaceAfter=6))
+    styles.add(ParagraphStyle(name="H2", parent=styles["Heading2"], spaceBefore=10, spaceAfter=4))
+    styles.add(ParagraphStyle(name="Body", parent=styles["BodyText"], leading=14, spaceAfter=6))
+    styles.add(ParagraphStyle(name="TableCell", parent=styles["BodyText"], leading=12, fontSize=9))
+    styles.add(
+        ParagraphStyle(name="TableHeader", parent=styles["TableCell"], fontName="Helvetica-Bold", textColor=colors.white)
+    )
+
+    # One style object shared by every table in the document.
+    TABLE_STYLE = TableStyle(
+        [
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#0b3d91")),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.HexColor("#d0d7de")),
+            ("FONTNAME", (0, 0), (-1, -1), TABLE_FONT),
+            ("FONTNAME", (0, 0), (-1, 0), TABLE_HEADER_FONT),
+            ("FONTSIZE", (0, 0), (-1, -1), TABLE_FONT_SIZE),
+            ("LEADING", (0, 0), (-1, -1), TABLE_LEADING),
+            ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ]
+    )
+
+
+def column_widths(measured, available=FRAME_WIDTH):
+    """Fit columns to the frame from their widest measured cell, for any column count.
+
+    Columns narrower than an even share keep their natural width; the rest
+    split what is left in proportion to their natural width. Slack, if
+    everything fits, is spread the same way so tables span the frame.
+    """
+    count = len(measured[0])
+    natural = [CELL_PADDING + max(row[i] for row in measured) for i in range(count)]
+    total = sum(natural)
+    if total <= available:
+        return [width + (available - total) * width / total for width in natural]
+    widths = [None] * count
+    remaining = available
+    open_columns = set(range(count))
+    while open_columns:
+        share = remaining / len(open_columns)
+        fitting = [i for i in open_columns if natural[i] <= share]
+        if not fitting:
+            break
+        for i in fitting:
+            widths[i] = natural[i]
+            remaining -= natural[i]
+            open_columns.discard(i)
+    open_total = sum(natural[i] for i in open_columns)
+    for i in open_columns:
+        widths[i] = max(MIN_COLUMN_WIDTH, remaining * natural[i] / open_total)
+    return widths
+
+
+def _border_point(box, toward):
+    # Where the line from a box's centre toward a point leaves the box.
+    x, y, width, height = box
+    cx, cy = x + width / 2, y + height / 2
+    dx, dy = toward[0] - cx, toward[1] - cy
+    if dx == 0 and dy == 0:
+        return cx, cy
+    scale = min(width / 2 / abs(dx) if dx else float("inf"), height / 2 / abs(dy) if dy else float("inf"))
+    return cx + dx * scale, cy + dy * scale
+
+
+def erd_drawing(nodes, edges, max_width=FRAME_WIDTH, max_height=A4[1] - 6 * cm):
+    """Boxes and FK arrows as one reportlab Drawing, scaled down to fit the frame."""
+    width = max(x + w for _, x, _, w, _, _ in nodes) + DIAGRAM_MARGIN
+    height = max(y + h for _, _, y, _, h, _ in nodes) + DIAGRAM_MARGIN
+    scale = min(1.0, max_width / width, max_height / height)
+    drawing = Drawing(width * scale, height * scale)
+    group = Group(transform=(scale, 0, 0, scale, 0, 0))
+    boxes = {name: (x, y, w, h) for name, x, y, w, h, _ in nodes}
+    for table, referenced in edges:
+        start_box, end_box = boxes[table], boxes[referenced]
+        start = _border_point(start_box, (end_box[0] + end_box[2] / 2, end_box[1] + end_box[3] / 2))
+        end = _border_point(end_box, (start_box[0] + start_box[2] / 2, start_box[1] + start_box[3] / 2))
+        group.add(Line(*start, *end, strokeColor=DIAGRAM_EDGE, strokeWidth=0.6))
+        dx, dy = end[0] - start[0], end[1] - start[1]
+        length = max((dx * dx + dy * dy) ** 0.5, 1e-6)
+        ux, uy = dx / length * 5, dy / length * 5
+        group.add(Polygon([end[0], end[1], end[0] - ux - uy / 2, end[1] - uy + ux / 2, end[0] - ux + uy / 2, end[1] - uy - ux / 2],
+                          fillColor=DIAGRAM_EDGE, strokeColor=None))
+    for name, x, y, w, h, columns in nodes:
+        group.add(Rect(x, y, w, h, fillColor=colors.white, strokeColor=DIAGRAM_HEADER, strokeWidth=0.6))
+        group.add(Rect(x, y + h - DIAGRAM_LINE - 4, w, DIAGRAM_LINE + 4, fillColor=DIAGRAM_HEADER, strokeColor=DIAGRAM_HEADER, strokeWidth=0.6))
+        group.add(String(x + 4, y + h - DIAGRAM_LINE, name, fontName=TABLE_HEADER_FONT, fontSize=DIAGRAM_FONT_SIZE + 1, fillColor=colors.white))
+        for row, label in enumerate(columns, 1):
+            group.add(String(x + 4, y + h - DIAGRAM_LINE - 4 - row * DIAGRAM_LINE + 2, label, fontName=TABLE_FONT, fontSize=DIAGRAM_FONT_SIZE))
+    drawing.add(group)
+    return drawing
+
+
+def line_chart(caption, labels, series, marker=None, width=FRAME_WIDTH, height=CHART_HEIGHT):
+    """Series over shared x labels as a reportlab Drawing, with a legend and an optional vertical rule at marker."""
+    drawing = Drawing(width, height + 34)
+    drawing.add(String(0, height + 24, caption, fontName=TABLE_HEADER_FONT, fontSize=DIAGRAM_FONT_SIZE + 2))
+    plot = LinePlot()
+    plot.x, plot.y, plot.width, plot.height = 36, 18, width - 40, height - 8
+    plot.data = [list(enumerate(values)) for _, values in series]
+    for index in range(len(series)):
+        plot.lines[index].strokeColor = CHART_COLORS[index % len(CHART_COLORS)]
+        plot.lines[index].strokeWidth = 1
+    count = len(labels)
+    plot.xValueAxis.valueMin, plot.xValueAxis.valueMax = 0, max(count - 1, 1)
+    plot.xValueAxis.valueSteps = list(range(0, count, max(1, count // CHART_TICKS)))
+    plot.xValueAxis.labelTextFormat = lambda value: labels[int(value)] if 0 <= int(value) < count else ""
+    plot.yValueAxis.valueMin = 0
+    plot.yValueAxis.labelTextFormat = "{:,.0f}".format
+    for axis in (plot.xValueAxis, plot.yValueAxis):
+        axis.labels.fontName, axis.labels.fontSize = TABLE_FONT, DIAGRAM_FONT_SIZE
+    drawing.add(plot)
+    if marker is not None and count > 1:
+        x = plot.x + plot.width * marker / (count - 1)
+        drawing.add(Line(x, plot.y, x, plot.y + plot.height, strokeColor=DIAGRAM_EDGE, strokeWidth=0.5, strokeDashArray=(2, 2)))
+    legend = LineLegend()
+    legend.x, legend.y = width - 8 - 70 * len(series), height + 26
+    legend.alignment, legend.columnMaximum, legend.deltax = "right", 1, 70
+    legend.fontName, legend.fontSize = TABLE_FONT, DIAGRAM_FONT_SIZE
+    legend.colorNamePairs = [(CHART_COLORS[index % len(CHART_COLORS)], name) for index, (name, _) in enumerate(series)]
+    drawing.add(legend)
+    return drawing
+
+
+class PagedTable(Flowable):
+    """Long-table mode: header plus rows with precomputed heights.
+
+    reportlab's Table.split() rebuilds a Table from every remaining row on each
+    page break, which is quadratic in the row count. Here each split only
+    builds a Table for the rows that fit on the page (found by bisecting the
+    cumulative row heights) and hands the rest on as another PagedTable, with
+    the header repeated on every page. Rows stay plain text until their page
+    is drawn, so only one page of Paragraphs is alive at a time.
+    """
+
+    def __init__(self, header, rows, widths, heights, start=0, offsets=None):
+        super().__init__()
+        self.header = header
+        self.rows = rows
+        self.widths = widths
+        self.heights = heights
+        self.start = start
+        self.offsets = offsets or [0, *accumulate(heights[1:])]
+
+    def _height(self, start, end):
+        return self.heights[0] + self.offsets[end] - self.offsets[start]
+
+    def _table(self, start, end):
+        return Table(
+            [self.header, *(table_cells(row, TABLE_FONT, styles["TableCell"], self.widths) for row in self.rows[start:end])],
+            colWidths=self.widths,
+            rowHeights=[self.heights[0], *self.heights[1 + start:1 + end]],
+            repeatRows=1,
+            style=TABLE_STYLE,
+        )
+
+    def wrap(self, availWidth, availHeight):
+        self.width = sum(self.widths)
+        self.height = self._height(self.start, len(self.rows))
+        return self.width, self.height
+
+    def split(self, availWidth, availHeight):
+        limit = self.offsets[self.start] + availHeight - self.heights[0]
+        end = bisect_right(self.offsets, limit) - 1
+        if end <= self.start:
+            return []
+        if end >= len(self.rows):
+            return [self]
+        return [self._table(self.start, end), PagedTable(self.header, self.rows, self.widths, self.heights, end, self.offsets)]
+
+    def draw(self):
+        table = self._table(self.start, len(self.rows))
+        table.wrapOn(self.canv, self.width, self.height)
+        table.drawOn(self.canv, 0, 0)
+
+
+def table_cells(row, font, style, widths, measured=None):
+    # Cells that fit on one line stay plain strings (drawn directly with the
+    # shared style's font); only markup or overflowing text becomes a Paragraph.
+    if measured is None:
+        measured = [stringWidth(str(cell), font, TABLE_FONT_SIZE) for cell in row]
+    out = []
+    for cell, width, column_width in zip(row, measured, widths):
+        text = escape_stray(str(cell))
+        if width + CELL_PADDING <= column_width and "<" not in text and "&" not in text and "\n" not in text:
+            out.append(text)
+        else:
+            out.append(Paragraph(text, style))
+    return out
+
+
+def add_table(story, rows, long_table_rows=LONG_TABLE_ROWS):
+    measured = []
+    for index, row in enumerate(rows):
+        font = TABLE_HEADER_FONT if index == 0 else TABLE_FONT
+        measured.append([stringWidth(str(cell), font, TABLE_FONT_SIZE) for cell in row])
+    widths = column_widths(measured)
+    long_table = len(rows) > long_table_rows
+
+    cells = []
+    heights = []
+    for index, (row, row_widths) in enumerate(zip(rows, measured)):
+        out = table_cells(row, TABLE_HEADER_FONT if index == 0 else TABLE_FONT, styles["TableHeader" if index == 0 else "TableCell"], widths, row_widths)
+        plain = all(isinstance(cell, str) for cell in out)
+        if long_table:
+            # Measure the row now, then keep only its text: PagedTable rebuilds the cells page by page.
+            height = TABLE_ROW_HEIGHT
+            for cell, column_width in zip(out, widths):
+                if not isinstance(cell, str):
+                    height = max(height, cell.wrap(column_width - CELL_PADDING, A4[1])[1] + TABLE_ROW_HEIGHT - TABLE_LEADING)
+            heights.append(height)
+            cells.append(out if index == 0 else row)
+        else:
+            heights.append(TABLE_ROW_HEIGHT if plain else None)
+            cells.append(out)
+
+    if long_table:
+        story.append(PagedTable(cells[0], cells[1:], widths, heights))
+    else:
+        story.append(Table(cells, colWidths=widths, rowHeights=heights, repeatRows=1, style=TABLE_STYLE))
+    story.append(Spacer(1, 10))
+
+
+class FlowableStream(list):
+    """List facade over a flowable generator for reportlab's layout loop.
+
+    BaseDocTemplate.build() only looks at the head of its list (len, [0],
+    del, insert), so keeping a short lookahead buffer filled lets the whole
+    document flow through layout without ever holding the full story.
+    """
+
+    def __init__(self, source, lookahead=32):
+        super().__init__()
+        self._source = iter(source)
+        self._lookahead = lookahead
+        self._fill()
+
+    def _fill(self):
+        while self._source is not None and list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+
+def render_section(blocks):
+    story = []
+    for block in blocks:
+        kind = block[0]
+        if kind == "title":
+            story.append(Paragraph(escape_stray(block[1]), styles["TitleCenter"]))
+        elif kind == "heading":
+            story.append(Paragraph(escape_stray(block[2]), styles["H1" if block[1] == 1 else "H2"]))
+        elif kind == "paragraph":
+            story.append(Paragraph(escape_stray(block[1]), styles["Body"]))
+        elif kind == "bullets":
+            story.extend(Paragraph(f"• {escape_stray(item)}", styles["Body"]) for item in block[1])
+        elif kind == "table":
+            with phase("add_table", rows=len(block[1]) - 1, columns=len(block[1][0])):
+                add_table(story, block[1])
+        elif kind == "diagram":
+            story.append(erd_drawing(block[1], block[2]))
+            story.append(Spacer(1, 10))
+        elif kind == "chart":
+            story.append(line_chart(*block[1:]))
+            story.append(Spacer(1, 10))
+        elif kind == "spacer":
+            story.append(Spacer(1, block[1]))
+        elif kind == "page_break":
+            story.append(PageBreak())
+    return story
+
+
+def write(fragments, output_path, title):
+    doc = SimpleDocTemplate(
+        output_path,
+        pagesize=A4,
+        leftMargin=2 * cm,
+        rightMargin=2 * cm,
+        topMargin=2 * cm,
+        bottomMargin=2 * cm,
+        title=title,
+        pageCompression=1,
+    )
+    with phase("doc.build"):
+        doc.build(FlowableStream(flowable for fragment in fragments for flowable in fragment))
+
+
+def erd_svg(nodes, edges):
+    svg = renderSVG.drawToString(erd_drawing(nodes, edges, max_height=float("inf")))
+    return svg[svg.index("<svg"):]
+
+
+def chart_svg(caption, labels, series, marker=None):
+    svg = renderSVG.drawToString(line_chart(caption, labels, series, marker))
+    return svg[svg.index("<svg"):]
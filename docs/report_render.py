@@ -0,0 +1,354 @@
+import html
+import os
+import pickle
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape as _xml_escape
+
+from report_cache import SectionCache, digest, file_digest
+from report_profile import phase, profiled
+
+DOCUMENT_TITLE = "Bangladesh Thana & Jail Management System"
+# Largest bullet list handed to a backend in one piece; longer lists are split so no
+# single section has to materialise thousands of flowables at once.
+MAX_BLOCK_ITEMS = 256
+
+
+# Story model: sections are lists of plain tuples, so they hash, pickle and
+# render the same way in every backend. Inline text is markup: <b>, <i> and <br/>
+# are its only tags, and every string taken from data must go through escape().
+# Every backend, the PDF one included, also runs text through escape_stray(), so a
+# missed escape() shows the tag as text instead of breaking the build.
+INLINE_MARKUP = re.compile(r"</?[bi]>|<br\s*/?>|&(?:[a-zA-Z]+|#\d+);")
+
+
+def escape(text):
+    return _xml_escape(str(text))
+
+
+def title(text):
+    return ("title", text)
+
+
+def heading(text, level=1):
+    return ("heading", level, text)
+
+
+def paragraph(text):
+    return ("paragraph", text)
+
+
+def bullets(items):
+    return ("bullets", tuple(items))
+
+
+def data_table(rows):
+    return ("table", tuple(tuple(str(cell) for cell in row) for row in rows))
+
+
+def spacer(height):
+    return ("spacer", height)
+
+
+def page_break():
+    return ("page_break",)
+
+
+def diagram(nodes, edges, links=()):
+    # nodes: (name, x, y, width, height, column labels) with (x, y) the bottom-left corner; edges: (table, referenced table);
+    # links: (left table, (min, max), right table, (min, max), label) per relationship, max None for many.
+    return ("diagram", tuple(nodes), tuple(edges), tuple(links))
+
+
+def chart(caption, labels, series, marker=None):
+    # A line chart: one x label per point, series as (name, values) of the same length; marker is the index of a point
+    # drawn as a vertical rule, such as today on a curve that runs into a forecast. The caption, labels and series
+    # names are plain text, not inline markup: they are drawn as graphics.
+    return ("chart", caption, tuple(labels), tuple((name, tuple(values)) for name, values in series), marker)
+
+
+def _pdf():
+    # reportlab and the PDF styles load on first use; Markdown builds and callers that only assemble
+    # the story never pay for them.
+    if "report_pdf" not in sys.modules:
+        with phase("import reportlab"):
+            import report_pdf  # noqa: F401
+    return sys.modules["report_pdf"]
+
+
+class Renderer:
+    name = ""
+    extension = ""
+
+    def render_section(self, blocks):
+        raise NotImplementedError
+
+    def write(self, fragments, output_path):
+        # fragments is an iterator; backends consume it lazily so memory stays flat.
+        raise NotImplementedError
+
+
+class PdfRenderer(Renderer):
+    name = "pdf"
+    extension = ".pdf"
+
+    def render_section(self, blocks):
+        return _pdf().render_section(blocks)
+
+    def write(self, fragments, output_path):
+        _pdf().write(fragments, output_path, DOCUMENT_TITLE)
+
+
+def escape_stray(text):
+    # Escapes everything except the INLINE_MARKUP tags and entities.
+    out, position = [], 0
+    for match in INLINE_MARKUP.finditer(text):
+        out += [html.escape(text[position:match.start()], quote=False), match.group()]
+        position = match.end()
+    out.append(html.escape(text[position:], quote=False))
+    return "".join(out)
+
+
+def _html_inline(text):
+    return escape_stray(text)
+
+
+class HtmlRenderer(Renderer):
+    name = "html"
+    extension = ".html"
+
+    def render_section(self, blocks):
+        out = []
+        for block in blocks:
+            kind = block[0]
+            if kind == "title":
+                out.append(f'<h1 class="title">{_html_inline(block[1])}</h1>')
+            elif kind == "heading":
+                level = block[1] + 1
+                out.append(f"<h{level}>{_html_inline(block[2])}</h{level}>")
+            elif kind == "paragraph":
+                out.append(f"<p>{_html_inline(block[1])}</p>")
+            elif kind == "bullets":
+                items = "".join(f"<li>{_html_inline(item)}</li>" for item in block[1])
+                out.append(f"<ul>{items}</ul>")
+            elif kind == "table":
+                header, *body = block[1]
+                rows = ["<tr>" + "".join(f"<th>{_html_inline(cell)}</th>" for cell in header) + "</tr>"]
+                for row in body:
+                    rows.append("<tr>" + "".join(f"<td>{_html_inline(cell)}</td>" for cell in row) + "</tr>")
+                out.append("<table>" + "".join(rows) + "</table>")
+            elif kind == "diagram":
+                out.append(f'<figure class="erd">{_pdf().erd_svg(block[1], block[2])}</figure>')
+            elif kind == "chart":
+                out.append(f'<figure class="chart">{_pdf().chart_svg(*block[1:])}</figure>')
+            elif kind == "page_break":
+                out.append('<hr class="page-break">')
+        return "\n".join(out)
+
+    def write(self, fragments, output_path):
+        with open(output_path, "w", encoding="utf-8") as handle:
+            handle.write(
+                "<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"utf-8\">\n"
+                f"<title>{html.escape(DOCUMENT_TITLE)}</title>\n"
+                "<style>\n"
+                "body { font-family: Helvetica, Arial, sans-serif; max-width: 60em; margin: 2em auto; line-height: 1.45; }\n"
+                "h1.title { text-align: center; }\n"
+                "table { border-collapse: collapse; width: 100%; margin-bottom: 1em; font-size: 0.9em; }\n"
+                "th { background: #0b3d91; color: #fff; text-align: left; }\n"
+                "th, td { border: 1px solid #d0d7de; padding: 4px 6px; vertical-align: top; }\n"
+                "hr.page-break { border: 0; page-break-after: always; }\n"
+                "figure.erd { margin: 1em 0; }\n"
+                "figure.erd svg { max-width: 100%; height: auto; }\n"
+                "figure.chart { margin: 0.5em 0 1em; }\n"
+                "</style>\n</head>\n<body>\n"
+            )
+            for fragment in fragments:
+                handle.write(fragment)
+                handle.write("\n")
+            handle.write("</body>\n</html>\n")
+
+
+def _markdown_inline(text):
+    text = escape_stray(text)
+    text = re.sub(r"</?b>", "**", text)
+    text = re.sub(r"</?i>", "*", text)
+    return re.sub(r"<br\s*/?>", "  \n", text)
+
+
+class MarkdownRenderer(Renderer):
+    name = "md"
+    extension = ".md"
+
+    def render_section(self, blocks):
+        out = []
+        for block in blocks:
+            kind = block[0]
+            if kind == "title":
+                out.append(f"# {_markdown_inline(block[1])}")
+            elif kind == "heading":
+                out.append(f"{'#' * (block[1] + 1)} {_markdown_inline(block[2])}")
+            elif kind == "paragraph":
+                out.append(_markdown_inline(block[1]))
+            elif kind == "bullets":
+                out.append("\n".join(f"- {_markdown_inline(item)}" for item in block[1]))
+            elif kind == "table":
+                header, *body = block[1]
+                lines = ["| " + " | ".join(_markdown_cell(cell) for cell in header) + " |"]
+                lines.append("|" + "---|" * len(header))
+                for row in body:
+                    lines.append("| " + " | ".join(_markdown_cell(cell) for cell in row) + " |")
+                out.append("\n".join(lines))
+            elif kind == "diagram":
+                lines = ["```mermaid", "erDiagram"]
+                if block[3]:
+                    lines += [f'    {_mermaid_link(*link)}' for link in block[3]]
+                    linked = {name for left, _, right, *_ in block[3] for name in (left, right)}
+                else:
+                    lines += [f"    {referenced} ||--o{{ {table} : references" for table, referenced in block[2]]
+                    linked = {name for edge in block[2] for name in edge}
+                lines += [f"    {name}" for name, *_ in block[1] if name not in linked]
+                out.append("\n".join([*lines, "```"]))
+            elif kind == "chart":
+                _, caption, labels, series, _ = block
+                lines = ["```mermaid", "xychart-beta", f'    title "{_mermaid_text(caption)}"']
+                lines.append("    x-axis [" + ", ".join(f'"{_mermaid_text(label)}"' for label in labels) + "]")
+                lines += ["    line [" + ", ".join(str(value) for value in values) + "]" for _, values in series]
+                legend = _markdown_inline(escape(", ".join(name for name, _ in series)))
+                out.append("\n".join([*lines, "```", f"*Lines: {legend}.*"]))
+            elif kind == "page_break":
+                out.append("---")
+        return "\n\n".join(out)
+
+    def write(self, fragments, output_path):
+        with open(output_path, "w", encoding="utf-8") as handle:
+            first = True
+            for fragment in fragments:
+                if fragment:
+                    handle.write(fragment if first else "\n\n" + fragment)
+                    first = False
+            handle.write("\n")
+
+
+MERMAID_TEXT = str.maketrans({'"': "'", "<": "‹", ">": "›"})
+# Crow's feet read across the line: the end at an entity says how many of its rows one row on the other side
+# relates to, which is the other side's (min, max). (min, many) -> (end left of the line, end right of it).
+MERMAID_ENDS = {(0, False): ("|o", "o|"), (1, False): ("||", "||"), (0, True): ("}o", "o{"), (1, True): ("}|", "|{")}
+
+
+def _mermaid_text(text):
+    # Mermaid strings cannot escape a double quote, may be drawn as HTML, and end at a line break.
+    return " ".join(str(text).translate(MERMAID_TEXT).split())
+
+
+def _mermaid_link(left, left_side, right, right_side, label):
+    left_end = MERMAID_ENDS[(min(right_side[0], 1), right_side[1] is None)][0]
+    right_end = MERMAID_ENDS[(min(left_side[0], 1), left_side[1] is None)][1]
+    return f'{left} {left_end}--{right_end} {right} : "{_mermaid_text(label)}"'
+
+
+def _markdown_cell(text):
+    return _markdown_inline(text).replace("|", "\\|").replace("  \n", "<br>")
+
+
+RENDERERS = {renderer.name: renderer for renderer in (PdfRenderer(), HtmlRenderer(), MarkdownRenderer())}
+RENDER_CODE = file_digest(os.path.abspath(__file__), os.path.join(os.path.dirname(os.path.abspath(__file__)), "report_pdf.py"))
+
+
+def _split_blocks(blocks):
+    for block in blocks:
+        if block[0] == "bullets" and len(block[1]) > MAX_BLOCK_ITEMS:
+            for start in range(0, len(block[1]), MAX_BLOCK_ITEMS):
+                yield bullets(block[1][start:start + MAX_BLOCK_ITEMS])
+        else:
+            yield block
+
+
+def _fragments(renderer, sections, keys, cache):
+    for (_, blocks), key in zip(sections, keys):
+        fragment = cache.get(key)
+        if fragment is None:
+            with phase("render section"):
+                fragment = renderer.render_section(blocks)
+            cache.put(key, fragment)
+        yield fragment
+
+
+def _section_stream(sections):
+    # Large sections are rendered piecewise, one bounded chunk of blocks at a time.
+    for name, blocks in sections:
+        chunk = []
+        weight = 0
+        for block in _split_blocks(blocks):
+            size = len(block[1]) if block[0] in ("bullets", "table") else 1
+            if chunk and weight + size > MAX_BLOCK_ITEMS:
+                yield name, tuple(chunk)
+                chunk = []
+                weight = 0
+            chunk.append(block)
+            weight += size
+        if chunk:
+            yield name, tuple(chunk)
+
+
+class SpilledStory:
+    """The document's section chunks, built once and pickled one by one into a spill file.
+
+    keys holds one content hash per chunk; every format renders from the same file,
+    reading the chunks back one at a time, so neither the build nor a render pass
+    holds the whole document in memory.
+    """
+
+    def __init__(self, path, keys):
+        self.path = path
+        self.keys = keys
+
+    def __iter__(self):
+        with open(self.path, "rb") as handle:
+            for _ in self.keys:
+                yield pickle.load(handle)
+
+
+def spill_story(sections, path):
+    keys = []
+    with open(path, "wb") as handle:
+        for chunk in _section_stream(profiled("story construction", sections)):
+            keys.append(digest(chunk[1]))
+            pickle.dump(chunk, handle, protocol=pickle.HIGHEST_PROTOCOL)
+    return SpilledStory(path, keys)
+
+
+def render_target(name, story, output_path, cache):
+    """Render one output format from a SpilledStory; runs in a worker process when several targets build at once."""
+    started = time.perf_counter()
+    renderer = RENDERERS[name]
+    with phase(f"render {name}"):
+        keys = [digest(RENDER_CODE, name, key) for key in story.keys]
+
+        # Whole document unchanged: reuse the last rendered file without laying anything out.
+        document_key = digest(RENDER_CODE, name, output_path, keys)
+        if not cache.get_file(document_key, output_path):
+            with phase("write"):
+                renderer.write(_fragments(renderer, story, keys, cache), output_path)
+            cache.put_file(document_key, output_path)
+    return name, output_path, time.perf_counter() - started, cache.hits, cache.misses
+
+
+def render_all(make_sections, targets, cache=None, parallel=True):
+    """Render every (format -> output path) target, in parallel processes when there is more than one.
+
+    make_sections() is called once; its story is spilled to a temporary file that every format reads.
+    """
+    cache = cache or SectionCache()
+    with tempfile.TemporaryDirectory(prefix="erd_story_") as directory:
+        story = spill_story(make_sections(), os.path.join(directory, "story.pickle"))
+        if len(targets) == 1 or not parallel:
+            results = [render_target(name, story, output_path, cache) for name, output_path in targets.items()]
+        else:
+            with ProcessPoolExecutor(max_workers=len(targets)) as pool:
+                futures = [pool.submit(render_target, name, story, path, cache) for name, path in targets.items()]
+                results = [future.result() for future in futures]
+    cache.prune()
+    return results
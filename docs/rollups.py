@@ -0,0 +1,478 @@
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+
+from schema_catalog import load_catalog
+
+ROLLUP_VIEWS = ("v_thana_case_summary", "v_gd_status_summary", "v_jail_occupancy")
+MODES = ("trigger", "log")
+# "trigger" applies each statement's delta to the rollup rows at once; "log" appends it to a delta table
+# that readers add on the fly and fn_fold_* folds in, so writers never wait on a hot rollup row.
+BENCH_CASE_FILES = (1_000_000, 10_000_000)
+BENCH_SCALE = 0.001
+WRITE_TRIALS = 5
+BULK_ROWS = 10_000
+SINGLE_ROWS = 500
+
+VIEW_SHAPE = re.compile(
+    r"SELECT\s+(?P<select>.*?)\s+FROM\s+(?P<parent>\w+)\s+(?P<p>\w+)\s+LEFT\s+JOIN\s+(?P<child>\w+)\s+(?P<c>\w+)"
+    r"\s+ON\s+(?P<on>.*?)\s+GROUP\s+BY\s+(?P<group>.*?)\s*;?\s*$",
+    re.I | re.S,
+)
+COUNT = re.compile(r"COUNT\((?P<column>\w+\.\w+)\)(?:\s*FILTER\s*\(\s*WHERE\s+(?P<filter>(?:[^()]|\([^()]*\))*)\))?", re.I)
+AGGREGATE = re.compile(r"\b(COUNT|SUM|AVG|MIN|MAX|ARRAY_AGG|STRING_AGG|BOOL_AND|BOOL_OR)\s*\(", re.I)
+SERIAL_KEY_TYPES = {"SERIAL": "INT", "BIGSERIAL": "BIGINT", "SMALLSERIAL": "SMALLINT"}
+KEY_JOIN = re.compile(r"(\w+)\.(\w+)\s*=\s*(\w+)\.(\w+)")
+
+
+@dataclass
+class Measure:
+    name: str
+    column: str
+    filter: str | None = None
+
+    def aggregate(self):
+        return f"COUNT({self.column})" + (f" FILTER (WHERE {self.filter})" if self.filter else "")
+
+
+@dataclass
+class Rollup:
+    """A LEFT JOIN ... GROUP BY view whose aggregates are all COUNTs, maintained as one row per parent key."""
+
+    view: str
+    parent: str
+    parent_alias: str
+    key: str
+    key_type: str
+    child: str
+    child_alias: str
+    foreign_key: str
+    on: str
+    predicate: str | None = None
+    measures: list = field(default_factory=list)
+    # (expression over the parent alias and r.<measure>, output name), in the view's column order
+    columns: list = field(default_factory=list)
+
+    @property
+    def stem(self):
+        return self.view.removeprefix("v_")
+
+    @property
+    def table(self):
+        return f"rollup_{self.stem}"
+
+    @property
+    def log(self):
+        return f"rollup_log_{self.stem}"
+
+    @property
+    def read_view(self):
+        return f"{self.view}_rollup"
+
+
+def split_top_level(text, separator=","):
+    parts, depth, quoted, start = [], 0, False, 0
+    for i, char in enumerate(text):
+        if char == "'":
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and not depth and text[i:i + len(separator)].upper() == separator.upper():
+            parts.append(text[start:i].strip())
+            start = i + len(separator)
+    parts.append(text[start:].strip())
+    return parts
+
+
+def plan_rollup(catalog, view_name):
+    """Read a view's shape from its SQL; ValueError says why a view cannot be rolled up."""
+    view = next((view for view in catalog.views if view.name == view_name), None)
+    if view is None:
+        raise ValueError(f"{view_name}: no such view")
+    shape = VIEW_SHAPE.match(" ".join(view.sql.split()))
+    if not shape:
+        raise ValueError(f"{view_name}: not a single LEFT JOIN ... GROUP BY")
+    parent, p, child, c = shape.group("parent", "p", "child", "c")
+    parent_table = catalog.tables.get(parent)
+    if parent_table is None or len(parent_table.primary_key) != 1:
+        raise ValueError(f"{view_name}: {parent} needs a single-column primary key")
+    key = parent_table.primary_key[0]
+
+    foreign_key = None
+    predicates = []
+    for term in split_top_level(shape.group("on"), " AND "):
+        match = KEY_JOIN.fullmatch(term)
+        ends = dict([match.group(1, 2), match.group(3, 4)]) if match else {}
+        if foreign_key is None and ends.get(p) == key and c in ends:
+            foreign_key = ends[c]
+        elif re.search(rf"\b{p}\.", term):
+            raise ValueError(f"{view_name}: join condition {term!r} depends on {parent}")
+        else:
+            predicates.append(term)
+    if foreign_key is None:
+        raise ValueError(f"{view_name}: join is not on {p}.{key}")
+
+    key_type = parent_table.column(key).data_type
+    key_type = SERIAL_KEY_TYPES.get(key_type, key_type)
+    rollup = Rollup(view_name, parent, p, key, key_type, child, c, foreign_key, shape.group("on"), " AND ".join(predicates) or None)
+    items = []
+    for item in split_top_level(shape.group("select")):
+        named = re.fullmatch(r"(.*?)\s+AS\s+(\w+)", item, re.I | re.S)
+        expression, name = named.groups() if named else (item, item.rsplit(".", 1)[-1])
+        items.append((expression, name))
+    # Bare COUNTs name their measure; COUNTs inside other expressions reuse it or get a hidden one.
+    for expression, name in items:
+        match = COUNT.fullmatch(expression)
+        if match:
+            rollup.measures.append(Measure(name, match.group("column"), match.group("filter")))
+
+    def measure(match):
+        found = next((m for m in rollup.measures if (m.column, m.filter) == match.group("column", "filter")), None)
+        if found is None:
+            found = Measure(f"count_{len(rollup.measures)}", match.group("column"), match.group("filter"))
+            rollup.measures.append(found)
+        return f"r.{found.name}"
+
+    for expression, name in items:
+        rewritten = COUNT.sub(measure, expression)
+        if AGGREGATE.search(rewritten):
+            raise ValueError(f"{view_name}: {name} uses an aggregate other than COUNT")
+        if re.search(rf"\b{c}\.", rewritten):
+            raise ValueError(f"{view_name}: {name} reads {child} outside an aggregate")
+        rollup.columns.append((rewritten, name))
+    return rollup
+
+
+def _delta(rollup, rows):
+    """Per-key measure deltas of a statement's transition rows (rows selects rollup_sign plus the row)."""
+    c = rollup.child_alias
+    sums = ",\n            ".join(
+        f"coalesce(sum({c}.rollup_sign) FILTER (WHERE {m.column} IS NOT NULL{f' AND ({m.filter})' if m.filter else ''}), 0) AS {m.name}"
+        for m in rollup.measures
+    )
+    where = f"{c}.{rollup.foreign_key} IS NOT NULL" + (f" AND ({rollup.predicate})" if rollup.predicate else "")
+    return f"""SELECT {c}.{rollup.foreign_key} AS rollup_key,
+            {sums}
+        FROM ({rows}) {c}
+        WHERE {where}
+        GROUP BY {c}.{rollup.foreign_key}"""
+
+
+def _apply(rollup, rows, mode):
+    changed = " OR ".join(f"d.{m.name} <> 0" for m in rollup.measures)
+    names = ", ".join(m.name for m in rollup.measures)
+    if mode == "log":
+        return f"""INSERT INTO {rollup.log} (rollup_key, {names})
+        SELECT * FROM (
+        {_delta(rollup, rows)}
+        ) d
+        WHERE {changed};"""
+    updates = ", ".join(f"{m.name} = r.{m.name} + d.{m.name}" for m in rollup.measures)
+    return f"""UPDATE {rollup.table} r SET {updates}
+        FROM (
+        {_delta(rollup, rows)}
+        ) d
+        WHERE r.{rollup.key} = d.rollup_key AND ({changed});"""
+
+
+def _read_view(rollup, mode):
+    columns = ",\n    ".join(f"{expression} AS {name}" for expression, name in rollup.columns)
+    source = rollup.table
+    if mode == "log":
+        names = ", ".join(m.name for m in rollup.measures)
+        sums = ", ".join(f"sum({m.name})::bigint AS {m.name}" for m in rollup.measures)
+        source = (
+            f"(SELECT {rollup.key}, {sums} FROM (SELECT {rollup.key}, {names} FROM {rollup.table} "
+            f"UNION ALL SELECT rollup_key, {names} FROM {rollup.log}) u GROUP BY {rollup.key})"
+        )
+    return f"""CREATE VIEW {rollup.read_view} AS
+SELECT
+    {columns}
+FROM {rollup.parent} {rollup.parent_alias}
+JOIN {source} r ON r.{rollup.key} = {rollup.parent_alias}.{rollup.key}"""
+
+
+def drop_sql(rollup):
+    return [
+        f"DROP VIEW IF EXISTS {rollup.read_view}",
+        *(f"DROP TRIGGER IF EXISTS trg_rollup_{rollup.stem}_{event} ON {rollup.child}" for event in ("insert", "update", "delete", "truncate")),
+        f"DROP TRIGGER IF EXISTS trg_rollup_{rollup.stem}_keys ON {rollup.parent}",
+        f"DROP FUNCTION IF EXISTS fn_rollup_{rollup.stem}()",
+        f"DROP FUNCTION IF EXISTS fn_rollup_{rollup.stem}_keys()",
+        f"DROP FUNCTION IF EXISTS fn_fold_{rollup.stem}()",
+        f"DROP TABLE IF EXISTS {rollup.log}",
+        f"DROP TABLE IF EXISTS {rollup.table}",
+    ]
+
+
+def create_sql(rollup, mode="trigger"):
+    """Statements that build and populate the rollup, install its maintenance triggers and the read view."""
+    p, c = rollup.parent_alias, rollup.child_alias
+    names = ", ".join(m.name for m in rollup.measures)
+    counters = ",\n    ".join(f"{m.name} BIGINT NOT NULL DEFAULT 0" for m in rollup.measures)
+    aggregates = ",\n    ".join(m.aggregate() for m in rollup.measures)
+    inserted = "SELECT 1 AS rollup_sign, * FROM new_rows"
+    deleted = "SELECT -1 AS rollup_sign, * FROM old_rows"
+    if mode == "log":
+        reset = f"DELETE FROM {rollup.log};\n        UPDATE {rollup.table} SET " + ", ".join(f"{m.name} = 0" for m in rollup.measures) + ";"
+    else:
+        reset = f"UPDATE {rollup.table} SET " + ", ".join(f"{m.name} = 0" for m in rollup.measures) + ";"
+    statements = drop_sql(rollup) + [
+        f"""CREATE TABLE {rollup.table} (
+    {rollup.key} {rollup.key_type} PRIMARY KEY REFERENCES {rollup.parent}({rollup.key}) ON DELETE CASCADE ON UPDATE CASCADE,
+    {counters}
+)""",
+        f"""INSERT INTO {rollup.table} ({rollup.key}, {names})
+SELECT {p}.{rollup.key},
+    {aggregates}
+FROM {rollup.parent} {p}
+LEFT JOIN {rollup.child} {c} ON {rollup.on}
+GROUP BY {p}.{rollup.key}""",
+    ]
+    if mode == "log":
+        statements.append(
+            f"CREATE TABLE {rollup.log} (rollup_key {rollup.key_type} NOT NULL, "
+            + ", ".join(f"{m.name} BIGINT NOT NULL" for m in rollup.measures) + ")"
+        )
+    statements.append(
+        f"""CREATE OR REPLACE FUNCTION fn_rollup_{rollup.stem}()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Statement-level: one grouped delta per INSERT/UPDATE/DELETE, however many rows it touched.
+    IF TG_OP = 'INSERT' THEN
+        {_apply(rollup, inserted, mode)}
+    ELSIF TG_OP = 'DELETE' THEN
+        {_apply(rollup, deleted, mode)}
+    ELSIF TG_OP = 'UPDATE' THEN
+        {_apply(rollup, f"{inserted} UNION ALL {deleted}", mode)}
+    ELSE
+        {reset}
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql"""
+    )
+    for event, referencing in (
+        ("insert", "REFERENCING NEW TABLE AS new_rows "),
+        ("update", "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "),
+        ("delete", "REFERENCING OLD TABLE AS old_rows "),
+        ("truncate", ""),
+    ):
+        statements.append(
+            f"CREATE TRIGGER trg_rollup_{rollup.stem}_{event}\nAFTER {event.upper()} ON {rollup.child}\n"
+            f"{referencing}FOR EACH STATEMENT\nEXECUTE FUNCTION fn_rollup_{rollup.stem}()"
+        )
+    statements += [
+        f"""CREATE OR REPLACE FUNCTION fn_rollup_{rollup.stem}_keys()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- New parents start with zero counts.
+    INSERT INTO {rollup.table} ({rollup.key}) SELECT {rollup.key} FROM new_rows ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql""",
+        f"CREATE TRIGGER trg_rollup_{rollup.stem}_keys\nAFTER INSERT ON {rollup.parent}\n"
+        f"REFERENCING NEW TABLE AS new_rows FOR EACH STATEMENT\nEXECUTE FUNCTION fn_rollup_{rollup.stem}_keys()",
+        _read_view(rollup, mode),
+    ]
+    if mode == "log":
+        totals = ", ".join(f"sum({m.name}) AS {m.name}" for m in rollup.measures)
+        updates = ", ".join(f"{m.name} = r.{m.name} + t.{m.name}" for m in rollup.measures)
+        statements.append(
+            f"""CREATE OR REPLACE FUNCTION fn_fold_{rollup.stem}()
+RETURNS BIGINT AS $$
+DECLARE
+    folded BIGINT;
+BEGIN
+    -- Move the logged deltas into the rollup rows; returns the number of rollup rows changed.
+    WITH moved AS (DELETE FROM {rollup.log} RETURNING *),
+    totals AS (SELECT rollup_key, {totals} FROM moved GROUP BY rollup_key)
+    UPDATE {rollup.table} r SET {updates} FROM totals t WHERE r.{rollup.key} = t.rollup_key;
+    GET DIAGNOSTICS folded = ROW_COUNT;
+    RETURN folded;
+END;
+$$ LANGUAGE plpgsql"""
+        )
+    return statements
+
+
+def verify(cursor, rollup):
+    """(rows only in the view, rows only in the rollup view); (0, 0) means the rollup is exact."""
+    cursor.execute(
+        f"SELECT (SELECT count(*) FROM (SELECT * FROM {rollup.view} EXCEPT ALL SELECT * FROM {rollup.read_view}) a), "
+        f"(SELECT count(*) FROM (SELECT * FROM {rollup.read_view} EXCEPT ALL SELECT * FROM {rollup.view}) b)"
+    )
+    return cursor.fetchone()
+
+
+def install(cursor, rollups, mode):
+    for rollup in rollups:
+        for statement in create_sql(rollup, mode):
+            cursor.execute(statement)
+
+
+def uninstall(cursor, rollups):
+    for rollup in rollups:
+        for statement in drop_sql(rollup):
+            cursor.execute(statement)
+
+
+# ---- benchmark ----
+
+BULK_INSERT_SQL = """
+INSERT INTO case_files (case_number, criminal_id, thana_id, case_type, status)
+SELECT 'BENCH-' || %(tag)s || '-' || g, %(criminal)s,
+       (%(thanas)s::int[])[1 + g %% cardinality(%(thanas)s::int[])], 'bench',
+       (ARRAY['open', 'investigating', 'closed'])[1 + g %% 3]
+FROM generate_series(1, %(rows)s) g
+"""
+SINGLE_INSERT_SQL = """
+INSERT INTO case_files (case_number, criminal_id, thana_id, case_type, status) VALUES (%s, %s, %s, 'bench', 'open')
+"""
+BULK_UPDATE_SQL = """
+UPDATE case_files SET status = CASE status WHEN 'open' THEN 'investigating' WHEN 'investigating' THEN 'closed' ELSE 'open' END
+WHERE case_id <= %(rows)s
+"""
+
+
+def _timed(connection, work, trials=WRITE_TRIALS):
+    """Median wall time in ms of work(cursor), each trial rolled back so the table never changes."""
+    timings = []
+    cursor = connection.cursor()
+    for trial in range(trials):
+        started = time.perf_counter()
+        work(cursor, trial)
+        timings.append((time.perf_counter() - started) * 1000)
+        connection.rollback()
+    return statistics.median(timings)
+
+
+def write_costs(connection, criminal, thanas):
+    connection.autocommit = False
+
+    def bulk(cursor, trial):
+        cursor.execute(BULK_INSERT_SQL, {"tag": f"b{trial}", "criminal": criminal, "thanas": thanas, "rows": BULK_ROWS})
+
+    def single(cursor, trial):
+        for i in range(SINGLE_ROWS):
+            cursor.execute(SINGLE_INSERT_SQL, (f"BENCH-s{trial}-{i}", criminal, thanas[i % len(thanas)]))
+
+    def update(cursor, trial):
+        cursor.execute(BULK_UPDATE_SQL, {"rows": BULK_ROWS})
+
+    costs = {
+        "bulk_insert_ms": _timed(connection, bulk),
+        "single_insert_us": _timed(connection, single) * 1000 / SINGLE_ROWS,
+        "bulk_update_ms": _timed(connection, update),
+    }
+    connection.autocommit = True
+    return costs
+
+
+def benchmark(dsn, sizes=BENCH_CASE_FILES, trials=20, workers=None):
+    from bench_queries import prepare, run_query
+
+    catalog = load_catalog()
+    rollups = [plan_rollup(catalog, name) for name in ROLLUP_VIEWS]
+    results = {}
+    for size in sizes:
+        started = time.perf_counter()
+        connection = prepare(dsn, BENCH_SCALE, workers, overrides={"case_files": size}, name=f"erd_rollup_{size}")
+        cursor = connection.cursor()
+        print(f"{size:,} case_files: loaded in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        # The COPY load writes explicit keys, so move the sequence past them before inserting.
+        cursor.execute("SELECT setval(pg_get_serial_sequence('case_files', 'case_id'), max(case_id)) FROM case_files")
+        cursor.execute("SELECT (SELECT criminal_id FROM criminals LIMIT 1), (SELECT array_agg(thana_id) FROM thanas)")
+        criminal, thanas = cursor.fetchone()
+        result = {"reads": {}, "writes": {"none": write_costs(connection, criminal, thanas)}}
+        for rollup in rollups:
+            result["reads"][rollup.view] = {"view": run_query(cursor, f"SELECT * FROM {rollup.view}", None, trials=trials)["p50_ms"]}
+        for mode in MODES:
+            started = time.perf_counter()
+            install(cursor, rollups, mode)
+            cursor.execute("ANALYZE")
+            build_ms = (time.perf_counter() - started) * 1000
+            for rollup in rollups:
+                reads = result["reads"][rollup.view]
+                reads[mode] = run_query(cursor, f"SELECT * FROM {rollup.read_view}", None, trials=trials)["p50_ms"]
+                reads[f"{mode}_exact"] = verify(cursor, rollup) == (0, 0)
+            result["writes"][mode] = write_costs(connection, criminal, thanas)
+            result["writes"][mode]["build_ms"] = build_ms
+            uninstall(cursor, rollups)
+        results[size] = result
+        connection.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Turn COUNT-only views into rollup tables maintained by statement-level triggers.")
+    parser.add_argument("--view", action="append", help=f"view to roll up (repeatable, default {', '.join(ROLLUP_VIEWS)})")
+    parser.add_argument("--mode", choices=MODES, default="trigger")
+    parser.add_argument("--out", help="write the SQL here instead of printing it")
+    parser.add_argument("--dsn", help="database to act on ('' uses PG* variables)")
+    parser.add_argument("--install", action="store_true", help="build the rollups in --dsn and verify them")
+    parser.add_argument("--verify", action="store_true", help="compare installed rollups with their views")
+    parser.add_argument("--drop", action="store_true", help="remove the rollups from --dsn")
+    parser.add_argument("--bench", action="store_true", help="read latency and write overhead at --case-files sizes (superuser DSN; erd_rollup_* databases are recreated)")
+    parser.add_argument("--case-files", type=int, nargs="+", default=list(BENCH_CASE_FILES))
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        results = benchmark(args.dsn or "", args.case_files, workers=args.workers)
+        print(f"{'case_files':>11} {'view':<22} {'view ms':>8} {'trigger ms':>11} {'log ms':>8}  exact")
+        for size, result in results.items():
+            for view, reads in result["reads"].items():
+                exact = "yes" if all(reads[f"{mode}_exact"] for mode in MODES) else "NO"
+                print(f"{size:>11,} {view:<22} {reads['view']:>8.2f} {reads['trigger']:>11.3f} {reads['log']:>8.3f}  {exact}")
+        print(f"\n{'case_files':>11} {'maintenance':<12} {f'insert {BULK_ROWS:,} ms':>17} {'single insert µs':>17} {f'update {BULK_ROWS:,} ms':>17} {'build ms':>9}")
+        for size, result in results.items():
+            for mode, costs in result["writes"].items():
+                build = f"{costs['build_ms']:>9.0f}" if "build_ms" in costs else f"{'-':>9}"
+                print(
+                    f"{size:>11,} {mode:<12} {costs['bulk_insert_ms']:>17.1f} {costs['single_insert_us']:>17.0f} "
+                    f"{costs['bulk_update_ms']:>17.1f} {build}"
+                )
+        return 0
+
+    catalog = load_catalog()
+    rollups = [plan_rollup(catalog, name) for name in args.view or ROLLUP_VIEWS]
+    if args.dsn is None:
+        text = "".join(f"{statement};\n\n" for rollup in rollups for statement in create_sql(rollup, args.mode))
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as handle:
+                handle.write(text)
+        else:
+            print(text, end="")
+        return 0
+
+    from bench_queries import _connect
+
+    connection = _connect(args.dsn)
+    cursor = connection.cursor()
+    if args.drop:
+        uninstall(cursor, rollups)
+        print(f"dropped {len(rollups)} rollups")
+    if args.install:
+        started = time.perf_counter()
+        install(cursor, rollups, args.mode)
+        print(f"{len(rollups)} rollups built in {(time.perf_counter() - started) * 1000:.0f} ms ({args.mode} maintenance)")
+    failed = 0
+    if args.install or args.verify:
+        for rollup in rollups:
+            missing, extra = verify(cursor, rollup)
+            failed += bool(missing or extra)
+            state = "exact" if not (missing or extra) else f"{missing} rows differ from the view, {extra} extra"
+            print(f"  {rollup.read_view}: {state}")
+    connection.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,597 @@
+import os
+import re
+import time
+from dataclasses import dataclass, field
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "src", "database")
+DDL_FILES = ("schema.sql", "indexes.sql", "views.sql", "triggers.sql")
+SEED_FILE = "seed_data.sql"
+SERIAL_TYPES = {"SERIAL", "BIGSERIAL", "SMALLSERIAL"}
+
+# Words that end the type part of a column definition.
+COLUMN_KEYWORDS = {"NOT", "NULL", "PRIMARY", "UNIQUE", "CHECK", "DEFAULT", "REFERENCES", "CONSTRAINT", "GENERATED", "COLLATE"}
+SQL_KEYWORDS = {
+    "SELECT", "FROM", "WHERE", "JOIN", "LEFT", "RIGHT", "INNER", "OUTER", "FULL", "CROSS", "LATERAL",
+    "ON", "AND", "OR", "GROUP", "ORDER", "BY", "LIMIT", "AS", "USING", "WITH", "UNION", "HAVING",
+}
+
+
+@dataclass
+class Column:
+    name: str
+    data_type: str
+    nullable: bool = True
+    default: str | None = None
+    primary_key: bool = False
+    unique: bool = False
+
+
+@dataclass
+class ForeignKey:
+    table: str
+    columns: tuple
+    ref_table: str
+    ref_columns: tuple
+    name: str | None = None
+    on_delete: str | None = None
+
+
+@dataclass
+class Check:
+    table: str
+    expression: str
+    columns: tuple
+
+
+@dataclass
+class Index:
+    name: str
+    table: str
+    columns: tuple
+    unique: bool = False
+    where: str | None = None
+
+
+@dataclass
+class View:
+    name: str
+    sql: str
+    sources: tuple
+
+
+@dataclass
+class Function:
+    name: str
+    language: str
+    body: str
+
+
+@dataclass
+class Trigger:
+    name: str
+    table: str
+    timing: str
+    events: tuple
+    update_columns: tuple
+    function: str
+
+
+@dataclass
+class Table:
+    name: str
+    comment: str = ""
+    columns: list = field(default_factory=list)
+    primary_key: tuple = ()
+    uniques: list = field(default_factory=list)
+    foreign_keys: list = field(default_factory=list)
+    checks: list = field(default_factory=list)
+
+    def column(self, name):
+        for column in self.columns:
+            if column.name == name:
+                return column
+        return None
+
+    def relationship_keys(self):
+        # A relation table is keyed by (at least) two of its foreign keys, e.g. criminal_organizations.
+        for key in [self.primary_key, *self.uniques]:
+            covered = [fk for fk in self.foreign_keys if set(fk.columns) <= set(key)]
+            if len(covered) >= 2:
+                return covered
+        return []
+
+    def is_relationship(self):
+        return bool(self.relationship_keys())
+
+
+@dataclass
+class Catalog:
+    tables: dict = field(default_factory=dict)
+    indexes: list = field(default_factory=list)
+    views: list = field(default_factory=list)
+    functions: dict = field(default_factory=dict)
+    triggers: list = field(default_factory=list)
+    _incoming: dict | None = field(default=None, repr=False, compare=False)
+
+    def foreign_keys(self):
+        return [fk for table in self.tables.values() for fk in table.foreign_keys]
+
+    def referencing(self, table_name):
+        if self._incoming is None:
+            self._incoming = {}
+            for fk in self.foreign_keys():
+                self._incoming.setdefault(fk.ref_table, []).append(fk)
+        return self._incoming.get(table_name, [])
+
+
+@dataclass
+class SeedTable:
+    name: str
+    columns: list = field(default_factory=list)
+    rows: list = field(default_factory=list)
+
+
+def iter_statements(lines):
+    """Yield (statement, leading_comment) pairs from an iterable of SQL lines.
+
+    Handles quoted strings, $tag$ bodies and -- / /* */ comments so that
+    semicolons inside them do not end a statement.
+    """
+    buf = []
+    comments = []
+    quote = None
+    dollar = None
+    block = False
+    for line in lines:
+        i = 0
+        n = len(line)
+        start = 0
+        while i < n:
+            ch = line[i]
+            if block:
+                end = line.find("*/", i)
+                if end < 0:
+                    i = n
+                    start = n
+                    break
+                block = False
+                i = end + 2
+                start = i
+                continue
+            if dollar:
+                end = line.find(dollar, i)
+                if end < 0:
+                    i = n
+                    break
+                i = end + len(dollar)
+                dollar = None
+                continue
+            if quote:
+                end = line.find(quote, i)
+                if end < 0:
+                    i = n
+                    break
+                i = end + 1
+                quote = None
+                continue
+            if ch == "-" and line.startswith("--", i):
+                if not "".join(buf).strip() and not line[:i].strip():
+                    comments.append(line[i + 2:].strip())
+                buf.append(line[start:i] + "\n")
+                start = n
+                i = n
+                break
+            if ch == "/" and line.startswith("/*", i):
+                buf.append(line[start:i])
+                block = True
+                i += 2
+                start = i
+                continue
+            if ch == "'" or ch == '"':
+                quote = ch
+                i += 1
+                continue
+            if ch == "$":
+                match = re.match(r"\$[A-Za-z_]*\$", line[i:])
+                if match:
+                    dollar = match.group(0)
+                    i += len(dollar)
+                    continue
+            if ch == ";":
+                buf.append(line[start:i])
+                statement = "".join(buf).strip()
+                if statement:
+                    yield statement, " ".join(c for c in comments if c.strip("=- "))
+                buf = []
+                comments = []
+                i += 1
+                start = i
+                continue
+            i += 1
+        if start < n:
+            buf.append(line[start:])
+    statement = "".join(buf).strip()
+    if statement:
+        yield statement, " ".join(comments)
+
+
+def _split_top_level(text, sep=","):
+    parts = []
+    depth = 0
+    quote = None
+    start = 0
+    for i, ch in enumerate(text):
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in "'\"":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == sep and depth == 0:
+            parts.append(text[start:i].strip())
+            start = i + 1
+    tail = text[start:].strip()
+    if tail:
+        parts.append(tail)
+    return parts
+
+
+def _tokens(text):
+    # Words, quoted strings and balanced (...) groups, each as one token.
+    tokens = []
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        if ch.isspace():
+            i += 1
+        elif ch == "(":
+            depth = 0
+            j = i
+            while j < n:
+                if text[j] == "(":
+                    depth += 1
+                elif text[j] == ")":
+                    depth -= 1
+                    if depth == 0:
+                        break
+                j += 1
+            tokens.append(text[i:j + 1])
+            i = j + 1
+        elif ch in "'\"":
+            j = text.find(ch, i + 1)
+            j = n - 1 if j < 0 else j
+            tokens.append(text[i:j + 1])
+            i = j + 1
+        else:
+            j = i
+            while j < n and not text[j].isspace() and text[j] not in "(),":
+                j += 1
+            tokens.append(text[i:max(j, i + 1)])
+            i = max(j, i + 1)
+    return tokens
+
+
+def _names(group):
+    return tuple(part.strip().strip('"') for part in group.strip()[1:-1].split(",") if part.strip())
+
+
+def _referenced_columns(expression, table):
+    names = {c.name for c in table.columns}
+    return tuple(dict.fromkeys(w for w in re.findall(r"[A-Za-z_][A-Za-z0-9_]*", expression) if w in names))
+
+
+def _parse_references(tokens, i):
+    # tokens[i] is REFERENCES; returns (ref_table, ref_columns, on_delete, next_index)
+    ref = tokens[i + 1]
+    ref_columns = ()
+    if "(" in ref:
+        ref, group = ref.split("(", 1)
+        ref_columns = _names("(" + group)
+        i += 2
+    else:
+        i += 2
+        if i < len(tokens) and tokens[i].startswith("("):
+            ref_columns = _names(tokens[i])
+            i += 1
+    on_delete = None
+    while i + 2 < len(tokens) and tokens[i].upper() == "ON":
+        action = tokens[i + 2].upper()
+        if action in ("SET", "NO") and i + 3 < len(tokens):
+            action = f"{action} {tokens[i + 3].upper()}"
+            step = 4
+        else:
+            step = 3
+        if tokens[i + 1].upper() == "DELETE":
+            on_delete = action
+        i += step
+    return ref.strip('"'), ref_columns, on_delete, i
+
+
+def _parse_constraint(table, text):
+    tokens = _tokens(text)
+    name = None
+    if tokens[0].upper() == "CONSTRAINT":
+        name = tokens[1]
+        tokens = tokens[2:]
+    kind = tokens[0].upper()
+    if kind == "PRIMARY":
+        table.primary_key = _names(tokens[2])
+        for column_name in table.primary_key:
+            column = table.column(column_name)
+            if column:
+                column.nullable = False
+    elif kind == "UNIQUE":
+        table.uniques.append(_names(tokens[1]))
+    elif kind == "CHECK":
+        expression = tokens[1][1:-1].strip()
+        table.checks.append(Check(table.name, expression, _referenced_columns(expression, table)))
+    elif kind == "FOREIGN":
+        columns = _names(tokens[2])
+        ref_table, ref_columns, on_delete, _ = _parse_references(tokens, 3)
+        table.foreign_keys.append(ForeignKey(table.name, columns, ref_table, ref_columns, name, on_delete))
+
+
+def _parse_column(table, text):
+    tokens = _tokens(text)
+    column = Column(tokens[0].strip('"'), "")
+    i = 1
+    type_parts = []
+    while i < len(tokens) and tokens[i].upper() not in COLUMN_KEYWORDS:
+        type_parts.append(tokens[i])
+        i += 1
+    column.data_type = " ".join(type_parts).replace(" (", "(")
+    table.columns.append(column)
+    while i < len(tokens):
+        word = tokens[i].upper()
+        if word == "NOT" and i + 1 < len(tokens) and tokens[i + 1].upper() == "NULL":
+            column.nullable = False
+            i += 2
+        elif word == "NULL":
+            i += 1
+        elif word == "PRIMARY":
+            column.primary_key = True
+            column.nullable = False
+            table.primary_key = (column.name,)
+            i += 2
+        elif word == "UNIQUE":
+            column.unique = True
+            table.uniques.append((column.name,))
+            i += 1
+        elif word == "CHECK":
+            expression = tokens[i + 1][1:-1].strip()
+            table.checks.append(Check(table.name, expression, _referenced_columns(expression, table) or (column.name,)))
+            i += 2
+        elif word == "DEFAULT":
+            j = i + 1
+            while j < len(tokens) and tokens[j].upper() not in COLUMN_KEYWORDS:
+                j += 1
+            column.default = " ".join(tokens[i + 1:j]).replace(" (", "(")
+            i = j
+        elif word == "REFERENCES":
+            ref_table, ref_columns, on_delete, i = _parse_references(tokens, i)
+            table.foreign_keys.append(ForeignKey(table.name, (column.name,), ref_table, ref_columns, None, on_delete))
+        else:
+            i += 1
+
+
+def _parse_create_table(catalog, statement, comment):
+    match = re.match(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?\"?(\w+)\"?\s*\(", statement, re.I)
+    table = Table(match.group(1), comment)
+    body = statement[match.end():statement.rstrip().rfind(")")]
+    elements = _split_top_level(body)
+    constraints = []
+    for element in elements:
+        head = element.split(None, 1)[0].upper()
+        if head in ("CONSTRAINT", "PRIMARY", "UNIQUE", "CHECK", "FOREIGN"):
+            constraints.append(element)
+        else:
+            _parse_column(table, element)
+    for element in constraints:
+        _parse_constraint(table, element)
+    catalog.tables[table.name] = table
+
+
+def _parse_alter_table(catalog, statement):
+    match = re.match(r"ALTER\s+TABLE\s+(?:ONLY\s+)?\"?(\w+)\"?\s+ADD\s+(CONSTRAINT\s+.*|PRIMARY.*|UNIQUE.*|CHECK.*|FOREIGN.*)", statement, re.I | re.S)
+    if match and match.group(1) in catalog.tables:
+        _parse_constraint(catalog.tables[match.group(1)], " ".join(match.group(2).split()))
+
+
+def _parse_create_index(catalog, statement):
+    match = re.match(
+        r"CREATE\s+(UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s+ON\s+(?:ONLY\s+)?(\w+)\s*(?:USING\s+\w+\s*)?(\(.*\))(?:\s+WHERE\s+(.*))?$",
+        " ".join(statement.split()),
+        re.I,
+    )
+    if match:
+        columns = tuple(" ".join(part.split()) for part in _split_top_level(match.group(4)[1:-1]))
+        catalog.indexes.append(Index(match.group(2), match.group(3), columns, bool(match.group(1)), match.group(5)))
+
+
+def _parse_create_view(catalog, statement):
+    match = re.match(r"CREATE\s+(?:OR\s+REPLACE\s+)?(?:MATERIALIZED\s+)?VIEW\s+(\w+)\s+AS\s+(.*)$", statement, re.I | re.S)
+    if not match:
+        return
+    sql = match.group(2).strip()
+    sources = []
+    for table_name, alias in re.findall(r"\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?", sql, re.I):
+        if table_name.upper() in SQL_KEYWORDS:
+            continue
+        if not alias or alias.upper() in SQL_KEYWORDS:
+            alias = table_name
+        if (table_name, alias) not in sources:
+            sources.append((table_name, alias))
+    catalog.views.append(View(match.group(1), sql, tuple(sources)))
+
+
+def _parse_create_function(catalog, statement):
+    match = re.match(r"CREATE\s+(?:OR\s+REPLACE\s+)?FUNCTION\s+(\w+)\s*\(.*?\).*?AS\s+(\$\w*\$)(.*)\2(.*)$", statement, re.I | re.S)
+    if match:
+        language = re.search(r"LANGUAGE\s+(\w+)", match.group(4), re.I)
+        catalog.functions[match.group(1)] = Function(match.group(1), language.group(1) if language else "", match.group(3).strip())
+
+
+def _parse_create_trigger(catalog, statement):
+    match = re.match(
+        r"CREATE\s+(?:OR\s+REPLACE\s+)?(?:CONSTRAINT\s+)?TRIGGER\s+(\w+)\s+(BEFORE|AFTER|INSTEAD\s+OF)\s+(.*?)\s+ON\s+(\w+)\s+.*?EXECUTE\s+(?:FUNCTION|PROCEDURE)\s+(\w+)",
+        " ".join(statement.split()),
+        re.I,
+    )
+    if not match:
+        return
+    events = []
+    update_columns = ()
+    for part in re.split(r"\s+OR\s+", match.group(3), flags=re.I):
+        words = part.split(None, 2)
+        events.append(words[0].upper())
+        if words[0].upper() == "UPDATE" and len(words) > 2 and words[1].upper() == "OF":
+            update_columns = tuple(c.strip() for c in words[2].split(","))
+    catalog.triggers.append(Trigger(match.group(1), match.group(4), match.group(2).upper(), tuple(events), update_columns, match.group(5)))
+
+
+def parse_statement(catalog, statement, comment=""):
+    catalog._incoming = None
+    head = " ".join(statement[:80].split()).upper()
+    if head.startswith("CREATE TABLE"):
+        _parse_create_table(catalog, statement, comment)
+    elif head.startswith("ALTER TABLE"):
+        _parse_alter_table(catalog, statement)
+    elif re.match(r"CREATE (UNIQUE )?INDEX", head):
+        _parse_create_index(catalog, statement)
+    elif re.match(r"CREATE (OR REPLACE )?(MATERIALIZED )?VIEW", head):
+        _parse_create_view(catalog, statement)
+    elif re.match(r"CREATE (OR REPLACE )?FUNCTION", head):
+        _parse_create_function(catalog, statement)
+    elif re.match(r"CREATE (OR REPLACE )?(CONSTRAINT )?TRIGGER", head):
+        _parse_create_trigger(catalog, statement)
+
+
+def literal_value(text):
+    # Seed values as Python strings: quotes removed, '' unescaped, NULL -> None; other expressions stay as written.
+    text = text.strip()
+    if text.upper() == "NULL":
+        return None
+    if len(text) >= 2 and text[0] == "'" and text[-1] == "'":
+        return text[1:-1].replace("''", "'")
+    return text
+
+
+def _groups(text):
+    # Top-level (...) groups of a VALUES list, quote-aware; stops at ON CONFLICT / RETURNING.
+    groups = []
+    depth = 0
+    quote = False
+    start = None
+    for i, ch in enumerate(text):
+        if quote:
+            quote = ch != "'"
+        elif ch == "'":
+            quote = True
+        elif ch == "(":
+            if depth == 0:
+                start = i + 1
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                groups.append(text[start:i])
+        elif depth == 0 and not ch.isspace() and ch != ",":
+            break
+    return groups
+
+
+def parse_insert(statement):
+    """Return (table, columns, rows) for an INSERT ... VALUES statement, or None."""
+    match = re.match(r"INSERT\s+INTO\s+\"?(\w+)\"?\s*(\([^)]*\))\s*VALUES\s*", statement, re.I)
+    if not match:
+        return None
+    rows = [[literal_value(value) for value in _split_top_level(group)] for group in _groups(statement[match.end():])]
+    return match.group(1), _names(match.group(2)), rows
+
+
+def parse_update(statement):
+    """Return (table, assignments, conditions) for UPDATE t SET a = v[, ...] WHERE k = v [AND ...], or None."""
+    match = re.match(r"UPDATE\s+\"?(\w+)\"?\s+SET\s+(.*?)\s+WHERE\s+(.*)$", " ".join(statement.split()), re.I)
+    if not match:
+        return None
+    pairs = []
+    for part in (_split_top_level(match.group(2)), re.split(r"\s+AND\s+", match.group(3), flags=re.I)):
+        pair = {}
+        for item in part:
+            name, _, value = item.partition("=")
+            if not value:
+                return None
+            pair[name.strip().strip('"')] = literal_value(value)
+        pairs.append(pair)
+    return match.group(1), pairs[0], pairs[1]
+
+
+def load_seed(catalog, schema_dir=SCHEMA_DIR, name=SEED_FILE):
+    """Replay seed_data.sql into SeedTables: INSERT rows in order, then simple keyed UPDATEs.
+
+    Omitted SERIAL columns get the values a fresh sequence would assign, so
+    later statements that refer to them (WHERE thana_id = 1) resolve.
+    """
+    seed = {}
+    path = os.path.join(schema_dir, name)
+    if not os.path.exists(path):
+        return seed
+    with open(path, encoding="utf-8") as handle:
+        for statement, _ in iter_statements(handle):
+            head = statement[:6].upper()
+            if head == "INSERT":
+                parsed = parse_insert(statement)
+                if not parsed:
+                    continue
+                table_name, columns, rows = parsed
+                table = catalog.tables.get(table_name)
+                serial = [c.name for c in table.columns if c.data_type in SERIAL_TYPES and c.name not in columns] if table else []
+                target = seed.setdefault(table_name, SeedTable(table_name, serial + list(columns)))
+                for row in rows:
+                    values = dict(zip(columns, row))
+                    values.update({column: str(len(target.rows) + 1) for column in serial})
+                    target.rows.append([values.get(column) for column in target.columns])
+            elif head == "UPDATE":
+                parsed = parse_update(statement)
+                if not parsed or parsed[0] not in seed:
+                    continue
+                target = seed[parsed[0]]
+                assignments, conditions = parsed[1], parsed[2]
+                for column in assignments:
+                    if column not in target.columns:
+                        target.columns.append(column)
+                        for row in target.rows:
+                            row.append(None)
+                positions = {column: target.columns.index(column) for column in target.columns}
+                for row in target.rows:
+                    if all(row[positions[k]] == v for k, v in conditions.items() if k in positions):
+                        for column, value in assignments.items():
+                            row[positions[column]] = value
+    return seed
+
+
+def load_catalog(schema_dir=SCHEMA_DIR, files=DDL_FILES):
+    catalog = Catalog()
+    for name in files:
+        path = os.path.join(schema_dir, name)
+        if not os.path.exists(path):
+            continue
+        with open(path, encoding="utf-8") as handle:
+            for statement, comment in iter_statements(handle):
+                parse_statement(catalog, statement, comment)
+    return catalog
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    catalog = load_catalog()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(
+        f"{len(catalog.tables)} tables, {len(catalog.foreign_keys())} foreign keys, "
+        f"{sum(len(t.checks) for t in catalog.tables.values())} checks, {len(catalog.indexes)} indexes, "
+        f"{len(catalog.views)} views, {len(catalog.triggers)} triggers parsed in {elapsed_ms:.1f} ms"
+    )
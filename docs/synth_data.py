@@ -0,0 +1,501 @@
+import argparse
+import json
+import math
+import os
+import re
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from schema_catalog import SCHEMA_DIR, SERIAL_TYPES, load_catalog, load_seed
+
+OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".synth_data")
+SEED = 20240101
+CHUNK_ROWS = 500_000
+
+# Row counts at --scale 1: 10M arrests, 50M sightings and ~8 relations per criminal.
+BASE_ROWS = {
+    "admin": 100,
+    "thanas": 650,
+    "officers": 200_000,
+    "locations": 50_000,
+    "users": 5_000_000,
+    "gd_reports": 8_000_000,
+    "criminals": 2_000_000,
+    "organizations": 20_000,
+    "criminal_organizations": 1_500_000,
+    "criminal_relations": 16_000_000,
+    "case_files": 6_000_000,
+    "jails": 68,
+    "cell_blocks": 1_000,
+    "cells": 40_000,
+    "arrest_records": 10_000_000,
+    "incarcerations": 6_000_000,
+    "bail_records": 4_000_000,
+    "criminal_locations": 50_000_000,
+}
+DEFAULT_ROWS = 10_000
+
+# Orderings enforced by triggers or implied by meaning rather than by a CHECK: (table, column) -> (earlier column, max days later).
+ORDERED_AFTER = {
+    ("arrest_records", "bail_due_date"): ("arrest_date", 180),
+    ("incarcerations", "released_at"): ("admitted_at", 720),
+}
+# Columns that must agree with a chain of foreign keys from the same row: (table, column) -> path of FK columns.
+# An incarceration's jail is the one holding its cell's block.
+FOLLOWS = {("incarcerations", "jail_id"): ("cell_id", "block_id", "jail_id")}
+FIRST_DAY = np.datetime64("2015-01-01")
+DAYS = int((np.datetime64("2026-01-01") - FIRST_DAY).astype(np.int64)) + 720
+DEFAULT_INT_RANGE = (1, 1000)
+DEFAULT_NUMERIC_RANGE = (1_000, 1_000_000)
+DEFAULT_NULL_FRACTION = 0.1
+# Foreign keys are drawn as parent = n * u ** FK_SKEW, so a few parents collect most children.
+FK_SKEW = 1.5
+MASK64 = (1 << 64) - 1
+
+NULL = np.frombuffer(b"\\N", dtype=np.uint8)
+HEX = np.frombuffer(b"0123456789abcdef", dtype=np.uint8)
+
+
+@dataclass
+class ColumnPlan:
+    name: str
+    kind: str
+    params: tuple = ()
+    null_fraction: float = 0.0
+
+
+@dataclass
+class TablePlan:
+    name: str
+    index: int
+    rows: int
+    columns: list = field(default_factory=list)
+
+
+# ---- fixed-width encoders: each returns an (n, width) uint8 matrix, zero bytes are padding ----
+
+def _choices_matrix(values):
+    # Seed text goes out as COPY text, so a backslash, tab or newline in it would split or corrupt the row.
+    escaped = (value.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r") for value in values)
+    encoded = [value.encode("utf-8") for value in escaped]
+    width = max(len(value) for value in encoded)
+    matrix = np.zeros((len(encoded), width), dtype=np.uint8)
+    for i, value in enumerate(encoded):
+        matrix[i, :len(value)] = np.frombuffer(value, dtype=np.uint8)
+    return matrix
+
+
+def _lookup(symbols, digits):
+    # Every `digits`-long string over `symbols`, as a (len(symbols) ** digits, digits) matrix.
+    base = len(symbols)
+    codes = np.arange(base ** digits)
+    table = np.empty((base ** digits, digits), dtype=np.uint8)
+    for position in range(digits - 1, -1, -1):
+        table[:, position] = symbols[codes % base]
+        codes //= base
+    return table
+
+
+DIGITS4 = _lookup(np.frombuffer(b"0123456789", dtype=np.uint8), 4)
+HEX4 = _lookup(HEX, 4)
+POWERS_OF_TEN = 10 ** np.arange(1, 19, dtype=np.int64)
+
+
+def encode_fixed_digits(values, width):
+    # Four digits per table lookup; `width` digits with leading zeros.
+    groups = -(-width // 4)
+    out = np.empty((len(values), groups * 4), dtype=np.uint8)
+    remaining = np.asarray(values, dtype=np.int64)
+    for group in range(groups - 1, -1, -1):
+        out[:, group * 4:group * 4 + 4] = DIGITS4[remaining % 10000]
+        remaining = remaining // 10000
+    return out[:, groups * 4 - width:]
+
+
+def encode_int(values, width=None):
+    values = np.asarray(values, dtype=np.int64)
+    width = width or max(1, len(str(int(values.max(initial=0)))))
+    out = encode_fixed_digits(values, width)
+    digits = np.searchsorted(POWERS_OF_TEN, values, side="right") + 1
+    out[np.arange(width) < (width - digits)[:, None]] = 0
+    return out
+
+
+def encode_uuid(tag, ordinals):
+    # Deterministic UUIDs: an 8-hex table tag, fixed version/variant groups and the row ordinal.
+    head = np.frombuffer(f"{tag:08x}-0000-4000-8000-".encode(), dtype=np.uint8)
+    out = np.empty((len(ordinals), 36), dtype=np.uint8)
+    out[:, :24] = head
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    for group in range(3):
+        shift = 16 * (2 - group)
+        out[:, 24 + 4 * group:28 + 4 * group] = HEX4[(ordinals >> shift) & 0xFFFF]
+    return out
+
+
+DATE_TABLE = _choices_matrix([str(FIRST_DAY + day) for day in range(DAYS)])
+CLOCK_TABLE = _choices_matrix([f" {s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}+06" for s in range(86400)])
+
+
+def encode_date(days):
+    return DATE_TABLE[days]
+
+
+def encode_timestamp(days, seconds):
+    out = np.empty((len(days), 10 + 12), dtype=np.uint8)
+    out[:, :10] = DATE_TABLE[days]
+    out[:, 10:] = CLOCK_TABLE[seconds]
+    return out
+
+
+def encode_numeric(cents):
+    whole = encode_int(cents // 100)
+    dot = np.full((len(cents), 1), ord("."), dtype=np.uint8)
+    return np.concatenate([whole, dot, encode_fixed_digits(cents % 100, 2)], axis=1)
+
+
+def with_nulls(matrix, mask):
+    if not mask.any():
+        return matrix
+    if matrix.shape[1] < 2:
+        matrix = np.concatenate([matrix, np.zeros((len(matrix), 2 - matrix.shape[1]), dtype=np.uint8)], axis=1)
+    matrix[mask] = 0
+    matrix[mask, :2] = NULL
+    return matrix
+
+
+def to_copy_text(fields):
+    """Join (n, width) field matrices into COPY text lines and drop the padding in one pass."""
+    widths = [matrix.shape[1] for matrix in fields]
+    out = np.empty((len(fields[0]), sum(widths) + len(fields)), dtype=np.uint8)
+    position = 0
+    for matrix, width in zip(fields, widths):
+        out[:, position:position + width] = matrix
+        out[:, position + width] = 9
+        position += width + 1
+    out[:, -1] = 10
+    flat = out.ravel()
+    return flat[flat != 0].tobytes()
+
+
+# ---- planning: derive a generator for every column from the catalog ----
+
+def _check_rules(table):
+    rules = {}
+    for check in table.checks:
+        expression = " ".join(check.expression.split())
+        match = re.fullmatch(r"(\w+) IN \((.*)\)", expression, re.I)
+        if match:
+            rules.setdefault(match.group(1), {})["enum"] = tuple(v.strip().strip("'") for v in match.group(2).split(","))
+            continue
+        match = re.fullmatch(r"(\w+) BETWEEN (-?\d+) AND (-?\d+)", expression, re.I)
+        if match:
+            rules.setdefault(match.group(1), {}).update(low=int(match.group(2)), high=int(match.group(3)))
+            continue
+        for column, operator, bound in re.findall(r"(\w+)\s*(>=|>|<=|<)\s*(-?\d+)", expression):
+            bound = int(bound)
+            if operator in (">", ">="):
+                rules.setdefault(column, {})["low"] = bound + (operator == ">")
+            else:
+                rules.setdefault(column, {})["high"] = bound - (operator == "<")
+    return rules
+
+
+def _table_tag(name):
+    return zlib.crc32(name.encode())
+
+
+def key_plan(table, fixed):
+    """How row ordinals map to primary key values: ('serial',), ('uuid', tag) or ('fixed', values)."""
+    if table.name in fixed:
+        seed_table = fixed[table.name]
+        return ("fixed", tuple(row[seed_table.columns.index(table.primary_key[0])] for row in seed_table.rows))
+    column = table.column(table.primary_key[0]) if len(table.primary_key) == 1 else None
+    if column is None:
+        return None
+    if column.data_type in SERIAL_TYPES or column.data_type in ("INT", "BIGINT"):
+        return ("serial",)
+    if column.data_type == "UUID":
+        return ("uuid", _table_tag(table.name))
+    return None
+
+
+def _follow_plan(catalog, table, path, rows, keys):
+    """((tag, parent rows) per hop, key plan of the last table) for a FOLLOWS path starting at table."""
+    hops = []
+    for name in path:
+        fk = next(fk for fk in table.foreign_keys if fk.columns == (name,))
+        if keys[fk.ref_table][0] == "fixed":
+            raise ValueError(f"{table.name}.{name}: cannot follow into the fixed rows of {fk.ref_table}")
+        hops.append((_table_tag(f"{table.name}.{name}"), rows[fk.ref_table]))
+        table = catalog.tables[fk.ref_table]
+    return tuple(hops), keys[table.name]
+
+
+def build_plans(catalog, scale=1.0, overrides=None, seed=None):
+    seed = load_seed(catalog) if seed is None else seed
+    # Reference rows inserted by schema.sql itself (ranks) are loaded with the schema, not generated.
+    fixed = load_seed(catalog, name="schema.sql")
+    overrides = overrides or {}
+    rows = {
+        name: overrides.get(name, max(1, int(BASE_ROWS.get(name, DEFAULT_ROWS) * scale)))
+        for name in catalog.tables
+        if name not in fixed
+    }
+    rows.update({name: len(table.rows) for name, table in fixed.items()})
+    keys = {name: key_plan(table, fixed) for name, table in catalog.tables.items()}
+
+    plans = []
+    for index, table in enumerate(catalog.tables.values()):
+        if table.name in fixed:
+            continue
+        plan = TablePlan(table.name, index, rows[table.name])
+        rules = _check_rules(table)
+        seed_table = seed.get(table.name)
+        pair = table.relationship_keys()
+        fk_by_column = {fk.columns[0]: fk for fk in table.foreign_keys if len(fk.columns) == 1}
+        unique_columns = {key[0] for key in table.uniques if len(key) == 1}
+        for column in table.columns:
+            seed_values = []
+            if seed_table and column.name in seed_table.columns:
+                position = seed_table.columns.index(column.name)
+                seed_values = [row[position] for row in seed_table.rows]
+            null_fraction = 0.0
+            if column.nullable:
+                null_fraction = seed_values.count(None) / len(seed_values) if seed_values else DEFAULT_NULL_FRACTION
+            seed_values = [value for value in seed_values if value is not None]
+            rule = rules.get(column.name, {})
+            fk = fk_by_column.get(column.name)
+
+            if column.name in table.primary_key and len(table.primary_key) == 1:
+                spec = ColumnPlan(column.name, "key", keys[table.name])
+            elif (table.name, column.name) in FOLLOWS:
+                spec = ColumnPlan(column.name, "follow", _follow_plan(catalog, table, FOLLOWS[(table.name, column.name)], rows, keys))
+            elif fk and fk in pair:
+                side = pair.index(fk)
+                parent = fk.ref_table
+                degree = max(1, math.ceil(plan.rows / rows[pair[0].ref_table]))
+                partners = rows[pair[1].ref_table] - (pair[0].ref_table == pair[1].ref_table)
+                if degree > partners:
+                    # draw_partners could never find that many distinct partners and would not return.
+                    raise ValueError(
+                        f"{table.name}: {plan.rows} rows need {degree} distinct partners per {pair[0].ref_table} row, "
+                        f"but {pair[1].ref_table} has only {partners}"
+                    )
+                spec = ColumnPlan(
+                    column.name,
+                    "pair",
+                    (side, degree, rows[pair[0].ref_table], rows[parent], keys[parent], _table_tag(f"{table.name}.{column.name}"), pair[0].ref_table == parent),
+                )
+            elif fk:
+                spec = ColumnPlan(column.name, "fk", (rows[fk.ref_table], keys[fk.ref_table], _table_tag(f"{table.name}.{column.name}")))
+            elif "enum" in rule:
+                spec = ColumnPlan(column.name, "enum", rule["enum"])
+            elif (table.name, column.name) in ORDERED_AFTER:
+                spec = ColumnPlan(column.name, "after", ORDERED_AFTER[(table.name, column.name)])
+            elif column.data_type == "DATE":
+                spec = ColumnPlan(column.name, "date")
+            elif column.data_type.startswith("TIMESTAMP"):
+                spec = ColumnPlan(column.name, "timestamp")
+            elif column.data_type.startswith("NUMERIC"):
+                low = rule.get("low", DEFAULT_NUMERIC_RANGE[0])
+                spec = ColumnPlan(column.name, "numeric", (low * 100, rule.get("high", max(low, DEFAULT_NUMERIC_RANGE[1])) * 100))
+            elif column.data_type in ("INT", "BIGINT", "SMALLINT"):
+                low = rule.get("low", DEFAULT_INT_RANGE[0])
+                spec = ColumnPlan(column.name, "int", (low, rule.get("high", max(low, DEFAULT_INT_RANGE[1]))))
+            elif column.data_type == "BOOLEAN":
+                spec = ColumnPlan(column.name, "enum", ("t", "f"))
+            elif column.data_type == "UUID":
+                spec = ColumnPlan(column.name, "uuid", (_table_tag(f"{table.name}.{column.name}"),))
+            else:
+                values = tuple(dict.fromkeys(seed_values)) or (column.name.replace("_", " "),)
+                unique = column.name in unique_columns or any(column.name in key for key in table.uniques)
+                spec = ColumnPlan(column.name, "text", (values, unique))
+            spec.null_fraction = null_fraction
+            plan.columns.append(spec)
+        plans.append(plan)
+    return plans
+
+
+# ---- generation ----
+
+def _permute(ordinals, n):
+    # A bijection on [0, n): spreads hot low ordinals across the key space.
+    multiplier = 2654435761 % n or 1
+    while math.gcd(multiplier, n) != 1:
+        multiplier += 1
+    return (ordinals * multiplier + 12345) % n
+
+
+def _uniform(seed, tag, ordinals):
+    """Floats in [0, 1) that depend only on (seed, tag, ordinal), so any chunk can redraw another table's row."""
+    with np.errstate(over="ignore"):
+        x = np.asarray(ordinals).astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15) + np.uint64(((seed << 32) ^ tag) & MASK64)
+        # splitmix64 finalizer
+        x ^= x >> np.uint64(30)
+        x *= np.uint64(0xBF58476D1CE4E5B9)
+        x ^= x >> np.uint64(27)
+        x *= np.uint64(0x94D049BB133111EB)
+        x ^= x >> np.uint64(31)
+    return (x >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+
+
+def draw_parents(parents, seed, tag, ordinals):
+    """Skewed parent ordinals for child ordinals: a few parents collect most children."""
+    drawn = np.minimum((parents * _uniform(seed, tag, ordinals) ** FK_SKEW).astype(np.int64), parents - 1)
+    return _permute(drawn, parents)
+
+
+def draw_partners(left, degree, parents, seed, tag, exclude=None):
+    """(len(left), degree) partner ordinals per left ordinal: skewed random draws, then a pass that bumps repeats
+    (and exclude[i], the left row's own ordinal when both sides are one table) to the next free ordinal."""
+    slots = left[:, None] * degree + np.arange(degree)
+    partners = draw_parents(parents, seed, tag, slots)
+    while True:
+        order = np.argsort(partners, axis=1, kind="stable")
+        ranked = np.take_along_axis(partners, order, axis=1)
+        repeat = np.zeros_like(partners, dtype=bool)
+        np.put_along_axis(repeat, order[:, 1:], ranked[:, 1:] == ranked[:, :-1], axis=1)
+        if exclude is not None:
+            repeat |= partners == exclude[:, None]
+        if not repeat.any():
+            return partners
+        partners[repeat] = (partners[repeat] + 1) % parents
+
+
+def encode_keys(key, ordinals):
+    if key[0] == "serial":
+        return encode_int(ordinals + 1)
+    if key[0] == "uuid":
+        return encode_uuid(key[1], ordinals)
+    return _choices_matrix(key[1])[ordinals % len(key[1])]
+
+
+def generate_chunk(plan, start, stop, seed=SEED):
+    rng = np.random.default_rng([seed, plan.index, start])
+    n = stop - start
+    ordinals = np.arange(start, stop, dtype=np.int64)
+    raw = {}
+    fields = []
+    for column in plan.columns:
+        kind = column.kind
+        if kind == "key":
+            matrix = encode_keys(column.params, ordinals)
+        elif kind == "fk":
+            parents, key, tag = column.params
+            matrix = encode_keys(key, draw_parents(parents, seed, tag, ordinals))
+        elif kind == "follow":
+            hops, key = column.params
+            chosen = ordinals
+            for tag, parents in hops:
+                chosen = draw_parents(parents, seed, tag, chosen)
+            matrix = encode_keys(key, chosen)
+        elif kind == "pair":
+            # Row k links left k // degree to the (k % degree)-th of its partners. Partners are drawn for
+            # whole left ordinals, so a left split across chunks gets the same unique set in each.
+            side, degree, left_rows, parents, key, tag, exclude_self = column.params
+            left = ordinals // degree % left_rows
+            if side == 0:
+                chosen = _permute(left, parents)
+            else:
+                lefts, position = np.unique(left, return_inverse=True)
+                own = _permute(lefts, left_rows) if exclude_self else None
+                chosen = draw_partners(lefts, degree, parents, seed, tag, own)[position, ordinals % degree]
+            matrix = encode_keys(key, chosen)
+        elif kind == "enum":
+            matrix = _choices_matrix(column.params)[rng.integers(0, len(column.params), n)]
+        elif kind == "int":
+            matrix = encode_int(rng.integers(column.params[0], column.params[1] + 1, n))
+        elif kind == "numeric":
+            matrix = encode_numeric(rng.integers(column.params[0], column.params[1] + 1, n))
+        elif kind == "uuid":
+            matrix = encode_uuid(column.params[0], rng.integers(0, 1 << 47, n))
+        elif kind in ("date", "timestamp"):
+            days = rng.integers(0, DAYS - 720, n)
+            raw[column.name] = days
+            matrix = encode_date(days) if kind == "date" else encode_timestamp(days, rng.integers(0, 86400, n))
+        elif kind == "after":
+            earlier, max_days = column.params
+            days = raw[earlier] + rng.integers(1, max_days + 1, n)
+            is_date = next(c for c in plan.columns if c.name == earlier).kind == "date"
+            matrix = encode_date(days) if is_date else encode_timestamp(days, rng.integers(0, 86400, n))
+        else:
+            values, unique = column.params
+            matrix = _choices_matrix(values)[rng.integers(0, len(values), n)]
+            if unique:
+                # ordinal-prefixed so every row is distinct: "1234.aminul@gmail.com"
+                dot = np.full((n, 1), ord("."), dtype=np.uint8)
+                matrix = np.concatenate([encode_int(ordinals + 1), dot, matrix], axis=1)
+        if column.null_fraction:
+            matrix = with_nulls(np.array(matrix), rng.random(n) < column.null_fraction)
+        fields.append(matrix)
+    return to_copy_text(fields)
+
+
+def write_chunk(plan, part, start, stop, output_dir, seed=SEED):
+    path = os.path.join(output_dir, plan.name, f"part-{part:05d}.copy")
+    with open(path, "wb") as handle:
+        handle.write(generate_chunk(plan, start, stop, seed))
+    return plan.name, stop - start
+
+
+def generate(plans, output_dir=OUTPUT_DIR, workers=None, chunk_rows=CHUNK_ROWS, seed=SEED):
+    """Write every table as COPY text files, one chunk per task across worker processes."""
+    tasks = []
+    manifest = {"seed": seed, "tables": []}
+    for plan in plans:
+        directory = os.path.join(output_dir, plan.name)
+        os.makedirs(directory, exist_ok=True)
+        for stale in os.listdir(directory):
+            os.remove(os.path.join(directory, stale))
+        parts = range(math.ceil(plan.rows / chunk_rows))
+        for part in parts:
+            tasks.append((plan, part, part * chunk_rows, min(plan.rows, (part + 1) * chunk_rows)))
+        manifest["tables"].append(
+            {
+                "name": plan.name,
+                "columns": [column.name for column in plan.columns],
+                "rows": plan.rows,
+                "files": [f"{plan.name}/part-{part:05d}.copy" for part in parts],
+            }
+        )
+    # Largest chunks first keeps the pool busy to the end.
+    tasks.sort(key=lambda task: task[3] - task[2], reverse=True)
+    counts = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(write_chunk, *task, output_dir, seed) for task in tasks]
+        for future in futures:
+            name, rows = future.result()
+            counts[name] = counts.get(name, 0) + rows
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=2)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate referentially consistent COPY files from the schema.")
+    parser.add_argument("--scale", type=float, default=0.01, help="fraction of the full-size profile (1.0 = 10M arrests, 50M locations)")
+    parser.add_argument("--rows", action="append", default=[], metavar="TABLE=N", help="override one table's row count")
+    parser.add_argument("--out", default=OUTPUT_DIR)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    args = parser.parse_args(argv)
+
+    overrides = {name: int(count) for name, count in (item.split("=", 1) for item in args.rows)}
+    catalog = load_catalog(SCHEMA_DIR)
+    plans = build_plans(catalog, args.scale, overrides)
+    started = time.perf_counter()
+    counts = generate(plans, args.out, args.workers, args.chunk_rows, args.seed)
+    elapsed = time.perf_counter() - started
+    total = sum(counts.values())
+    size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(args.out) for name in names)
+    print(f"{total:,} rows in {len(counts)} tables, {size / 1e9:.2f} GB, {elapsed:.1f}s ({total / elapsed:,.0f} rows/s) -> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+# The docs scripts import each other as top-level modules, the way they run from docs/.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _server_binaries():
+    initdb = shutil.which("initdb")
+    if initdb is None and shutil.which("pg_config"):
+        bindir = subprocess.run(["pg_config", "--bindir"], capture_output=True, text=True).stdout.strip()
+        initdb = os.path.join(bindir, "initdb")
+    if initdb is None or not os.path.exists(initdb):
+        return None
+    return initdb, os.path.join(os.path.dirname(initdb), "pg_ctl")
+
+
+@pytest.fixture(scope="session")
+def postgres_dsn(tmp_path_factory):
+    """A superuser DSN on a throwaway server: ERD_TEST_DSN (a CI service container) or a cluster made by initdb.
+
+    Skips when psycopg2 is missing or there is neither; tests create and drop their own databases on it.
+    """
+    pytest.importorskip("psycopg2")
+    if "ERD_TEST_DSN" in os.environ:
+        yield os.environ["ERD_TEST_DSN"]
+        return
+    binaries = _server_binaries()
+    if binaries is None:
+        pytest.skip("no PostgreSQL server binaries (initdb) and ERD_TEST_DSN is not set")
+    if hasattr(os, "geteuid") and os.geteuid() == 0:
+        pytest.skip("initdb refuses to run as root; set ERD_TEST_DSN")
+    initdb, pg_ctl = binaries
+    data = tmp_path_factory.mktemp("pgdata")
+    subprocess.run([initdb, "-D", data, "-U", "postgres", "-A", "trust", "-E", "UTF8", "--no-sync"], check=True, capture_output=True)
+    # Unix socket in the data directory only, so the cluster never collides with a server already on the machine.
+    options = f"-F -k {data} -c listen_addresses='' -p 5432"
+    subprocess.run([pg_ctl, "-D", data, "-l", data / "server.log", "-o", options, "-w", "start"], check=True, capture_output=True)
+    try:
+        yield f"host={data} port=5432 user=postgres dbname=postgres"
+    finally:
+        subprocess.run([pg_ctl, "-D", data, "-m", "immediate", "-w", "stop"], capture_output=True)
+
+
+@pytest.fixture(scope="session")
+def seeded_dsn(postgres_dsn):
+    """A database with the full schema and the rows of seed_data.sql, loaded by bulk_load.py."""
+    from psycopg2.extensions import make_dsn
+
+    from bulk_load import load, recreate_database, seed_units
+    from schema_catalog import load_catalog
+
+    dsn = make_dsn(postgres_dsn, dbname="erd_test_seeded")
+    recreate_database(dsn)
+    load(dsn, seed_units(load_catalog()), workers=2)
+    return dsn
+
+
+@pytest.fixture(scope="session")
+def parse_statement():
+    """Parse one emitted SQL statement with PostgreSQL's own grammar (pglast), PL/pgSQL bodies included."""
+    pglast = pytest.importorskip("pglast")
+
+    def parse(statement):
+        tree = pglast.parse_sql(statement)
+        if statement.lstrip().upper().startswith("DO $$"):
+            pglast.parse_plpgsql(f"CREATE FUNCTION do_block() RETURNS void AS {statement.lstrip()[3:]} LANGUAGE plpgsql")
+        elif "LANGUAGE plpgsql" in statement:
+            pglast.parse_plpgsql(statement)
+        return tree
+
+    return parse
@@ -0,0 +1,67 @@
+from catalog_introspect import ConnectionPool, introspect
+from schema_catalog import load_catalog, load_seed
+
+
+def _keys(table):
+    return table.primary_key, sorted((fk.columns, fk.ref_table, fk.ref_columns) for fk in table.foreign_keys)
+
+
+def test_introspect_reads_back_the_ddl(seeded_dsn):
+    expected = load_catalog()
+    catalog, stats = introspect(seeded_dsn, exact_counts=True)
+    assert sorted(catalog.tables) == sorted(expected.tables)
+    for name, table in expected.tables.items():
+        deployed = catalog.tables[name]
+        assert [column.name for column in deployed.columns] == [column.name for column in table.columns], name
+        assert _keys(deployed) == _keys(table), name
+    assert {index.name for index in expected.indexes} <= {index.name for index in catalog.indexes}
+    for name, seed in load_seed(expected).items():
+        assert stats[name].exact and stats[name].rows == len(seed.rows), name
+
+
+def test_copy_out_hands_over_whole_lines(seeded_dsn):
+    pool = ConnectionPool(seeded_dsn)
+    try:
+        chunks = []
+        pool.copy_out("COPY thanas TO STDOUT", chunks.append, chunk_bytes=64)
+        (count,), = pool.fetch("SELECT count(*) FROM thanas")
+    finally:
+        pool.close()
+    assert count and len(chunks) > 1
+    assert all(chunk.endswith(b"\n") for chunk in chunks)
+    assert b"".join(chunks).count(b"\n") == count
+
+
+def test_report_escapes_what_introspection_reads_back(postgres_dsn, tmp_path):
+    """Comments and quoted identifiers are arbitrary text once read from a deployed database."""
+    from functools import partial
+
+    from psycopg2.extensions import make_dsn
+
+    from bench_queries import _connect
+    from bulk_load import recreate_database
+    from erd_report import build, deployed_section
+    from report_cache import SectionCache
+    from report_render import RENDERERS
+
+    dsn = make_dsn(postgres_dsn, dbname="erd_test_hostile")
+    recreate_database(dsn)
+    connection = _connect(dsn)
+    try:
+        cursor = connection.cursor()
+        cursor.execute('CREATE TABLE "transfers<b>" (transfer_id integer PRIMARY KEY, "count<i>" integer NOT NULL)')
+        cursor.execute('CREATE INDEX "by<count" ON "transfers<b>" ("count<i>")')
+        cursor.execute("""COMMENT ON TABLE "transfers<b>" IS 'moves where count<capacity'""")
+    finally:
+        connection.close()
+
+    catalog, stats = introspect(dsn, exact_counts=True)
+    chapters = [("deployed", partial(deployed_section, stats))]
+    results = build(tuple(RENDERERS), str(tmp_path / "report.pdf"), SectionCache(str(tmp_path / "cache")), catalog, chapters, parallel=False, cache_dir=None)
+
+    paths = {name: path for name, path, *_ in results}
+    with open(paths["html"], encoding="utf-8") as handle:
+        page = handle.read()
+    assert "count&lt;capacity" in page
+    assert "transfers&lt;b&gt;" in page and "<b>" not in page.replace("<b>Detailed", "")
+    assert "by&lt;count" in page and "count&lt;i&gt;" in page
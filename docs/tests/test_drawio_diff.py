@@ -0,0 +1,27 @@
+import base64
+import zlib
+from urllib.parse import quote
+
+import drawio_diff
+from drawio_diff import parse_diagram
+
+NAMES = ["থানা", "কারাগার", "অপরাধী", "গ্রেফতার", "মামলা"]
+
+
+def _compress(xml):
+    # What draw.io does to a page: encodeURIComponent, raw deflate, base64.
+    deflater = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return base64.b64encode(deflater.compress(quote(xml, safe="").encode()) + deflater.flush()).decode()
+
+
+def test_compressed_page_keeps_characters_split_across_chunks(tmp_path, monkeypatch):
+    cells = "".join(
+        f'<mxCell id="t{i}" value="{name}" style="shape=table;" vertex="1" parent="1"/>' for i, name in enumerate(NAMES * 20)
+    )
+    page = f'<mxGraphModel><root><mxCell id="0"/><mxCell id="1" parent="0"/>{cells}</root></mxGraphModel>'
+    path = tmp_path / "bengali.drawio"
+    path.write_text(f'<mxfile><diagram id="p" name="Page-1">{_compress(page)}</diagram></mxfile>', encoding="utf-8")
+    monkeypatch.setattr(drawio_diff, "CHUNK_SIZE", 64)
+
+    assert "".join(drawio_diff._inflate(_compress(page))) == page
+    assert [entity.name for entity in parse_diagram(str(path)).entities.values()] == NAMES * 20
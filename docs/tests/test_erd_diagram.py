@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+from erd_layout import LAYOUT_CACHE, LAYOUT_FILE
+from erd_report import build
+from report_cache import SectionCache
+from report_render import _mermaid_link
+from schema_catalog import load_catalog
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return load_catalog()
+
+
+@pytest.mark.parametrize(
+    "left_side, right_side, expected",
+    [
+        ((0, None), (1, 1), "a ||--o{ b"),  # NOT NULL foreign key
+        ((0, None), (0, 1), "a |o--o{ b"),  # nullable foreign key
+        ((0, 1), (1, 1), "a ||--o| b"),  # unique NOT NULL foreign key: 1:1
+        ((0, None), (0, None), "a }o--o{ b"),  # relation table
+        ((1, None), (1, None), "a }|--|{ b"),
+    ],
+)
+def test_mermaid_ends_follow_the_participation(left_side, right_side, expected):
+    assert _mermaid_link("a", left_side, "b", right_side, 'says "hi"') == f"{expected} : \"says 'hi'\""
+
+
+def _markdown(catalog, tmp_path, cache_dir):
+    output = str(tmp_path / "report.pdf")
+    results = build(("md",), output, SectionCache(enabled=False), catalog, parallel=False, cache_dir=cache_dir)
+    with open(results[0][1], encoding="utf-8") as handle:
+        return handle.read()
+
+
+def test_markdown_diagram_uses_the_inferred_cardinality(catalog, tmp_path):
+    page = _markdown(catalog, tmp_path, str(tmp_path / "cache"))
+    assert "    admin ||--o{ thanas" in page
+    assert "    officers |o--o{ thanas" in page  # thanas.head_officer_id is nullable
+    assert "    criminals }o--o{ organizations" in page
+    assert ": references" not in page
+
+
+def test_layout_cache_follows_the_cache_dir(catalog, tmp_path):
+    before = os.stat(LAYOUT_CACHE).st_mtime_ns if os.path.exists(LAYOUT_CACHE) else None
+    _markdown(catalog, tmp_path, str(tmp_path / "cache"))
+    assert os.path.exists(tmp_path / "cache" / LAYOUT_FILE)
+    _markdown(catalog, tmp_path, None)
+    assert (os.stat(LAYOUT_CACHE).st_mtime_ns if os.path.exists(LAYOUT_CACHE) else None) == before
@@ -0,0 +1,20 @@
+import numpy as np
+
+from occupancy import cell_curves, daily_counts, projected_ends, synthetic_timeline
+
+
+def test_cell_chunks_match_the_whole_matrix_and_a_direct_count():
+    timeline = synthetic_timeline(20_000, blocks=40, cells=1_000, days=400)
+    as_of = int(timeline.start.max())
+    first, days = as_of - 300, 361
+    ends = projected_ends(timeline, as_of)
+    whole = daily_counts(timeline.cell, timeline.start, ends, len(timeline.cell_capacity), first, days)
+    seen = 0
+    # 1,001 cells in chunks of 128: the last chunk is short and every chunk reuses the same buffer.
+    for ids, counts in cell_curves(timeline, ends, first, days, chunk=128):
+        np.testing.assert_array_equal(counts, whole[ids])
+        seen += len(ids)
+    assert seen == len(timeline.cell_capacity)
+    day = first + 200
+    direct = np.bincount(timeline.cell[(timeline.start <= day) & (ends > day)], minlength=len(timeline.cell_capacity))
+    np.testing.assert_array_equal(whole[:, 200], direct)
@@ -0,0 +1,48 @@
+import pytest
+
+from partitioning import PARTITION_KEYS, create_sql, cutover_sql, drop_old_sql, live_stats, migrate, mirror_sql, plan_partitions, synth_stats, validate_sql, verify
+from schema_catalog import load_catalog
+
+FOREIGN_KEYS_SQL = """
+SELECT conrelid::regclass::text, conname, confrelid::regclass::text, confupdtype, confdeltype, convalidated
+FROM pg_constraint WHERE contype = 'f' AND conrelid <> confrelid AND conparentid = 0 ORDER BY 1, 2
+"""
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return load_catalog()
+
+
+@pytest.mark.parametrize("table", sorted(PARTITION_KEYS))
+def test_migration_sql_parses(catalog, parse_statement, table):
+    plan = plan_partitions(catalog, table, *synth_stats(catalog, 0.01)[table])
+    for statement in create_sql(plan) + mirror_sql(plan) + cutover_sql(plan) + validate_sql(plan) + drop_old_sql(plan):
+        parse_statement(statement)
+
+
+def test_migration_moves_every_foreign_key_off_the_old_tables(catalog, postgres_dsn):
+    from psycopg2.extensions import make_dsn
+
+    from bench_queries import _connect
+    from bulk_load import load, recreate_database, seed_units
+
+    dsn = make_dsn(postgres_dsn, dbname="erd_test_partitioning")
+    recreate_database(dsn)
+    load(dsn, seed_units(catalog), workers=2)
+    connection = _connect(dsn)
+    cursor = connection.cursor()
+    cursor.execute(FOREIGN_KEYS_SQL)
+    before = {(child, name): actions for child, name, _, *actions in cursor.fetchall()}
+    plans = [plan_partitions(catalog, table, *live_stats(cursor, catalog, table)) for table in PARTITION_KEYS]
+    for plan in plans:
+        migrate(connection, plan, batch_rows=5, pause=0)
+        assert verify(connection.cursor(), plan) == (0, 0)
+    cursor = connection.cursor()
+    cursor.execute(FOREIGN_KEYS_SQL)
+    after = {(child, name): (target, actions) for child, name, target, *actions in cursor.fetchall()}
+    connection.close()
+    old = {plan.old for plan in plans}
+    assert not [key for key, (target, _) in after.items() if target in old and key[0] not in old]
+    # Same constraints, same ON UPDATE / ON DELETE actions, all validated after the swap.
+    assert {key: actions for key, (_, actions) in after.items() if key[0] not in old} == before
@@ -0,0 +1,138 @@
+from functools import partial
+
+import pytest
+
+from data_profile import distribution, new_profile
+from erd_report import build, data_profile_section
+from report_cache import SectionCache
+from report_render import RENDERERS, escape
+from schema_catalog import load_catalog
+
+HOSTILE = "<b>&\"'"
+
+
+@pytest.fixture(scope="module")
+def catalog():
+    return load_catalog()
+
+
+def _profile(catalog, name, row, copies=3):
+    columns = [column.name for column in catalog.tables[name].columns]
+    profile = new_profile(catalog, name, columns)
+    line = "\t".join(row.get(column, "\\N") for column in columns).encode() + b"\n"
+    profile.feed(line * copies)
+    return profile
+
+
+def test_every_format_builds_with_markup_in_the_data(catalog, tmp_path):
+    profiles = {
+        "gd_reports": _profile(catalog, "gd_reports", {"gd_id": "1", "description": HOSTILE, "status": "submitted"}),
+        "users": _profile(catalog, "users", {"full_name": HOSTILE, "password_hash": "$2b$10$secret"}),
+    }
+    chapters = [("profile", partial(data_profile_section, profiles, HOSTILE))]
+    output = str(tmp_path / "report.pdf")
+    results = build(tuple(RENDERERS), output, SectionCache(str(tmp_path / "cache")), catalog, chapters, parallel=False, cache_dir=str(tmp_path / "cache"))
+
+    paths = {name: path for name, path, *_ in results}
+    with open(paths["html"], encoding="utf-8") as handle:
+        page = handle.read()
+    assert HOSTILE not in page
+    assert "&lt;b&gt;&amp;\"'" in page
+    with open(paths["md"], encoding="utf-8") as handle:
+        markdown = handle.read()
+    assert "<b>&" not in markdown
+    with open(paths["pdf"], "rb") as handle:
+        assert handle.read(5) == b"%PDF-"
+    for document in (page, markdown):
+        assert "$2b$10$secret" not in document
+
+
+def test_credentials_keep_no_values(catalog):
+    column = _profile(catalog, "users", {"password_hash": "$2b$10$secret"}).columns[-1]
+    assert column.name == "password_hash"
+    assert column.sketch is None and not column.candidates
+    assert distribution(column) == "values withheld"
+
+
+def test_inline_markup_survives_and_stray_tags_do_not():
+    render = RENDERERS["html"].render_section
+    assert render([("paragraph", "<b>Scenario:</b> Jail A -> Jail B")]) == "<p><b>Scenario:</b> Jail A -&gt; Jail B</p>"
+    assert render([("paragraph", "<script>x</script> " + escape("<i>"))]) == "<p>&lt;script&gt;x&lt;/script&gt; &lt;i&gt;</p>"
+
+
+def test_pdf_backend_escapes_stray_tags_too():
+    # A chapter that forgets escape() must still build: reportlab would reject the unclosed tag.
+    story = [
+        ("heading", 1, "criminals by_thana<b"),
+        ("paragraph", "moves where count<capacity <script>"),
+        ("bullets", ("<b>kept</b> a<b",)),
+        ("table", (("name", "note"), ("x<y", "<font>"))),
+    ]
+    flowables = RENDERERS["pdf"].render_section(story)
+    assert [flowable.getPlainText() for flowable in flowables[:2]] == ["criminals by_thana<b", "moves where count<capacity <script>"]
+
+
+def _render_everywhere(story):
+    # The PDF backend parses every Paragraph as it builds the flowables, so broken markup raises here.
+    RENDERERS["pdf"].render_section(story)
+    return RENDERERS["html"].render_section(story), RENDERERS["md"].render_section(story)
+
+
+def test_network_chapter_escapes_names():
+    from criminal_graph import NetworkSummary
+    from erd_report import network_section
+
+    summary = NetworkSummary(3, 0, 2, 0, 1, 3, 0, central=[(HOSTILE, HOSTILE, 2, 1.5)])
+    page, markdown = _render_everywhere(network_section(summary, 12))
+    assert HOSTILE not in page and "<b>&" not in markdown
+
+
+def test_occupancy_chapter_escapes_places_and_chart_text():
+    from erd_report import occupancy_section
+    from occupancy import OccupancySummary
+
+    summary = OccupancySummary("2025-01-01", 4, 3, 1, cells=2, cells_over=1, cells_over_forecast=1)
+    summary.jails.append((HOSTILE, 10, 3, 4, "2024-12-30", 3, 2, 1))
+    summary.blocks.append((HOSTILE, HOSTILE, 5, 3, 2))
+    summary.crowded_cells.append((HOSTILE, HOSTILE, HOSTILE, 1, 2))
+    summary.charts.append((HOSTILE, ("2024-12", "2025-01"), (("held", (4, 3)), ("capacity", (10, 10))), 1))
+    page, markdown = _render_everywhere(occupancy_section(summary, 13))
+    assert HOSTILE not in page and "<b>&" not in markdown
+    assert 'title "‹b›&\'\'"' in markdown
+
+
+def test_performance_chapter_escapes_labels_and_plan_names(catalog, tmp_path):
+    import json
+
+    from erd_report import performance_section
+    from probe_analysis import UNLABELLED, analyze, read_probe_file
+
+    node = {"Node Type": "Seq Scan", "Relation Name": "criminals", "Actual Rows": 50_000, "Actual Loops": 1, "Shared Hit Blocks": 5_000}
+    path = tmp_path / "probes.jsonl"
+    path.write_text(
+        "\n".join(
+            json.dumps({"label": label, "duration_ms": 1.5, "plan": [{"Plan": node, "Execution Time": 1.2}]})
+            for label in ("criminals by_thana<b", "<i>probe</i>", None)
+        ),
+        encoding="utf-8",
+    )
+    report = analyze(read_probe_file(path), catalog)
+    assert UNLABELLED in [item.label for item in report.latencies]
+    page, markdown = _render_everywhere(performance_section(report, 10))
+    assert "&lt;i&gt;probe&lt;/i&gt;" in page and "by_thana&lt;b" in page
+
+
+def test_trigger_profile_chapter_escapes_names_and_waits():
+    from erd_report import trigger_profile_section
+
+    def run(throughput):
+        waits = {"running": 6, "Lock:tuple <i>cells</i>": 3, "LWLock:<i>WALWrite</i>": 1}
+        return {"p50_ms": 1.0, "p95_ms": 2.0, "throughput": throughput, "samples": 10, "lock_share": 0.3, "waits": waits, "functions": {}}
+
+    trigger = {"name": "<i>trg</i>", "function": "<i>fn</i>"}
+    meta = {"threads": 2, "statements": 10, "scale": 0.01, "server_version": "16.2 <i>dev</i>", "cpus": 1, "rounds": 1}
+    workloads = {"<i>admit</i>": {"triggers": [trigger], "runs": {"all on": run(90.0), "without <i>trg</i>": run(100.0)}}}
+    page, markdown = _render_everywhere(trigger_profile_section({"meta": meta, "workloads": workloads}, 11))
+    for text in ("&lt;i&gt;trg&lt;/i&gt;", "&lt;i&gt;admit&lt;/i&gt;", "without &lt;i&gt;trg&lt;/i&gt;", "&lt;i&gt;cells&lt;/i&gt;", "16.2 &lt;i&gt;dev"):
+        assert text in page, text
+    assert "<i>" not in markdown
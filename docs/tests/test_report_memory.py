@@ -0,0 +1,15 @@
+from bench_report_memory import measure
+from erd_layout import MAX_TABLES
+
+# Past MAX_TABLES the ERD is skipped, so what is left should grow with the pages, not with the
+# largest table: 2,000 tables measured 69.8 MB against 48.7 MB for 20 (+21 MB), and 87 MB before
+# long tables stopped building every row's Paragraphs at once.
+LARGE = 2000
+GROWTH_BUDGET_MB = 30
+
+
+def test_peak_rss_grows_within_budget():
+    assert LARGE > MAX_TABLES
+    small = measure(20)
+    large = measure(LARGE)
+    assert large["peak_rss_mb"] - small["peak_rss_mb"] < GROWTH_BUDGET_MB, (small, large)
@@ -0,0 +1,59 @@
+import pytest
+
+from rollups import BULK_INSERT_SQL, BULK_UPDATE_SQL, MODES, ROLLUP_VIEWS, create_sql, drop_sql, install, plan_rollup, uninstall, verify
+from schema_catalog import load_catalog
+
+# Writes that move rows into, out of and between the groups of every rolled-up view, including new parents.
+WRITES = (
+    "UPDATE case_files SET thana_id = (SELECT min(thana_id) FROM thanas) WHERE case_id % 2 = 0",
+    "DELETE FROM case_files WHERE case_id % 5 = 0",
+    "INSERT INTO thanas (name, district, address, created_by_admin_id) SELECT 'Rollup', 'Test', 'Test', admin_id FROM admin LIMIT 1",
+    "INSERT INTO jails (name, district, address, capacity) VALUES ('Rollup', 'Test', 'Test', 10)",
+    "UPDATE gd_reports g SET status = 'approved', approved_by_officer_id = o.officer_id FROM officers o "
+    "WHERE g.status = 'submitted' AND o.officer_id = (SELECT min(officer_id::text)::uuid FROM officers WHERE thana_id = g.thana_id)",
+    "DELETE FROM gd_reports WHERE gd_id IN (SELECT gd_id FROM gd_reports LIMIT 1)",
+    "UPDATE incarcerations SET released_at = now() WHERE incarceration_id IN (SELECT min(incarceration_id) FROM incarcerations WHERE released_at IS NULL)",
+    "UPDATE incarcerations SET released_at = NULL WHERE released_at IS NOT NULL",
+    "UPDATE incarcerations SET jail_id = (SELECT max(jail_id) FROM jails)",
+    "TRUNCATE gd_reports",
+)
+
+
+@pytest.fixture(scope="module")
+def rollups():
+    catalog = load_catalog()
+    return [plan_rollup(catalog, name) for name in ROLLUP_VIEWS]
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_rollup_sql_parses(rollups, parse_statement, mode):
+    for rollup in rollups:
+        for statement in create_sql(rollup, mode) + drop_sql(rollup):
+            parse_statement(statement)
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_rollups_track_their_views_through_writes(rollups, seeded_dsn, mode):
+    from bench_queries import _connect
+
+    connection = _connect(seeded_dsn)
+    connection.autocommit = False
+    cursor = connection.cursor()
+    try:
+        install(cursor, rollups, mode)
+        assert [verify(cursor, rollup) for rollup in rollups] == [(0, 0)] * len(rollups)
+        cursor.execute("SELECT (SELECT criminal_id FROM criminals LIMIT 1), (SELECT array_agg(thana_id) FROM thanas)")
+        criminal, thanas = cursor.fetchone()
+        cursor.execute(BULK_INSERT_SQL, {"tag": "t", "criminal": criminal, "thanas": thanas, "rows": 300})
+        cursor.execute(BULK_UPDATE_SQL, {"rows": 300})
+        for statement in WRITES:
+            cursor.execute(statement)
+            assert [verify(cursor, rollup) for rollup in rollups] == [(0, 0)] * len(rollups), statement
+        if mode == "log":
+            for rollup in rollups:
+                cursor.execute(f"SELECT fn_fold_{rollup.stem}()")
+                assert verify(cursor, rollup) == (0, 0)
+        uninstall(cursor, rollups)
+    finally:
+        connection.rollback()
+        connection.close()
@@ -0,0 +1,56 @@
+import json
+import os
+from collections import Counter
+
+import pytest
+
+from schema_catalog import load_catalog
+from synth_data import _choices_matrix, build_plans, generate, to_copy_text
+
+
+@pytest.fixture(scope="module")
+def dump(tmp_path_factory):
+    """A small dump in chunks much smaller than a table, so pairs and followed keys cross chunk boundaries."""
+    directory = tmp_path_factory.mktemp("synth")
+    generate(build_plans(load_catalog(), 0.001), directory, workers=1, chunk_rows=700)
+    with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as handle:
+        tables = {table["name"]: table for table in json.load(handle)["tables"]}
+
+    def rows(name):
+        for file_name in tables[name]["files"]:
+            with open(os.path.join(directory, file_name), encoding="utf-8") as handle:
+                for line in handle:
+                    yield dict(zip(tables[name]["columns"], line.rstrip("\n").split("\t")))
+
+    return rows
+
+
+def test_seed_text_is_escaped_for_copy():
+    values = ["a\tb", "c\\d", "e\nf", "\\N"]
+    assert to_copy_text([_choices_matrix(values)]) == b"a\\tb\nc\\\\d\ne\\nf\n\\\\N\n"
+
+
+def test_incarcerations_are_in_the_jail_of_their_cell(dump):
+    block_jail = {row["block_id"]: row["jail_id"] for row in dump("cell_blocks")}
+    cell_jail = {row["cell_id"]: block_jail[row["block_id"]] for row in dump("cells")}
+    stays = [row for row in dump("incarcerations") if row["cell_id"] != "\\N"]
+    assert stays
+    assert all(cell_jail[row["cell_id"]] == row["jail_id"] for row in stays)
+
+
+def test_relations_are_unique_random_partners(dump):
+    pairs = [(row["criminal_id_1"], row["criminal_id_2"]) for row in dump("criminal_relations")]
+    assert len(set(pairs)) == len(pairs)
+    assert not any(left == right for left, right in pairs)
+    # Partners are drawn skewed, not from a fixed ring: some criminals are named far more often than others.
+    named = Counter(right for _, right in pairs)
+    assert max(named.values()) > 4 * len(pairs) / len(named)
+
+
+@pytest.mark.parametrize(
+    "overrides, table",
+    [({"criminals": 3}, "criminal_organizations"), ({"criminals": 3, "criminal_organizations": 3}, "criminal_relations")],
+)
+def test_more_pairs_than_partners_is_refused(overrides, table):
+    with pytest.raises(ValueError, match=f"^{table}: "):
+        build_plans(load_catalog(), 0.001, overrides)
@@ -0,0 +1,26 @@
+import pytest
+
+from schema_catalog import load_catalog
+from trigger_profile import WORKLOADS, fired_triggers, profile, written_tables
+
+
+@pytest.mark.parametrize("workload", WORKLOADS, ids=lambda workload: workload.name)
+def test_every_written_table_is_put_back(workload):
+    catalog = load_catalog()
+    restored = {table for table, _, _ in workload.restores}
+    if workload.reset_sql:
+        restored.add(workload.table)
+    assert set(written_tables(catalog, workload, fired_triggers(catalog, workload))) <= restored
+
+
+def test_profile_runs_and_restores_every_workload(postgres_dsn):
+    # _reset raises if any table a run wrote to differs from its state before the run.
+    result = profile(postgres_dsn, scale=0.001, threads=2, statements=20, rounds=1, workers=1)
+    assert set(result["workloads"]) == {workload.name for workload in WORKLOADS}
+    for workload in result["workloads"].values():
+        assert all(run["statements"] == 40 for run in workload["runs"].values())
+
+
+def test_profile_refuses_a_pool_smaller_than_the_run(postgres_dsn):
+    with pytest.raises(SystemExit, match="need"):
+        profile(postgres_dsn, scale=0.001, threads=2, statements=100_000, rounds=1, workloads=["release"], workers=1)
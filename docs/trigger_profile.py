@@ -0,0 +1,472 @@
+"""Measure what the row triggers in triggers.sql cost concurrent writers.
+
+Each workload sends one kind of single-row write from several connections at once, against a scratch database
+bulk-loaded from synth_data.py. It runs with every trigger it fires enabled, then with each one disabled in turn.
+Client-side latency, throughput, sampled waits from pg_stat_activity/pg_locks and pg_stat_user_functions time are
+kept per configuration. After each run the inserted rows are deleted and every column the statement or its triggers
+changed is restored from a snapshot, and the touched tables are checked against their state before the run, so every
+configuration sees the same data.
+"""
+import argparse
+import datetime
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from schema_catalog import load_catalog
+
+SCALE = 0.01
+THREADS = 8
+# Statements each client sends per run; update workloads need this many distinct rows per client.
+STATEMENTS = 500
+ROUNDS = 3
+SAMPLE_SECONDS = 0.005
+APPLICATION_NAME = "trigger-profile"
+# How many of a run's most frequent waits the chapter lists.
+TOP_WAITS = 3
+
+# One backend waits on at most one ungranted lock, so this is one row per active client.
+WAIT_SAMPLE_SQL = """
+SELECT a.wait_event_type, a.wait_event, l.locktype, l.relation::regclass::text
+FROM pg_stat_activity a
+LEFT JOIN pg_locks l ON l.pid = a.pid AND NOT l.granted
+WHERE a.application_name = %s AND a.state = 'active'
+"""
+FUNCTION_STATS_SQL = "SELECT funcname, calls, self_time FROM pg_stat_user_functions"
+# Tables a trigger function writes to, found in its body.
+WRITES = re.compile(r"\b(?:UPDATE|INSERT\s+INTO|DELETE\s+FROM)\s+(\w+)", re.I)
+
+
+@dataclass
+class Workload:
+    """One single-row statement repeated by every client, with the rows it runs on and how to undo a run.
+
+    Every client gets its own rows, threads * statements of them, so no row is written twice in a run.
+    """
+
+    name: str
+    table: str
+    event: str
+    # the columns an UPDATE sets, matched against UPDATE OF column lists
+    columns: tuple
+    key: str
+    sql: str
+    # one parameter dict per row, in a fixed order so every configuration writes the same rows
+    pool_sql: str
+    # deletes what an INSERT added, run with session_replication_role = replica; %(watermark)s is the largest key before the run
+    reset_sql: str | None = None
+    # (table, key, columns) the statement or its triggers change, snapshotted before a run and put back after it
+    restores: tuple = ()
+
+
+WORKLOADS = [
+    Workload(
+        "arrest",
+        "arrest_records",
+        "INSERT",
+        (),
+        "arrest_id",
+        "INSERT INTO arrest_records (criminal_id, thana_id, arrest_date, bail_due_date, custody_status) "
+        "VALUES (%(criminal_id)s, %(thana_id)s, current_date, current_date + 30, 'in_custody')",
+        "SELECT criminal_id, coalesce(registered_thana_id, (SELECT min(thana_id) FROM thanas)) AS thana_id "
+        "FROM criminals ORDER BY md5(criminal_id::text)",
+        "DELETE FROM arrest_records WHERE arrest_id > %(watermark)s",
+        restores=(("criminals", "criminal_id", ("status",)),),
+    ),
+    Workload(
+        "custody change",
+        "arrest_records",
+        "UPDATE",
+        ("custody_status",),
+        "arrest_id",
+        "UPDATE arrest_records SET custody_status = CASE custody_status WHEN 'in_custody' THEN 'on_bail' "
+        "WHEN 'on_bail' THEN 'in_custody' ELSE custody_status END WHERE arrest_id = %(arrest_id)s",
+        "SELECT arrest_id FROM arrest_records ORDER BY md5(arrest_id::text)",
+        restores=(("arrest_records", "arrest_id", ("custody_status",)), ("criminals", "criminal_id", ("status",))),
+    ),
+    Workload(
+        "admit, any cell",
+        "incarcerations",
+        "INSERT",
+        (),
+        "incarceration_id",
+        "INSERT INTO incarcerations (arrest_id, jail_id, cell_id) VALUES (%(arrest_id)s, %(jail_id)s, %(cell_id)s)",
+        """
+        SELECT a.arrest_id, b.jail_id, c.cell_id
+        FROM (SELECT arrest_id, row_number() OVER (ORDER BY md5(arrest_id::text)) AS n FROM arrest_records) a
+        JOIN (SELECT cell_id, block_id, row_number() OVER (ORDER BY cell_id) - 1 AS n, count(*) OVER () AS cells FROM cells) c
+            ON c.n = a.n % c.cells
+        JOIN cell_blocks b USING (block_id)
+        ORDER BY a.n
+        """,
+        "DELETE FROM incarcerations WHERE incarceration_id > %(watermark)s",
+        restores=(("cells", "cell_id", ("status",)),),
+    ),
+    # Every client admits into the same cell, so each fn_update_cell_status waits for the cells row.
+    Workload(
+        "admit, one cell",
+        "incarcerations",
+        "INSERT",
+        (),
+        "incarceration_id",
+        "INSERT INTO incarcerations (arrest_id, jail_id, cell_id) VALUES (%(arrest_id)s, %(jail_id)s, %(cell_id)s)",
+        """
+        SELECT a.arrest_id, b.jail_id, c.cell_id
+        FROM arrest_records a
+        CROSS JOIN (SELECT cell_id, block_id FROM cells ORDER BY cell_id LIMIT 1) c
+        JOIN cell_blocks b USING (block_id)
+        ORDER BY md5(a.arrest_id::text)
+        """,
+        "DELETE FROM incarcerations WHERE incarceration_id > %(watermark)s",
+        restores=(("cells", "cell_id", ("status",)),),
+    ),
+    Workload(
+        "release",
+        "incarcerations",
+        "UPDATE",
+        ("released_at",),
+        "incarceration_id",
+        "UPDATE incarcerations SET released_at = now() WHERE incarceration_id = %(incarceration_id)s",
+        "SELECT incarceration_id FROM incarcerations WHERE released_at IS NULL AND cell_id IS NOT NULL "
+        "ORDER BY md5(incarceration_id::text)",
+        restores=(("incarcerations", "incarceration_id", ("released_at",)), ("cells", "cell_id", ("status",))),
+    ),
+    Workload(
+        "gd review",
+        "gd_reports",
+        "UPDATE",
+        ("status", "approved_by_officer_id"),
+        "gd_id",
+        "UPDATE gd_reports SET status = 'approved', approved_by_officer_id = %(officer_id)s WHERE gd_id = %(gd_id)s",
+        """
+        SELECT DISTINCT ON (g.gd_id) g.gd_id, o.officer_id
+        FROM gd_reports g
+        JOIN officers o USING (thana_id)
+        WHERE g.status = 'submitted'
+        ORDER BY g.gd_id, o.officer_id
+        """,
+        restores=(("gd_reports", "gd_id", ("status", "approved_by_officer_id")),),
+    ),
+]
+
+
+def fired_triggers(catalog, workload):
+    """The catalog triggers that fire for the workload's statement, honouring UPDATE OF column lists."""
+    fired = []
+    for trigger in catalog.triggers:
+        if trigger.table != workload.table or workload.event not in trigger.events:
+            continue
+        if workload.event == "UPDATE" and trigger.update_columns and not set(trigger.update_columns) & set(workload.columns):
+            continue
+        fired.append(trigger)
+    return fired
+
+
+def written_tables(catalog, workload, triggers):
+    """The workload's table plus every table the fired triggers' functions write to."""
+    tables = [workload.table]
+    for trigger in triggers:
+        function = catalog.functions.get(trigger.function)
+        tables += WRITES.findall(re.sub(r"--[^\n]*", "", function.body)) if function else []
+    return list(dict.fromkeys(tables))
+
+
+def configurations(triggers):
+    """(label, disabled triggers): everything on, each trigger off in turn, and all off when there are several."""
+    yield "all on", ()
+    for trigger in triggers:
+        yield f"without {trigger.name}", (trigger,)
+    if len(triggers) > 1:
+        yield "all off", tuple(triggers)
+
+
+def _wait_label(wait_type, wait_event, locktype, relation):
+    if wait_type is None:
+        return "running"
+    if wait_type == "Lock":
+        # The two views are not one snapshot, so the ungranted lock may already be gone.
+        locktype = locktype or wait_event
+        return f"Lock: {locktype} on {relation}" if relation else f"Lock: {locktype}"
+    return f"{wait_type}: {wait_event}"
+
+
+def sample_waits(connection, stop, waits):
+    """Count what the profiled clients are doing every SAMPLE_SECONDS until stop is set."""
+    cursor = connection.cursor()
+    while not stop.is_set():
+        cursor.execute(WAIT_SAMPLE_SQL, (APPLICATION_NAME,))
+        for row in cursor.fetchall():
+            waits[_wait_label(*row)] += 1
+        stop.wait(SAMPLE_SECONDS)
+
+
+def function_stats(cursor):
+    cursor.execute("SELECT pg_stat_clear_snapshot()")
+    cursor.execute(FUNCTION_STATS_SQL)
+    return {name: (calls, self_time) for name, calls, self_time in cursor.fetchall()}
+
+
+def _wait_for_clients(cursor):
+    # Backends flush their function counters on exit, which finishes after close() returns.
+    while True:
+        cursor.execute("SELECT count(*) FROM pg_stat_activity WHERE application_name = %s", (APPLICATION_NAME,))
+        if not cursor.fetchone()[0]:
+            return
+        time.sleep(0.01)
+
+
+def _client(connection, sql, params, start):
+    cursor = connection.cursor()
+    latencies = []
+    start.wait()
+    for row in params:
+        started = time.perf_counter()
+        cursor.execute(sql, row)
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def run(dsn, cursor, workload, pool, threads=THREADS, statements=STATEMENTS):
+    """Run workload.sql from `threads` connections at once; latencies in seconds plus wait and function counts."""
+    from bulk_load import _connect
+
+    clients = [
+        _connect(dsn, application_name=APPLICATION_NAME, options="-c track_functions=pl") for _ in range(threads)
+    ]
+    shares = [pool[t * statements:(t + 1) * statements] for t in range(threads)]
+    before = function_stats(cursor)
+    waits = Counter()
+    stop = threading.Event()
+    monitor = _connect(dsn)
+    sampler = threading.Thread(target=sample_waits, args=(monitor, stop, waits))
+    start = threading.Barrier(threads + 1)
+    with ThreadPoolExecutor(threads) as executor:
+        futures = [executor.submit(_client, client, workload.sql, share, start) for client, share in zip(clients, shares)]
+        sampler.start()
+        start.wait()
+        started = time.perf_counter()
+        try:
+            latencies = [latency for future in futures for latency in future.result()]
+        finally:
+            seconds = time.perf_counter() - started
+            stop.set()
+            sampler.join()
+            monitor.close()
+            for client in clients:
+                client.close()
+    _wait_for_clients(cursor)
+    after = function_stats(cursor)
+    functions = {
+        name: {"calls": calls - before.get(name, (0, 0))[0], "self_ms": self_time - before.get(name, (0, 0))[1]}
+        for name, (calls, self_time) in after.items()
+        if calls > before.get(name, (0, 0))[0]
+    }
+    return latencies, seconds, waits, functions
+
+
+def _snapshot(cursor, workload):
+    for table, key, columns in workload.restores:
+        cursor.execute(f"DROP TABLE IF EXISTS pg_temp.restore_{table}")
+        cursor.execute(f"CREATE TEMP TABLE restore_{table} AS SELECT {key}, {', '.join(columns)} FROM {table}")
+
+
+def _fingerprints(cursor, tables):
+    # Order-independent: the row count and the sum of a 64-bit hash of every row.
+    cursor.execute(" UNION ALL ".join(f"SELECT '{table}', count(*), sum(hashtextextended(t::text, 0)) FROM {table} t" for table in tables))
+    return {table: (rows, digest) for table, rows, digest in cursor.fetchall()}
+
+
+def _reset(cursor, workload, watermark, fingerprints):
+    # Replica mode keeps the triggers from firing again on the way back.
+    cursor.execute("SET session_replication_role = replica")
+    try:
+        if workload.reset_sql:
+            cursor.execute(workload.reset_sql, {"watermark": watermark})
+        for table, key, columns in workload.restores:
+            assignments = ", ".join(f"{column} = s.{column}" for column in columns)
+            changed = " OR ".join(f"t.{column} IS DISTINCT FROM s.{column}" for column in columns)
+            cursor.execute(f"UPDATE {table} t SET {assignments} FROM restore_{table} s WHERE t.{key} = s.{key} AND ({changed})")
+    finally:
+        cursor.execute("RESET session_replication_role")
+    after = _fingerprints(cursor, list(fingerprints))
+    changed = sorted(table for table, fingerprint in fingerprints.items() if after[table] != fingerprint)
+    if changed:
+        raise RuntimeError(f"{workload.name}: {', '.join(changed)} not restored after the run")
+    cursor.execute(f"VACUUM ANALYZE {workload.table}")
+
+
+def _set_triggers(cursor, triggers, enabled):
+    for trigger in triggers:
+        cursor.execute(f"ALTER TABLE {trigger.table} {'ENABLE' if enabled else 'DISABLE'} TRIGGER {trigger.name}")
+
+
+def summarize(latencies, seconds, waits, functions):
+    values = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, (50, 95, 99))
+    samples = sum(waits.values())
+    locks = sum(count for label, count in waits.items() if label.startswith("Lock:"))
+    return {
+        "statements": len(values),
+        "throughput": round(len(values) / sum(seconds), 1),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(values.mean()), 3),
+        "samples": samples,
+        "lock_share": round(locks / samples, 4) if samples else 0.0,
+        "waits": dict(waits.most_common()),
+        "functions": functions,
+    }
+
+
+def profile_workload(dsn, cursor, catalog, workload, threads=THREADS, statements=STATEMENTS, rounds=ROUNDS):
+    """Each configuration of the workload's triggers, interleaved over `rounds` so drift hits them all alike."""
+    triggers = fired_triggers(catalog, workload)
+    tables = written_tables(catalog, workload, triggers)
+    cursor.execute(workload.pool_sql)
+    names = [column.name for column in cursor.description]
+    pool = [dict(zip(names, row)) for row in cursor.fetchall()]
+    if len(pool) < threads * statements:
+        raise SystemExit(
+            f"{workload.name}: {len(pool):,} rows to run on, but {threads} clients x {statements} statements need "
+            f"{threads * statements:,}; lower --threads or --statements, or raise --scale"
+        )
+    configs = list(configurations(triggers))
+    collected = {label: ([], [], Counter(), {}) for label, _ in configs}
+    for _ in range(rounds):
+        for label, disabled in configs:
+            cursor.execute(f"SELECT coalesce(max({workload.key}), 0) FROM {workload.table}")
+            watermark = cursor.fetchone()[0]
+            fingerprints = _fingerprints(cursor, tables)
+            _snapshot(cursor, workload)
+            _set_triggers(cursor, disabled, False)
+            try:
+                latencies, seconds, waits, functions = run(dsn, cursor, workload, pool, threads, statements)
+            finally:
+                _set_triggers(cursor, disabled, True)
+                _reset(cursor, workload, watermark, fingerprints)
+            total_latencies, total_seconds, total_waits, total_functions = collected[label]
+            total_latencies.extend(latencies)
+            total_seconds.append(seconds)
+            total_waits.update(waits)
+            for name, stats in functions.items():
+                total = total_functions.setdefault(name, {"calls": 0, "self_ms": 0.0})
+                total["calls"] += stats["calls"]
+                total["self_ms"] += stats["self_ms"]
+    return {
+        "table": workload.table,
+        "event": workload.event,
+        "triggers": [{"name": trigger.name, "function": trigger.function, "timing": trigger.timing} for trigger in triggers],
+        "pool": len(pool),
+        "runs": {label: summarize(*collected[label]) for label, _ in configs},
+    }
+
+
+def profile(dsn, scale=SCALE, threads=THREADS, statements=STATEMENTS, rounds=ROUNDS, workloads=None, workers=None, reuse=False):
+    from psycopg2.extensions import make_dsn
+
+    from bench_queries import prepare
+    from bulk_load import _connect
+
+    catalog = load_catalog()
+    name = f"erd_triggers_{str(scale).replace('.', '_')}"
+    started = time.perf_counter()
+    connection = _connect(dsn, dbname=name) if reuse else prepare(dsn, scale, workers, name=name)
+    print(f"scale {scale}: ready in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    cursor = connection.cursor()
+    cursor.execute("SHOW server_version")
+    server = cursor.fetchone()[0]
+    target = make_dsn(dsn, dbname=name)
+    results = {}
+    for workload in WORKLOADS:
+        if workloads and workload.name not in workloads:
+            continue
+        started = time.perf_counter()
+        results[workload.name] = profile_workload(target, cursor, catalog, workload, threads, statements, rounds)
+        print(f"{workload.name}: {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    connection.close()
+    return {
+        "meta": {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "server_version": server,
+            "scale": scale,
+            "threads": threads,
+            "statements": statements,
+            "rounds": rounds,
+            "cpus": os.cpu_count(),
+        },
+        "workloads": results,
+    }
+
+
+def read_profile(path):
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+def overheads(profile):
+    """(trigger, workload, with, without, function ms per call) rows; with/without are the run summaries."""
+    rows = []
+    for name, workload in profile["workloads"].items():
+        runs = workload["runs"]
+        for trigger in workload["triggers"]:
+            on, off = runs["all on"], runs[f"without {trigger['name']}"]
+            stats = on["functions"].get(trigger["function"])
+            per_call = stats["self_ms"] / stats["calls"] if stats and stats["calls"] else None
+            rows.append((trigger["name"], name, on, off, per_call))
+    return rows
+
+
+def hotspots(profile, top=TOP_WAITS):
+    """(workload, configuration, run, [(wait, share)]) rows, the waits ordered by how often they were sampled."""
+    rows = []
+    for name, workload in profile["workloads"].items():
+        for label, run in workload["runs"].items():
+            samples = run["samples"] or 1
+            waits = [(wait, count / samples) for wait, count in run["waits"].items() if wait != "running"][:top]
+            rows.append((name, label, run, waits))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure what the triggers in triggers.sql cost concurrent writers.")
+    parser.add_argument("--dsn", default="", help="local PostgreSQL superuser connection ('' uses PG* variables); erd_triggers_* is recreated")
+    parser.add_argument("--scale", type=float, default=SCALE, help="synth_data.py scale of the scratch database")
+    parser.add_argument("--threads", type=int, default=THREADS, help="concurrent client connections")
+    parser.add_argument("--statements", type=int, default=STATEMENTS, help="statements per client per run")
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="times each trigger configuration is run")
+    parser.add_argument("--workload", action="append", choices=[workload.name for workload in WORKLOADS], help="workload to run (repeatable, default all)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--reuse", action="store_true", help="profile the existing erd_triggers_* database instead of reloading it")
+    parser.add_argument("--out", help="write the profile as JSON for erd_report.py --trigger-profile")
+    args = parser.parse_args(argv)
+
+    result = profile(args.dsn, args.scale, args.threads, args.statements, args.rounds, args.workload, args.workers, args.reuse)
+    print(f"{'workload':<16} {'configuration':<38} {'stmts/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'lock wait':>9}  top wait")
+    for name, label, run, waits in hotspots(result, 1):
+        top = f"{waits[0][0]} ({waits[0][1]:.0%})" if waits else "-"
+        print(f"{name:<16} {label:<38} {run['throughput']:>8.0f} {run['p50_ms']:>8.2f} {run['p95_ms']:>8.2f} {run['lock_share']:>9.0%}  {top}")
+    print(f"\n{'trigger':<32} {'workload':<16} {'p50 +ms':>8} {'p95 +ms':>8} {'throughput':>10} {'fn ms/call':>10}")
+    for trigger, name, on, off, per_call in overheads(result):
+        cost = 1 - on["throughput"] / off["throughput"]
+        fn = f"{per_call:>10.3f}" if per_call is not None else f"{'-':>10}"
+        print(
+            f"{trigger:<32} {name:<16} {on['p50_ms'] - off['p50_ms']:>+8.2f} {on['p95_ms'] - off['p95_ms']:>+8.2f} "
+            f"{-cost:>+10.0%} {fn}"
+        )
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            json.dump(result, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())